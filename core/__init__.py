@@ -1,10 +1,27 @@
-from .window_manager import WindowManager, WindowInfo
-from .project_manager import ProjectManager
-from .scene_manager import SceneManager
-from .background_executor import BackgroundExecutor
-from .execution_manager import ExecutionManager
-
-__all__ = [
-    'WindowManager', 'WindowInfo', 'ProjectManager', 
-    'SceneManager', 'BackgroundExecutor', 'ExecutionManager'
-]
\ No newline at end of file
+"""core 包
+
+各子模块按需导入：导入纯逻辑模块（如 core.action_compiler）时不会连带加载
+win32 / PyQt5 等平台依赖，便于在非 Windows 环境下检查编译结果。
+"""
+import importlib
+
+_EXPORTS = {
+    'WindowManager': '.window_manager',
+    'WindowInfo': '.window_manager',
+    'ProjectManager': '.project_manager',
+    'SceneManager': '.scene_manager',
+    'BackgroundExecutor': '.background_executor',
+    'ExecutionManager': '.execution_manager',
+    'ActionCompiler': '.action_compiler',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
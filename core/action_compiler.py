@@ -0,0 +1,450 @@
+"""动作编译器 - 将场景编译为扁平的消息原语程序
+
+编译结果只依赖场景内容和窗口客户区尺寸，按 (场景, 场景版本, 时间配置, 宽, 高) 缓存，
+执行热循环只需遍历原语，不再逐个操作计算坐标、拼装 lparam。
+本模块不依赖 win32，可以在任意平台上直接检查编译产物。
+"""
+import hashlib
+import json
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence, Tuple
+from models import (Action, ActionType, Scene, TextInputStrategy, DragEasing, WaitCondition,
+                    PostCondition)
+from .timing import TimingProfile, DEFAULT_TIMING_PROFILE, get_timing_profile
+
+
+# ---------- 原语 ----------
+# (OP_POST, msg, wparam, lparam)  投递窗口消息
+# (OP_SLEEP, seconds, tag)        固定休眠，tag 区分消息间隔（SLEEP_GAP）和操作后延迟（SLEEP_DELAY）
+# (OP_WAIT, seconds)              可被停止打断的等待（等待操作）
+# (OP_CHECK,)                     检查停止/暂停标志及窗口有效性
+# (OP_AT, offset)                 等待到距场景开始 offset 秒的绝对时刻（定时操作）
+# (OP_TEXT, text, strategies, char_interval, paste_ops, point)
+#                                 按回退顺序尝试各文本输入方式（运行时才能确定可用方式），
+#                                 paste_ops 为剪贴板方式使用的 ctrl+v 原语，
+#                                 point 为操作坐标，用于确定目标编辑控件
+# (OP_FIND, template_path, roi, threshold, timeout, offset, fallback, click_hold)
+#                                 在 ROI 内查找模板并点击命中位置 + offset，
+#                                 超时未找到时点击 fallback（None 表示失败）
+# (OP_WAIT_FOR, condition, target, appear, timeout)
+#                                 轮询画面条件直到出现/消失；target 为
+#                                 (template_path, roi, threshold) 或 ((x, y), (r, g, b), tolerance)
+# (OP_SETTLE, min_seconds, max_seconds, action_id)
+#                                 等待画面稳定（代替固定的操作后延迟）
+# (OP_SNAPSHOT,)                  记录验证“画面发生变化”的基准缩略图
+# (OP_VERIFY, condition, target, timeout, retries, body)
+#                                 操作后验证，不满足时重新执行 body（操作本身的原语）
+OP_POST = "post"
+OP_SLEEP = "sleep"
+OP_WAIT = "wait"
+OP_CHECK = "check"
+OP_TEXT = "text"
+OP_AT = "at"
+OP_FIND = "find"
+OP_WAIT_FOR = "wait_for"
+OP_SETTLE = "settle"
+OP_SNAPSHOT = "snapshot"
+OP_VERIFY = "verify"
+
+SLEEP_GAP = "gap"
+SLEEP_DELAY = "delay"
+
+# Windows 消息常量
+WM_LBUTTONDOWN = 0x0201
+WM_LBUTTONUP = 0x0202
+WM_LBUTTONDBLCLK = 0x0203
+WM_RBUTTONDOWN = 0x0204
+WM_RBUTTONUP = 0x0205
+WM_MOUSEMOVE = 0x0200
+WM_KEYDOWN = 0x0100
+WM_KEYUP = 0x0101
+WM_CHAR = 0x0102
+WM_SETTEXT = 0x000C
+WM_PASTE = 0x0302
+
+MK_LBUTTON = 0x0001
+MK_RBUTTON = 0x0002
+
+# 虚拟键码（与 win32con.VK_* 一致）
+KEY_MAP = {
+    'enter': 0x0D,
+    'tab': 0x09,
+    'escape': 0x1B,
+    'esc': 0x1B,
+    'space': 0x20,
+    'backspace': 0x08,
+    'delete': 0x2E,
+    'up': 0x26,
+    'down': 0x28,
+    'left': 0x25,
+    'right': 0x27,
+    'home': 0x24,
+    'end': 0x23,
+    'pageup': 0x21,
+    'pagedown': 0x22,
+    'f1': 0x70,
+    'f2': 0x71,
+    'f3': 0x72,
+    'f4': 0x73,
+    'f5': 0x74,
+    'f6': 0x75,
+    'f7': 0x76,
+    'f8': 0x77,
+    'f9': 0x78,
+    'f10': 0x79,
+    'f11': 0x7A,
+    'f12': 0x7B,
+    'ctrl': 0x11,
+    'alt': 0x12,
+    'shift': 0x10,
+}
+
+MODIFIER_KEYS = ('ctrl', 'alt', 'shift')
+
+# 拖拽：每条移动消息覆盖的最大像素距离
+DRAG_PIXELS_PER_STEP = 8
+# 拖拽：自动时长的移动速度（像素/秒）及时长上下限（秒）
+DRAG_AUTO_SPEED = 2000
+DRAG_AUTO_MIN = 0.05
+DRAG_AUTO_MAX = 0.6
+
+EASING_FUNCTIONS = {
+    DragEasing.LINEAR: lambda t: t,
+    DragEasing.EASE_IN: lambda t: t * t,
+    DragEasing.EASE_OUT: lambda t: 1 - (1 - t) * (1 - t),
+    DragEasing.EASE_IN_OUT: lambda t: t * t * (3 - 2 * t),
+}
+
+
+def MAKELPARAM(low, high):
+    """创建 LPARAM"""
+    return (high << 16) | (low & 0xFFFF)
+
+
+@dataclass(frozen=True)
+class ActionProgram:
+    """单个操作编译后的原语序列"""
+    action_id: str
+    name: str
+    ops: Tuple[tuple, ...]
+    error: str = ""
+
+
+@dataclass(frozen=True)
+class SceneProgram:
+    """场景编译结果"""
+    scene_id: str
+    version: str
+    timing_profile: str
+    width: int
+    height: int
+    actions: Tuple[ActionProgram, ...]
+
+
+def parse_color(text: str) -> Optional[Tuple[int, int, int]]:
+    """解析 "#RRGGBB" 颜色，格式错误返回 None"""
+    text = text.strip().lstrip("#")
+    if len(text) != 6:
+        return None
+    try:
+        value = int(text, 16)
+    except ValueError:
+        return None
+    return (value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF
+
+
+def scene_version(scene: Scene) -> str:
+    """场景版本：启用操作内容的指纹，任何影响执行的修改都会改变它"""
+    payload = json.dumps([a.to_dict() for a in scene.get_enabled_actions()],
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def expected_duration(ops: Tuple[tuple, ...]) -> float:
+    """原语序列正常情况下的最长耗时（秒）：休眠、等待及各查找/验证的超时之和"""
+    total = 0.0
+    for op in ops:
+        kind = op[0]
+        if kind in (OP_SLEEP, OP_WAIT, OP_AT):
+            total += op[1]
+        elif kind == OP_TEXT:
+            total += len(op[1]) * op[3]
+        elif kind in (OP_FIND, OP_WAIT_FOR):
+            total += op[4]
+        elif kind == OP_SETTLE:
+            total += op[2]
+        elif kind == OP_VERIFY:
+            total += (op[3] + expected_duration(op[5])) * (op[4] + 1)
+    return total
+
+
+class ActionCompiler:
+    """动作编译器"""
+
+    def __init__(self, map_virtual_key: Optional[Callable[[int], int]] = None,
+                 max_cache: int = 64):
+        """
+        map_virtual_key: 虚拟键码 -> 扫描码，Windows 下传入 win32api.MapVirtualKey 的包装，
+                         未提供时扫描码按 0 处理
+        max_cache: 缓存的场景程序数量上限
+        """
+        self._map_virtual_key = map_virtual_key or (lambda vk: 0)
+        self._max_cache = max_cache
+        # 校准模式：每个操作都生成操作后延迟原语（延迟为 0 或启用了等待画面稳定的也生成），
+        # 由执行器测量画面稳定耗时
+        self.calibrating = False
+        self._cache: "OrderedDict[tuple, SceneProgram]" = OrderedDict()
+
+    def get_program(self, scene: Scene, version: str, width: int, height: int,
+                    timing_profile: str = DEFAULT_TIMING_PROFILE,
+                    actions: Optional[Sequence[Action]] = None) -> SceneProgram:
+        """
+        获取场景程序（命中缓存则直接返回）
+        version: 场景版本（scene_version），由调用方在场景修改时计算一次（如执行快照），
+                 每轮执行不再重新序列化场景
+        actions: 排好序的启用操作，未提供时现算（只在编译时用到）
+        """
+        key = (scene.id, version, timing_profile, width, height)
+        program = self._cache.get(key)
+        if program is not None:
+            self._cache.move_to_end(key)
+            return program
+
+        program = self.compile_scene(scene, width, height, timing_profile, version, actions)
+        self._cache[key] = program
+        while len(self._cache) > self._max_cache:
+            self._cache.popitem(last=False)
+        return program
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def discard(self, scene_ids):
+        """丢弃指定场景的所有缓存程序（场景修改后旧版本不会再被使用）"""
+        for key in [k for k in self._cache if k[0] in scene_ids]:
+            del self._cache[key]
+
+    def compile_scene(self, scene: Scene, width: int, height: int,
+                      timing_profile: str = DEFAULT_TIMING_PROFILE,
+                      version: Optional[str] = None,
+                      actions: Optional[Sequence[Action]] = None) -> SceneProgram:
+        """编译场景中所有启用的操作"""
+        if actions is None:
+            actions = scene.get_enabled_actions()
+        return SceneProgram(
+            scene_id=scene.id,
+            version=version or scene_version(scene),
+            timing_profile=timing_profile,
+            width=width,
+            height=height,
+            actions=tuple(self.compile_action(a, width, height, timing_profile)
+                          for a in actions)
+        )
+
+    def compile_action(self, action: Action, width: int, height: int,
+                       timing_profile: str = DEFAULT_TIMING_PROFILE) -> ActionProgram:
+        """编译单个操作，操作自身的时间配置优先于传入的项目配置"""
+        timing = get_timing_profile(action.timing_profile or timing_profile)
+        x = int(width * action.relative_x)
+        y = int(height * action.relative_y)
+
+        ops = [(OP_CHECK,)]
+        if action.schedule_offset >= 0:
+            ops.append((OP_AT, action.schedule_offset / 1000))
+        body_start = len(ops)
+        action_type = action.action_type
+
+        if action_type == ActionType.CLICK:
+            ops += self._click_ops(WM_LBUTTONDOWN, WM_LBUTTONUP, MK_LBUTTON, x, y, timing)
+        elif action_type == ActionType.DOUBLE_CLICK:
+            ops += self._click_ops(WM_LBUTTONDBLCLK, WM_LBUTTONUP, MK_LBUTTON, x, y, timing)
+        elif action_type == ActionType.RIGHT_CLICK:
+            ops += self._click_ops(WM_RBUTTONDOWN, WM_RBUTTONUP, MK_RBUTTON, x, y, timing)
+        elif action_type == ActionType.DRAG:
+            points = [(x, y)]
+            points += [(int(width * px), int(height * py)) for px, py in action.drag_path]
+            points.append((int(width * action.end_relative_x), int(height * action.end_relative_y)))
+            ops += self._drag_ops(points, action.drag_duration / 1000,
+                                  EASING_FUNCTIONS[action.drag_easing], timing)
+        elif action_type == ActionType.KEY_PRESS:
+            key_ops = self._key_ops(action.key, timing)
+            if key_ops is None:
+                return ActionProgram(action.id, action.name, (), f"不支持的按键: {action.key}")
+            ops += key_ops
+        elif action_type == ActionType.INPUT_TEXT:
+            ops.append((OP_TEXT, action.text,
+                        TextInputStrategy.fallback_chain(action.text_strategy),
+                        timing.char_interval,
+                        tuple(self._combo_key_ops("ctrl+v", timing)),
+                        (x, y)))
+        elif action_type == ActionType.WAIT:
+            ops.append((OP_WAIT, action.wait_time / 1000))
+        elif action_type == ActionType.FIND_CLICK:
+            if not action.template_path:
+                return ActionProgram(action.id, action.name, (), "未设置查找图片")
+            ops.append((OP_FIND, action.template_path, tuple(action.match_roi),
+                        action.match_threshold, action.match_timeout / 1000,
+                        (action.match_offset_x, action.match_offset_y),
+                        (x, y) if action.match_fallback else None,
+                        timing.click_hold))
+        elif action_type == ActionType.WAIT_FOR:
+            if action.wait_condition == WaitCondition.PIXEL:
+                color = parse_color(action.pixel_color)
+                if color is None:
+                    return ActionProgram(action.id, action.name, (), f"无效的颜色: {action.pixel_color}")
+                target = ((x, y), color, action.pixel_tolerance)
+            elif action.template_path:
+                target = (action.template_path, tuple(action.match_roi), action.match_threshold)
+            else:
+                return ActionProgram(action.id, action.name, (), "未设置等待的图片")
+            ops.append((OP_WAIT_FOR, action.wait_condition, target,
+                        action.wait_appear, action.match_timeout / 1000))
+
+        # 操作后验证
+        if action.verify != PostCondition.NONE:
+            target = None
+            if action.verify == PostCondition.ANCHOR_APPEARED:
+                if not action.verify_template_path:
+                    return ActionProgram(action.id, action.name, (), "未设置验证的目标图片")
+                if action.verify_roi[2] <= 0 or action.verify_roi[3] <= 0:
+                    return ActionProgram(action.id, action.name, (), "验证区域为空")
+                target = (action.verify_template_path, tuple(action.verify_roi), action.verify_threshold)
+            body = tuple(ops[body_start:])
+            if action.verify == PostCondition.FRAME_CHANGED:
+                body = ((OP_SNAPSHOT,),) + body
+                ops.insert(body_start, (OP_SNAPSHOT,))
+            ops.append((OP_VERIFY, action.verify, target, action.verify_timeout / 1000,
+                        action.verify_retries, body))
+
+        # 操作后延迟（或等待画面稳定）
+        if self.calibrating:
+            ops.append((OP_SLEEP, action.delay_after / 1000, SLEEP_DELAY))
+        elif action.settle_enabled:
+            ops.append((OP_SETTLE, action.settle_min / 1000,
+                        max(action.settle_max, action.settle_min) / 1000, action.id))
+        elif action.delay_after > 0:
+            ops.append((OP_SLEEP, action.delay_after / 1000, SLEEP_DELAY))
+
+        return ActionProgram(action.id, action.name, tuple(ops))
+
+    # ---------- 各类型原语 ----------
+
+    @staticmethod
+    def _gap(ops: list, seconds: float):
+        """追加消息间隔，间隔为 0 时不生成休眠原语"""
+        if seconds > 0:
+            ops.append((OP_SLEEP, seconds, SLEEP_GAP))
+
+    def left_click_ops(self, x: int, y: int, click_hold: float) -> tuple:
+        """运行时才能确定坐标的左键单击原语（查找并点击）"""
+        lparam = MAKELPARAM(x, y)
+        ops = [(OP_POST, WM_LBUTTONDOWN, MK_LBUTTON, lparam)]
+        self._gap(ops, click_hold)
+        ops.append((OP_POST, WM_LBUTTONUP, 0, lparam))
+        return tuple(ops)
+
+    def _click_ops(self, down_msg: int, up_msg: int, button: int, x: int, y: int,
+                   timing: TimingProfile) -> list:
+        lparam = MAKELPARAM(x, y)
+        ops = [(OP_POST, down_msg, button, lparam)]
+        self._gap(ops, timing.click_hold)
+        ops.append((OP_POST, up_msg, 0, lparam))
+        return ops
+
+    def _drag_ops(self, points: list, duration: float, easing: Callable[[float], float],
+                  timing: TimingProfile) -> list:
+        """
+        沿折线 points 拖拽。步数由距离决定（每步不超过 DRAG_PIXELS_PER_STEP 像素），
+        并受时长 × 最大消息频率限制；时长为 0 时按距离自动计算。
+        """
+        segments = [math.hypot(bx - ax, by - ay) for (ax, ay), (bx, by) in zip(points, points[1:])]
+        length = sum(segments)
+        if duration <= 0:
+            duration = min(max(length / DRAG_AUTO_SPEED, DRAG_AUTO_MIN), DRAG_AUTO_MAX)
+
+        steps = min(math.ceil(length / DRAG_PIXELS_PER_STEP), int(duration * timing.drag_max_rate))
+        steps = max(steps, len(segments), 1)
+        interval = duration / steps
+
+        start_x, start_y = points[0]
+        end_x, end_y = points[-1]
+        ops = [(OP_POST, WM_LBUTTONDOWN, MK_LBUTTON, MAKELPARAM(start_x, start_y))]
+        self._gap(ops, timing.drag_press)
+        for i in range(1, steps + 1):
+            current_x, current_y = self._point_along(points, segments, length * easing(i / steps))
+            ops.append((OP_POST, WM_MOUSEMOVE, MK_LBUTTON, MAKELPARAM(current_x, current_y)))
+            self._gap(ops, interval)
+        ops.append((OP_POST, WM_LBUTTONUP, 0, MAKELPARAM(end_x, end_y)))
+        return ops
+
+    @staticmethod
+    def _point_along(points: list, segments: list, distance: float) -> Tuple[int, int]:
+        """折线上距起点 distance 处的坐标"""
+        for (ax, ay), (bx, by), seg in zip(points, points[1:], segments):
+            if distance <= seg and seg > 0:
+                t = distance / seg
+                return int(round(ax + (bx - ax) * t)), int(round(ay + (by - ay) * t))
+            distance -= seg
+        return points[-1]
+
+    def _resolve_vk(self, key: str) -> Optional[int]:
+        if key in KEY_MAP:
+            return KEY_MAP[key]
+        if len(key) == 1:
+            return ord(key.upper())
+        return None
+
+    def _key_down_lparam(self, vk_code: int) -> int:
+        return (self._map_virtual_key(vk_code) << 16) | 1
+
+    def key_up_lparam(self, vk_code: int) -> int:
+        return (self._map_virtual_key(vk_code) << 16) | 0xC0000001
+
+    def _key_ops(self, key: str, timing: TimingProfile) -> Optional[list]:
+        """按键/组合键，无法识别的单键返回 None"""
+        key_lower = key.lower().strip()
+
+        if '+' in key_lower:
+            return self._combo_key_ops(key_lower, timing)
+
+        vk_code = self._resolve_vk(key_lower)
+        if vk_code is None:
+            return None
+
+        ops = [(OP_POST, WM_KEYDOWN, vk_code, self._key_down_lparam(vk_code))]
+        self._gap(ops, timing.key_hold)
+        ops.append((OP_POST, WM_KEYUP, vk_code, self.key_up_lparam(vk_code)))
+        return ops
+
+    def _combo_key_ops(self, key_str: str, timing: TimingProfile) -> list:
+        parts = [p.strip() for p in key_str.split('+')]
+        modifiers = []
+        main_key = None
+
+        for part in parts:
+            if part in MODIFIER_KEYS:
+                modifiers.append(KEY_MAP[part])
+            else:
+                main_key = part
+
+        ops = []
+        # 按下修饰键
+        for mod in modifiers:
+            ops.append((OP_POST, WM_KEYDOWN, mod, self._key_down_lparam(mod)))
+            self._gap(ops, timing.modifier_gap)
+
+        # 按下主键
+        vk_code = self._resolve_vk(main_key) if main_key else None
+        if vk_code:
+            ops.append((OP_POST, WM_KEYDOWN, vk_code, self._key_down_lparam(vk_code)))
+            self._gap(ops, timing.key_hold)
+            ops.append((OP_POST, WM_KEYUP, vk_code, self.key_up_lparam(vk_code)))
+
+        # 释放修饰键
+        for mod in reversed(modifiers):
+            ops.append((OP_POST, WM_KEYUP, mod, self.key_up_lparam(mod)))
+            self._gap(ops, timing.modifier_gap)
+
+        return ops
@@ -0,0 +1,144 @@
+"""asyncio 执行引擎 - 每个项目一个协程，阻塞的截图/识别/投递放到线程池
+
+协程逐步推进 ProjectRunner.steps()：每一步（截图、识别、投递消息）在线程池中执行，
+步与步之间 yield 出的等待（识别间隔、操作后延迟、等待操作）变成 asyncio.sleep，
+因此数百个项目只需要一个事件循环线程加少量工作线程。
+执行事件由 ProjectRunner 的监听器在工作线程中发出，监听器需线程安全（如 EventBatcher）。
+本模块不依赖 win32/Qt。
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Generator, List, Optional
+from .task_pool import DEFAULT_POOL_SIZE
+
+
+_DONE = object()
+
+
+class AsyncTask:
+    """提交到 asyncio 引擎的任务，接口与 TaskHandle 一致"""
+
+    def __init__(self, engine: 'AsyncEngine', name: str = ""):
+        self.engine = engine
+        self.name = name
+        self.error: Optional[BaseException] = None
+        self.steps = 0
+        self._done = threading.Event()
+        self._wake: Optional[asyncio.Event] = None
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待任务结束，返回是否已结束"""
+        return self._done.wait(timeout)
+
+    def wake(self):
+        """提前结束当前（或下一次）等待"""
+        self.engine.wake(self)
+
+
+class AsyncEngine:
+    """asyncio 执行引擎"""
+
+    def __init__(self, max_workers: int = DEFAULT_POOL_SIZE, loop: Optional[asyncio.AbstractEventLoop] = None,
+                 executor=None):
+        """
+        loop 为 None 时创建事件循环并在后台线程中运行；
+        传入 loop 时由调用方驱动（如 loop.run_until_complete(engine.run_steps(...))）
+        """
+        self.size = max_workers
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers,
+                                                        thread_name_prefix="async-engine")
+        self._lock = threading.Lock()
+        self._tasks: List[AsyncTask] = []
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        if loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run_loop, name="async-engine-loop", daemon=True)
+            self._thread.start()
+        else:
+            self._loop = loop
+
+    def submit(self, gen: Generator, name: str = "") -> AsyncTask:
+        """提交生成器任务，在事件循环中作为协程运行"""
+        task = AsyncTask(self, name)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("执行引擎已关闭")
+            self._tasks.append(task)
+        asyncio.run_coroutine_threadsafe(self.run_steps(gen, task), self._loop)
+        return task
+
+    def active_count(self) -> int:
+        with self._lock:
+            return len(self._tasks)
+
+    def wake(self, task: AsyncTask):
+        self._loop.call_soon_threadsafe(self._set_wake, task)
+
+    def shutdown(self, wait: bool = True):
+        """停止接受新任务；已提交的任务执行到结束后关闭事件循环和线程池（可重复调用）"""
+        with self._lock:
+            # 已调用过时关闭由上一次调用或最后一个任务结束时完成，这里只等待
+            idle = not self._closed and not self._tasks
+            self._closed = True
+        if idle:
+            self._loop.call_soon_threadsafe(self._close)
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    async def run_steps(self, gen: Generator, task: Optional[AsyncTask] = None):
+        """协程：在线程池中逐步推进生成器，步间等待用 asyncio.sleep（可被 wake 提前结束）"""
+        task = task or AsyncTask(self)
+        loop = asyncio.get_running_loop()
+        task._wake = asyncio.Event()
+        try:
+            while True:
+                # 在执行这一步之前清除唤醒标志，步骤执行期间的 wake 会让随后的等待立即结束
+                task._wake.clear()
+                delay = await loop.run_in_executor(self._executor, next, gen, _DONE)
+                if delay is _DONE:
+                    break
+                task.steps += 1
+                if delay and delay > 0:
+                    try:
+                        await asyncio.wait_for(task._wake.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+        except Exception as e:
+            print(f"asyncio 任务出错 [{task.name}]: {e}")
+            task.error = e
+        finally:
+            self._finish(task)
+
+    # ---------- 内部 ----------
+
+    @staticmethod
+    def _set_wake(task: AsyncTask):
+        if task._wake is not None:
+            task._wake.set()
+
+    def _finish(self, task: AsyncTask):
+        with self._lock:
+            if task in self._tasks:
+                self._tasks.remove(task)
+            close = self._closed and not self._tasks
+        task._done.set()
+        if close:
+            self._close()
+
+    def _close(self):
+        """在事件循环线程中调用：关闭线程池，停止自有的事件循环"""
+        self._executor.shutdown(wait=False)
+        if self._thread is not None:
+            self._loop.stop()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
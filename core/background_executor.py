@@ -1,74 +1,259 @@
 """后台执行器 - 使用Windows消息实现后台操作，不影响用户鼠标键盘"""
 import time
-import ctypes
-from ctypes import wintypes
+import threading
+from functools import partial
 import win32gui
-import win32con
 import win32api
-from typing import Optional, Callable
-from models import Action, ActionType
-from .window_manager import WindowManager, WindowInfo
-
-
-# Windows API 常量
-WM_LBUTTONDOWN = 0x0201
-WM_LBUTTONUP = 0x0202
-WM_LBUTTONDBLCLK = 0x0203
-WM_RBUTTONDOWN = 0x0204
-WM_RBUTTONUP = 0x0205
-WM_MOUSEMOVE = 0x0200
-WM_KEYDOWN = 0x0100
-WM_KEYUP = 0x0101
-WM_CHAR = 0x0102
-WM_SETTEXT = 0x000C
-
-MK_LBUTTON = 0x0001
-MK_RBUTTON = 0x0002
-
-
-def MAKELPARAM(low, high):
-    """创建 LPARAM"""
-    return (high << 16) | (low & 0xFFFF)
+from typing import Optional, Callable, Generator
+from models import Action, Scene, TextInputStrategy, WaitCondition, PostCondition
+from .window_manager import WindowManager
+from .metrics import ExecutionMetrics
+from .cancellation import CancellationToken
+from .scheduler import ActionScheduler, ActionSkipped
+from .pacing import MessagePacer
+from .child_router import ChildWindowRouter
+from .scene_manager import SceneManager
+from .timing import DEFAULT_TIMING_PROFILE
+from .calibration import DelayCalibrator, CALIBRATION_MAX_FACTOR, CALIBRATION_MIN_WINDOW
+from .action_compiler import (
+    ActionCompiler, ActionProgram, OP_POST, OP_SLEEP, OP_WAIT, OP_CHECK, OP_TEXT, OP_AT, OP_FIND,
+    OP_WAIT_FOR, OP_SETTLE, OP_SNAPSHOT, OP_VERIFY,
+    SLEEP_GAP, SLEEP_DELAY, WM_PASTE,
+)
+# 消息常量已移至 action_compiler，这里保留导入以兼容旧的引用路径
+from .action_compiler import (  # noqa: F401
+    MAKELPARAM, WM_LBUTTONDOWN, WM_LBUTTONUP, WM_LBUTTONDBLCLK, WM_RBUTTONDOWN,
+    WM_RBUTTONUP, WM_MOUSEMOVE, WM_KEYDOWN, WM_KEYUP, WM_CHAR, WM_SETTEXT,
+    MK_LBUTTON, MK_RBUTTON,
+)
+
+# 按下类消息 -> (按住的键, 对应的抬起消息)，用于结束时释放仍按住的鼠标按钮
+_BUTTON_DOWN = {
+    WM_LBUTTONDOWN: ("L", WM_LBUTTONUP),
+    WM_LBUTTONDBLCLK: ("L", WM_LBUTTONUP),
+    WM_RBUTTONDOWN: ("R", WM_RBUTTONUP),
+}
+_BUTTON_UP = {WM_LBUTTONUP: "L", WM_RBUTTONUP: "R"}
+
+WM_NULL = 0x0000
+SMTO_ABORTIFHUNG = 0x0002
+# 节流探测的超时时间（毫秒）
+PROBE_TIMEOUT_MS = 200
+# 同步发送（WM_SETTEXT / WM_PASTE）的超时时间（毫秒），目标挂起时不会一直阻塞
+SEND_TIMEOUT_MS = 2000
+# 等待剪贴板锁时检查停止标志的间隔（秒）
+CLIPBOARD_LOCK_POLL = 0.1
+# 投递 ctrl+v 后等待目标读取剪贴板的时间（秒），之后再恢复用户剪贴板
+CLIPBOARD_SETTLE = 0.15
+WM_GETTEXTLENGTH = 0x000E
+
+# 批量字符消息每批的字符数
+TEXT_CHUNK_SIZE = 32
+
+# 查找模板时可复用的截图最大时长（秒），此后若已投递过输入则必须重新截图
+FRAME_MAX_AGE = 0.5
+# 查找未命中时的重试间隔（秒）
+FIND_POLL_INTERVAL = 0.05
+# 等待画面条件的轮询间隔：从 WAIT_POLL_MIN 开始，每次未满足乘以 WAIT_POLL_BACKOFF，最长 WAIT_POLL_MAX
+WAIT_POLL_MIN = 0.01
+WAIT_POLL_MAX = 0.2
+WAIT_POLL_BACKOFF = 1.5
+# 画面稳定检测：采样间隔（秒）、判定为“未变化”的平均像素差、需要连续未变化的次数
+SETTLE_SAMPLE_INTERVAL = 0.03
+SETTLE_DIFF_THRESHOLD = 1.0
+SETTLE_STABLE_SAMPLES = 2
+# 验证“画面发生变化”时认为已变化的平均像素差
+VERIFY_CHANGE_THRESHOLD = 3.0
+# 定时操作交给驱动方等待时，最后留在本线程高精度等待的秒数（覆盖驱动方定时器的误差）
+AT_DEFER_MARGIN = 0.05
+# 步骤模式下暂停时每次交还驱动方的等待秒数（恢复时会被提前唤醒）
+PAUSE_POLL = 1.0
+
+# 剪贴板为全局资源，多个项目并行输入时需要互斥
+_clipboard_lock = threading.Lock()
 
 
 class BackgroundExecutor:
     """后台执行器 - 在指定窗口后台执行操作，不影响用户操作"""
 
-    def __init__(self):
+    def __init__(self, metrics: Optional[ExecutionMetrics] = None,
+                 token: Optional[CancellationToken] = None,
+                 vision: Optional[SceneManager] = None):
         self.window_manager = WindowManager()
-        self._stop_flag = False
-        self._pause_flag = False
+        # 模板匹配引擎，与场景识别共用以复用模板缓存和识别时的截图
+        self.vision = vision or SceneManager()
+        # 最近一次投递输入的时刻，之前的截图不再代表当前画面
+        self.last_input_at = 0.0
+        # 校准模式：操作后延迟改为等待画面稳定并记录实际耗时
+        self.calibrator: Optional[DelayCalibrator] = None
+        self._current_action_id = ""
+        # 当前场景及其是否已通过“离开当前场景”验证提前结束
+        self.current_scene: Optional[Scene] = None
+        self.scene_finished = False
+        self._verify_baseline = None
+        self.metrics = metrics or ExecutionMetrics()
+        self.token = token or CancellationToken()
+        self.scheduler = ActionScheduler(self.token, self.metrics)
+        self.pacer: Optional[MessagePacer] = None
+        self.child_router: Optional[ChildWindowRouter] = None
+        self.compiler = ActionCompiler(lambda vk: win32api.MapVirtualKey(vk, 0))
+        # 含等待的原语写成生成器（yield 等待秒数），步骤模式下交给驱动方，
+        # 阻塞模式下由 _drive 在本线程中休眠，两种模式共用同一份实现
+        self._op_step_handlers = {
+            OP_SLEEP: self._sleep_steps,
+            OP_WAIT: self._wait_steps,
+            OP_CHECK: self._check_steps,
+            OP_AT: self._at_steps,
+            OP_FIND: self._find_steps,
+            OP_WAIT_FOR: self._wait_for_steps,
+            OP_SETTLE: self._settle_steps,
+            OP_VERIFY: self._verify_steps,
+            OP_TEXT: self._text_steps,
+        }
+        self._op_handlers = {
+            OP_POST: self._op_post,
+            OP_CHECK: self._op_check,
+            OP_SNAPSHOT: self._op_snapshot,
+        }
+        for kind, steps in self._op_step_handlers.items():
+            self._op_handlers.setdefault(kind, partial(self._drive_op, steps))
+        self._verify_handlers = {
+            PostCondition.FRAME_CHANGED: self._verify_frame_changed,
+            PostCondition.ANCHOR_APPEARED: self._verify_anchor_appeared,
+            PostCondition.SCENE_CHANGED: self._verify_scene_changed,
+        }
+        self._condition_handlers = {
+            WaitCondition.TEMPLATE: self._condition_template,
+            WaitCondition.PIXEL: self._condition_pixel,
+        }
+        self._text_handlers = {
+            TextInputStrategy.SET_TEXT: self._text_set_text,
+            TextInputStrategy.CLIPBOARD: self._text_clipboard,
+            TextInputStrategy.CHUNKED: self._text_chunked,
+            TextInputStrategy.PER_CHAR: self._text_per_char,
+        }
+        # 已按下尚未抬起的键/鼠标按钮 -> 抬起消息 (msg, wparam, lparam)，按按下顺序
+        self._held = {}
+
+    def begin_scene(self, hwnd: int, width: int, height: int, scene: Optional[Scene] = None):
+        """开始执行一个场景：重置定时基准，并同步客户区尺寸给子窗口路由"""
+        self.scheduler.begin_scene()
+        self.current_scene = scene
+        self.scene_finished = False
+        if self.child_router is not None:
+            self.child_router.update_size(hwnd, width, height)
+
+    def set_child_routing(self, enabled: bool):
+        """开启/关闭鼠标消息路由到坐标下方的子窗口"""
+        if enabled and self.child_router is None:
+            self.child_router = ChildWindowRouter(self.metrics)
+        elif not enabled:
+            self.child_router = None
+
+    def set_pacing(self, enabled: bool):
+        """开启/关闭投递节流"""
+        if enabled and self.pacer is None:
+            self.pacer = MessagePacer(self._probe_window, self.scheduler.sleep, self.metrics)
+        elif not enabled:
+            self.pacer = None
+
+    def _probe_window(self, hwnd: int) -> Optional[float]:
+        """同步发送 WM_NULL，返回往返秒数，超时返回 None"""
+        start = time.perf_counter()
+        try:
+            win32gui.SendMessageTimeout(hwnd, WM_NULL, 0, 0, SMTO_ABORTIFHUNG, PROBE_TIMEOUT_MS)
+        except Exception:
+            return None
+        return time.perf_counter() - start
+
+    def _post(self, hwnd: int, msg: int, wparam: int, lparam: int, paced: bool = False):
+        """
+        投递消息（开启节流时先等待当前投递间隔，开启子窗口路由时改投子窗口）
+        paced: 调用方已等待过投递间隔（步骤模式下由驱动方等待）
+        """
+        self._track_held(msg, wparam, lparam)
+        if self.pacer is not None and not paced:
+            self.pacer.before_post(hwnd)
+
+        router = self.child_router
+        if router is not None and router.is_mouse_message(msg):
+            x, y = lparam & 0xFFFF, (lparam >> 16) & 0xFFFF
+            if msg in _BUTTON_DOWN:
+                router.capture(hwnd, x, y)
+            target, x, y = router.route(hwnd, x, y)
+            if msg in _BUTTON_UP and not any(b in self._held for b in ("L", "R")):
+                # 所有按钮都已抬起（_track_held 已先行更新），之后的消息重新按坐标路由
+                router.release_capture(hwnd)
+            if target != hwnd:
+                try:
+                    win32gui.PostMessage(target, msg, wparam, MAKELPARAM(x, y))
+                    self.last_input_at = time.perf_counter()
+                    return
+                except Exception:
+                    # 子窗口可能已销毁，清除缓存（及固定目标）后退回顶层窗口
+                    router.invalidate(hwnd)
+                    self.metrics.incr("child_route.stale")
+
+        win32gui.PostMessage(hwnd, msg, wparam, lparam)
+        self.last_input_at = time.perf_counter()
+
+    def _track_held(self, msg: int, wparam: int, lparam: int):
+        """记录按下/抬起，release_held 据此补发抬起消息"""
+        if msg == WM_KEYDOWN:
+            self._held[wparam] = (WM_KEYUP, wparam, self.compiler.key_up_lparam(wparam))
+        elif msg == WM_KEYUP:
+            self._held.pop(wparam, None)
+        elif msg in _BUTTON_DOWN:
+            button, up_msg = _BUTTON_DOWN[msg]
+            self._held[button] = (up_msg, 0, lparam)
+        elif msg in _BUTTON_UP:
+            self._held.pop(_BUTTON_UP[msg], None)
+        elif msg == WM_MOUSEMOVE:
+            # 拖拽中按钮在最后的位置抬起
+            for button in ("L", "R"):
+                if button in self._held:
+                    self._held[button] = self._held[button][:2] + (lparam,)
+
+    def release_held(self, hwnd: int) -> int:
+        """按按下的相反顺序抬起所有仍按住的键和鼠标按钮（执行结束时调用），返回补发的消息数"""
+        released = 0
+        for key in reversed(list(self._held)):
+            msg, wparam, lparam = self._held.pop(key)
+            try:
+                # 经 _post 投递，鼠标按钮与按下时一样路由到子窗口
+                self._post(hwnd, msg, wparam, lparam)
+                released += 1
+            except Exception as e:
+                print(f"释放按键失败: {e}")
+        if self.child_router is not None:
+            self.child_router.release_capture(hwnd)
+        return released
 
     def stop(self):
-        self._stop_flag = True
+        self.token.stop()
 
     def pause(self):
-        self._pause_flag = True
+        self.token.pause()
 
     def resume(self):
-        self._pause_flag = False
+        self.token.resume()
 
     def reset(self):
-        self._stop_flag = False
-        self._pause_flag = False
+        self.token.reset()
 
     def is_stopped(self) -> bool:
-        return self._stop_flag
+        return self.token.is_stopped()
 
     def is_paused(self) -> bool:
-        return self._pause_flag
+        return self.token.is_paused()
 
     def execute_action(self, action: Action, hwnd: int,
-                       callback: Optional[Callable] = None) -> bool:
-        """在指定窗口后台执行操作"""
-        if self._stop_flag:
+                       callback: Optional[Callable] = None,
+                       timing_profile: str = DEFAULT_TIMING_PROFILE) -> bool:
+        """在指定窗口后台执行单个操作（即时编译，不走缓存）"""
+        if self.token.is_stopped():
             return False
 
-        while self._pause_flag:
-            time.sleep(0.1)
-            if self._stop_flag:
-                return False
-
         try:
             # 检查窗口是否有效
             if not win32gui.IsWindow(hwnd):
@@ -86,266 +271,496 @@ class BackgroundExecutor:
                     callback("窗口大小无效")
                 return False
 
-            # 计算点击坐标（相对于客户区）
-            x = int(width * action.relative_x)
-            y = int(height * action.relative_y)
-
-            if callback:
-                callback(f"执行: {action.name}")
-
-            success = False
-            
-            if action.action_type == ActionType.CLICK:
-                success = self._background_click(hwnd, x, y)
-            elif action.action_type == ActionType.DOUBLE_CLICK:
-                success = self._background_double_click(hwnd, x, y)
-            elif action.action_type == ActionType.RIGHT_CLICK:
-                success = self._background_right_click(hwnd, x, y)
-            elif action.action_type == ActionType.DRAG:
-                end_x = int(width * action.end_relative_x)
-                end_y = int(height * action.end_relative_y)
-                success = self._background_drag(hwnd, x, y, end_x, end_y)
-            elif action.action_type == ActionType.KEY_PRESS:
-                success = self._background_key_press(hwnd, action.key)
-            elif action.action_type == ActionType.INPUT_TEXT:
-                success = self._background_input_text(hwnd, action.text)
-            elif action.action_type == ActionType.WAIT:
-                success = self._wait(action.wait_time)
-
-            # 操作后延迟
-            if success and action.delay_after > 0:
-                time.sleep(action.delay_after / 1000)
-
-            return success
+            program = self.compiler.compile_action(action, width, height, timing_profile)
+            return self.run_program(program, hwnd, callback)
 
         except Exception as e:
             if callback:
                 callback(f"执行失败: {e}")
             return False
 
-    def _background_click(self, hwnd: int, x: int, y: int) -> bool:
-        """后台单击"""
-        try:
-            lparam = MAKELPARAM(x, y)
-            
-            # 发送鼠标按下和释放消息
-            win32gui.PostMessage(hwnd, WM_LBUTTONDOWN, MK_LBUTTON, lparam)
-            time.sleep(0.05)
-            win32gui.PostMessage(hwnd, WM_LBUTTONUP, 0, lparam)
-            
-            return True
-        except Exception as e:
-            print(f"后台点击失败: {e}")
+    def run_program(self, program: ActionProgram, hwnd: int,
+                    callback: Optional[Callable] = None) -> bool:
+        """执行一个已编译的操作程序"""
+        if program.error:
+            if callback:
+                callback(program.error)
             return False
 
-    def _background_double_click(self, hwnd: int, x: int, y: int) -> bool:
-        """后台双击"""
+        if callback:
+            callback(f"执行: {program.name}")
+
+        self._current_action_id = program.action_id
+        handlers = self._op_handlers
         try:
-            lparam = MAKELPARAM(x, y)
-            
-            # 发送双击消息
-            win32gui.PostMessage(hwnd, WM_LBUTTONDBLCLK, MK_LBUTTON, lparam)
-            time.sleep(0.05)
-            win32gui.PostMessage(hwnd, WM_LBUTTONUP, 0, lparam)
-            
+            for op in program.ops:
+                if not handlers[op[0]](hwnd, op, callback):
+                    return False
+            return True
+        except ActionSkipped as e:
+            if callback:
+                callback(f"{e}: {program.name}")
             return True
         except Exception as e:
-            print(f"后台双击失败: {e}")
+            if callback:
+                callback(f"执行失败: {e}")
+            return False
+
+    def program_steps(self, program: ActionProgram, hwnd: int,
+                      callback: Optional[Callable] = None) -> Generator[float, None, bool]:
+        """
+        与 run_program 相同，但等待（等待操作、操作后延迟、定时操作、查找/等待画面/验证的轮询间隔、
+        画面稳定采样间隔、投递节流、暂停）不在此阻塞，而是 yield 等待秒数交给驱动方
+        （共享线程池 / asyncio 事件循环）；生成器的返回值为执行结果。
+        消息间隔（SLEEP_GAP）很短，仍在本线程中高精度休眠
+        """
+        if program.error:
+            if callback:
+                callback(program.error)
             return False
 
-    def _background_right_click(self, hwnd: int, x: int, y: int) -> bool:
-        """后台右键单击"""
+        if callback:
+            callback(f"执行: {program.name}")
+
+        self._current_action_id = program.action_id
         try:
-            lparam = MAKELPARAM(x, y)
-            
-            win32gui.PostMessage(hwnd, WM_RBUTTONDOWN, MK_RBUTTON, lparam)
-            time.sleep(0.05)
-            win32gui.PostMessage(hwnd, WM_RBUTTONUP, 0, lparam)
-            
+            for op in program.ops:
+                if not (yield from self._op_steps(hwnd, op, callback)):
+                    return False
+            return True
+        except ActionSkipped as e:
+            if callback:
+                callback(f"{e}: {program.name}")
             return True
         except Exception as e:
-            print(f"后台右键点击失败: {e}")
+            if callback:
+                callback(f"执行失败: {e}")
             return False
 
-    def _background_drag(self, hwnd: int, start_x: int, start_y: int,
-                         end_x: int, end_y: int) -> bool:
-        """后台拖拽"""
-        try:
-            # 按下鼠标
-            lparam = MAKELPARAM(start_x, start_y)
-            win32gui.PostMessage(hwnd, WM_LBUTTONDOWN, MK_LBUTTON, lparam)
-            time.sleep(0.05)
-            
-            # 移动鼠标
-            steps = 20
-            for i in range(steps + 1):
-                if self._stop_flag:
-                    break
-                current_x = int(start_x + (end_x - start_x) * i / steps)
-                current_y = int(start_y + (end_y - start_y) * i / steps)
-                lparam = MAKELPARAM(current_x, current_y)
-                win32gui.PostMessage(hwnd, WM_MOUSEMOVE, MK_LBUTTON, lparam)
-                time.sleep(0.02)
-            
-            # 释放鼠标
-            lparam = MAKELPARAM(end_x, end_y)
-            win32gui.PostMessage(hwnd, WM_LBUTTONUP, 0, lparam)
-            
+    def _op_steps(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> Generator[float, None, bool]:
+        """执行一条原语，其中的等待 yield 给驱动方"""
+        steps = self._op_step_handlers.get(op[0])
+        if steps is not None:
+            return (yield from steps(hwnd, op, callback))
+        if op[0] == OP_POST and self.pacer is not None:
+            delay = self.pacer.delay_before_post(hwnd)
+            if delay > 0:
+                start = time.perf_counter()
+                yield delay
+                self.metrics.add_time("sleep.pacing", time.perf_counter() - start)
+            self._post(hwnd, op[1], op[2], op[3], paced=True)
             return True
-        except Exception as e:
-            print(f"后台拖拽失败: {e}")
+        return self._op_handlers[op[0]](hwnd, op, callback)
+
+    def _drive(self, steps: Generator[float, None, bool]) -> bool:
+        """在本线程中执行步骤生成器：yield 的等待直接休眠（可被停止打断）"""
+        while True:
+            try:
+                delay = next(steps)
+            except StopIteration as e:
+                return e.value
+            self.scheduler.sleep(delay)
+
+    def _drive_op(self, steps: Callable, hwnd: int, op: tuple, callback: Optional[Callable]) -> bool:
+        return self._drive(steps(hwnd, op, callback))
+
+    # ---------- 原语处理 ----------
+
+    def _op_post(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> bool:
+        self._post(hwnd, op[1], op[2], op[3])
+        return True
+
+    def _sleep_steps(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> Generator[float, None, bool]:
+        if self.calibrator is not None and op[2] == SLEEP_DELAY:
+            return (yield from self._calibrate_delay_steps(hwnd, op[1]))
+        # 停止后立即返回但不中断程序，保证按下/抬起等成对消息发送完整
+        start = time.perf_counter()
+        if op[2] == SLEEP_DELAY:
+            yield op[1]
+        else:
+            self.scheduler.sleep(op[1])
+        self.metrics.add_time(f"sleep.{op[2]}", time.perf_counter() - start)
+        return True
+
+    def _wait_steps(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> Generator[float, None, bool]:
+        yield op[1]
+        return not self.token.is_stopped()
+
+    def _check_steps(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> Generator[float, None, bool]:
+        """与 _op_check 相同，但暂停时 yield 给驱动方而不是阻塞线程"""
+        if self.token.is_paused() and not self.token.is_stopped():
+            paused_at = time.perf_counter()
+            while self.token.is_paused() and not self.token.is_stopped():
+                yield PAUSE_POLL
+            self.scheduler.shift(time.perf_counter() - paused_at)
+        return self._op_check(hwnd, op, callback)
+
+    def _op_check(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> bool:
+        if self.token.is_paused():
+            paused_at = time.perf_counter()
+            if not self.token.wait_if_paused():
+                return False
+            # 暂停时长不计入场景时间，避免恢复后定时操作全部迟到
+            self.scheduler.shift(time.perf_counter() - paused_at)
+        elif self.token.is_stopped():
             return False
 
-    def _background_key_press(self, hwnd: int, key: str) -> bool:
-        """后台按键"""
-        try:
-            key_map = {
-                'enter': win32con.VK_RETURN,
-                'tab': win32con.VK_TAB,
-                'escape': win32con.VK_ESCAPE,
-                'esc': win32con.VK_ESCAPE,
-                'space': win32con.VK_SPACE,
-                'backspace': win32con.VK_BACK,
-                'delete': win32con.VK_DELETE,
-                'up': win32con.VK_UP,
-                'down': win32con.VK_DOWN,
-                'left': win32con.VK_LEFT,
-                'right': win32con.VK_RIGHT,
-                'home': win32con.VK_HOME,
-                'end': win32con.VK_END,
-                'pageup': win32con.VK_PRIOR,
-                'pagedown': win32con.VK_NEXT,
-                'f1': win32con.VK_F1,
-                'f2': win32con.VK_F2,
-                'f3': win32con.VK_F3,
-                'f4': win32con.VK_F4,
-                'f5': win32con.VK_F5,
-                'f6': win32con.VK_F6,
-                'f7': win32con.VK_F7,
-                'f8': win32con.VK_F8,
-                'f9': win32con.VK_F9,
-                'f10': win32con.VK_F10,
-                'f11': win32con.VK_F11,
-                'f12': win32con.VK_F12,
-                'ctrl': win32con.VK_CONTROL,
-                'alt': win32con.VK_MENU,
-                'shift': win32con.VK_SHIFT,
-            }
-
-            key_lower = key.lower().strip()
-            
-            # 处理组合键
-            if '+' in key_lower:
-                return self._background_combo_key(hwnd, key_lower, key_map)
-            
-            # 单个按键
-            if key_lower in key_map:
-                vk_code = key_map[key_lower]
-            elif len(key) == 1:
-                vk_code = ord(key.upper())
-            else:
+        if not win32gui.IsWindow(hwnd):
+            if callback:
+                callback(f"窗口无效: {hwnd}")
+            return False
+        return True
+
+    def _at_steps(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> Generator[float, None, bool]:
+        """定时操作：大段等待 yield 给驱动方，最后 AT_DEFER_MARGIN 秒在本线程高精度等待"""
+        remaining = self.scheduler.time_until_offset(op[1])
+        if remaining > AT_DEFER_MARGIN:
+            yield remaining - AT_DEFER_MARGIN
+            if self.token.is_stopped():
                 return False
+        return self.scheduler.wait_for_offset(op[1], callback=callback)
+
+    def _find_steps(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> Generator[float, None, bool]:
+        """在 ROI 内查找模板并点击，首次查找优先复用场景识别时的截图"""
+        _, template_path, roi, threshold, timeout, offset, fallback, click_hold = op
+        start = time.perf_counter()
+        deadline = start + timeout
+        max_age = FRAME_MAX_AGE
+        point = None
+        while True:
+            point = self.vision.find_template(hwnd, template_path, roi, threshold,
+                                              max_age=max_age, not_before=self.last_input_at)
+            if point is not None or self.token.is_stopped():
+                break
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            # 重试必须使用新截图
+            max_age = 0.0
+            yield min(FIND_POLL_INTERVAL, remaining)
+        self.metrics.add_time("find.search", time.perf_counter() - start)
+
+        if self.token.is_stopped():
+            return False
+
+        if point is not None:
+            self.metrics.incr("find.hit")
+            offset_x, offset_y = self.window_manager.get_client_offset(hwnd)
+            x = point[0] - offset_x + offset[0]
+            y = point[1] - offset_y + offset[1]
+        elif fallback is not None:
+            self.metrics.incr("find.fallback")
+            if callback:
+                callback(f"未找到目标，点击备用坐标 ({fallback[0]}, {fallback[1]})")
+            x, y = fallback
+        else:
+            self.metrics.incr("find.miss")
+            if callback:
+                callback(f"未找到目标: {template_path}")
+            return False
 
-            # 发送按键消息
-            scan_code = win32api.MapVirtualKey(vk_code, 0)
-            lparam_down = (scan_code << 16) | 1
-            lparam_up = (scan_code << 16) | 0xC0000001
+        for click_op in self.compiler.left_click_ops(max(0, x), max(0, y), click_hold):
+            if not (yield from self._op_steps(hwnd, click_op, callback)):
+                return False
+        return True
 
-            win32gui.PostMessage(hwnd, WM_KEYDOWN, vk_code, lparam_down)
-            time.sleep(0.05)
-            win32gui.PostMessage(hwnd, WM_KEYUP, vk_code, lparam_up)
+    def _wait_for_steps(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> Generator[float, None, bool]:
+        """轮询画面条件直到出现/消失或超时，轮询间隔从短到长退避"""
+        _, condition, target, appear, timeout = op
+        check = self._condition_handlers[condition]
+        start = time.perf_counter()
+        deadline = start + timeout
+        interval = WAIT_POLL_MIN
+        max_age = FRAME_MAX_AGE
+        polls = 0
+        satisfied = False
+        while not self.token.is_stopped():
+            polls += 1
+            if check(hwnd, target, max_age) == appear:
+                satisfied = True
+                break
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            # 之后每次都必须重新截图
+            max_age = 0.0
+            yield min(interval, remaining)
+            interval = min(interval * WAIT_POLL_BACKOFF, WAIT_POLL_MAX)
+
+        waited = time.perf_counter() - start
+        self.metrics.add_time("wait_for.waited", waited)
+        self.metrics.incr("wait_for.polls", polls)
+        if self.token.is_stopped():
+            return False
 
-            return True
-        except Exception as e:
-            print(f"后台按键失败: {e}")
+        state = "出现" if appear else "消失"
+        if callback:
+            result = "满足" if satisfied else "超时"
+            callback(f"等待{state}{result}: 检测 {polls} 次，"
+                     f"用时 {waited * 1000:.0f}/{timeout * 1000:.0f}ms")
+        if not satisfied:
+            self.metrics.incr("wait_for.timeout")
+        return satisfied
+
+    def _settle_steps(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> Generator[float, None, bool]:
+        """
+        采样缩略图直到连续 SETTLE_STABLE_SAMPLES 次与前一帧几乎无差异，至少等待 min、至多 max 秒。
+        稳定用时按操作记录到分布统计 settle.<action_id>
+        """
+        _, min_seconds, max_seconds, action_id = op
+        elapsed, settled = yield from self._wait_settled_steps(hwnd, min_seconds, max_seconds)
+        if self.token.is_stopped():
             return False
+        self.metrics.observe(f"settle.{action_id}", elapsed)
+        self.metrics.add_time(f"sleep.{SLEEP_DELAY}", elapsed)
+        if not settled:
+            self.metrics.incr("settle.timeout")
+            if callback:
+                callback(f"画面在 {max_seconds * 1000:.0f}ms 内未稳定")
+        return True
 
-    def _background_combo_key(self, hwnd: int, key_str: str, key_map: dict) -> bool:
-        """后台组合键"""
-        try:
-            parts = [p.strip() for p in key_str.split('+')]
-            modifiers = []
-            main_key = None
+    def _calibrate_delay_steps(self, hwnd: int, delay: float) -> Generator[float, None, bool]:
+        """校准：测量画面稳定所需时间（上限为原延迟的 CALIBRATION_MAX_FACTOR 倍，至少 CALIBRATION_MIN_WINDOW 秒）"""
+        max_seconds = max(delay * CALIBRATION_MAX_FACTOR, CALIBRATION_MIN_WINDOW)
+        elapsed, _ = yield from self._wait_settled_steps(hwnd, 0.0, max_seconds)
+        if self.token.is_stopped():
+            return False
+        self.calibrator.record(self._current_action_id, elapsed)
+        self.metrics.add_time(f"sleep.{SLEEP_DELAY}", elapsed)
+        return True
 
-            for part in parts:
-                if part in ['ctrl', 'alt', 'shift']:
-                    modifiers.append(key_map[part])
-                else:
-                    main_key = part
-
-            # 按下修饰键
-            for mod in modifiers:
-                scan_code = win32api.MapVirtualKey(mod, 0)
-                lparam = (scan_code << 16) | 1
-                win32gui.PostMessage(hwnd, WM_KEYDOWN, mod, lparam)
-                time.sleep(0.02)
-
-            # 按下主键
-            if main_key:
-                if main_key in key_map:
-                    vk_code = key_map[main_key]
-                elif len(main_key) == 1:
-                    vk_code = ord(main_key.upper())
+    def _wait_settled_steps(self, hwnd: int, min_seconds: float,
+                            max_seconds: float) -> Generator[float, None, tuple]:
+        """等待画面稳定，返回 (耗时秒数, 是否稳定)"""
+        start = time.perf_counter()
+        deadline = start + max_seconds
+        previous = None
+        stable = 0
+        settled = False
+        while not self.token.is_stopped():
+            thumb = self.vision.capture_thumbnail(hwnd)
+            if previous is not None and thumb is not None:
+                if self.vision.frame_difference(previous, thumb) < SETTLE_DIFF_THRESHOLD:
+                    stable += 1
                 else:
-                    vk_code = None
-
-                if vk_code:
-                    scan_code = win32api.MapVirtualKey(vk_code, 0)
-                    lparam_down = (scan_code << 16) | 1
-                    lparam_up = (scan_code << 16) | 0xC0000001
-                    
-                    win32gui.PostMessage(hwnd, WM_KEYDOWN, vk_code, lparam_down)
-                    time.sleep(0.05)
-                    win32gui.PostMessage(hwnd, WM_KEYUP, vk_code, lparam_up)
-
-            # 释放修饰键
-            for mod in reversed(modifiers):
-                scan_code = win32api.MapVirtualKey(mod, 0)
-                lparam = (scan_code << 16) | 0xC0000001
-                win32gui.PostMessage(hwnd, WM_KEYUP, mod, lparam)
-                time.sleep(0.02)
+                    stable = 0
+            previous = thumb
+            now = time.perf_counter()
+            if stable >= SETTLE_STABLE_SAMPLES and now - start >= min_seconds:
+                settled = True
+                break
+            if now >= deadline:
+                break
+            yield min(SETTLE_SAMPLE_INTERVAL, deadline - now)
+        return time.perf_counter() - start, settled
+
+    def _op_snapshot(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> bool:
+        self._verify_baseline = self.vision.capture_thumbnail(hwnd)
+        return True
 
-            return True
-        except Exception as e:
-            print(f"后台组合键失败: {e}")
+    def _verify_steps(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> Generator[float, None, bool]:
+        """检查操作后条件，未满足时重新执行操作，最多 retries 次"""
+        _, condition, target, timeout, retries, body = op
+        check = self._verify_handlers[condition]
+        for attempt in range(retries + 1):
+            if attempt > 0:
+                self.metrics.incr("verify.retry")
+                if callback:
+                    callback(f"验证未通过，重试 {attempt}/{retries}")
+                for body_op in body:
+                    if not (yield from self._op_steps(hwnd, body_op, callback)):
+                        return False
+
+            deadline = time.perf_counter() + timeout
+            interval = WAIT_POLL_MIN
+            while not self.token.is_stopped():
+                if check(hwnd, target):
+                    self.metrics.incr("verify.ok")
+                    if condition == PostCondition.SCENE_CHANGED:
+                        self.scene_finished = True
+                    return True
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                yield min(interval, remaining)
+                interval = min(interval * WAIT_POLL_BACKOFF, WAIT_POLL_MAX)
+            if self.token.is_stopped():
+                return False
+
+        self.metrics.incr("verify.failed")
+        if callback:
+            callback(f"验证失败: {PostCondition.get_display_name(condition)}")
+        return False
+
+    def _verify_frame_changed(self, hwnd: int, target) -> bool:
+        thumb = self.vision.capture_thumbnail(hwnd)
+        if thumb is None or self._verify_baseline is None:
+            return False
+        return self.vision.frame_difference(self._verify_baseline, thumb) >= VERIFY_CHANGE_THRESHOLD
+
+    def _verify_anchor_appeared(self, hwnd: int, target: tuple) -> bool:
+        return self._condition_template(hwnd, target, 0.0)
+
+    def _verify_scene_changed(self, hwnd: int, target) -> bool:
+        if self.current_scene is None:
+            return False
+        return not self.vision.scene_matches(hwnd, self.current_scene, not_before=self.last_input_at)
+
+    def _condition_template(self, hwnd: int, target: tuple, max_age: float) -> bool:
+        template_path, roi, threshold = target
+        point = self.vision.find_template(hwnd, template_path, roi, threshold,
+                                          max_age=max_age, not_before=self.last_input_at)
+        return point is not None
+
+    def _condition_pixel(self, hwnd: int, target: tuple, max_age: float) -> bool:
+        (x, y), color, tolerance = target
+        offset_x, offset_y = self.window_manager.get_client_offset(hwnd)
+        return self.vision.check_pixel(hwnd, x + offset_x, y + offset_y, color, tolerance,
+                                       max_age=max_age, not_before=self.last_input_at)
+
+    def _text_steps(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> Generator[float, None, bool]:
+        """按回退顺序尝试文本输入方式，记录每种方式的耗时和失败次数"""
+        for strategy in op[2]:
+            start = time.perf_counter()
+            try:
+                ok = yield from self._text_handlers[strategy](hwnd, op, callback)
+            except Exception as e:
+                if callback:
+                    callback(f"文本输入失败 [{strategy.value}]: {e}")
+                ok = False
+            if ok:
+                self.metrics.add_time(f"text.{strategy.value}", time.perf_counter() - start)
+                return True
+            self.metrics.incr(f"text.{strategy.value}.failed")
+            if self.token.is_stopped():
+                return False
+        return False
+
+    def _resolve_edit_child(self, hwnd: int, point: tuple, callback: Optional[Callable]) -> Optional[int]:
+        """
+        确定输入的目标编辑控件：窗口自身 → 操作坐标处的控件 → 当前焦点控件 → 唯一的编辑控件；
+        有多个编辑控件且无法确定时返回 None，交给下一种输入方式
+        """
+        wm = self.window_manager
+        if wm.is_edit_control(hwnd):
+            return hwnd
+        at_point = self.find_child_at_point(hwnd, *point)
+        if at_point != hwnd and wm.is_edit_control(at_point):
+            return at_point
+        focus = wm.get_focused_child(hwnd)
+        if focus and wm.is_edit_control(focus):
+            return focus
+        edits = wm.find_edit_children(hwnd)
+        if len(edits) == 1:
+            return edits[0]
+        if edits and callback:
+            callback(f"窗口中有 {len(edits)} 个编辑控件，无法确定输入目标，改用下一种方式")
+        return None
+
+    @staticmethod
+    def _text_length(hwnd: int) -> Optional[int]:
+        """控件文本长度，控件无响应时返回 None"""
+        try:
+            _, length = win32gui.SendMessageTimeout(hwnd, WM_GETTEXTLENGTH, 0, 0,
+                                                    SMTO_ABORTIFHUNG, SEND_TIMEOUT_MS)
+            return length
+        except Exception:
+            return None
+
+    def _text_set_text(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> Generator[float, None, bool]:
+        """WM_SETTEXT 直接设置编辑控件内容（覆盖原内容）"""
+        edit = self._resolve_edit_child(hwnd, op[5], callback)
+        if not edit:
+            return False
+        _, result = win32gui.SendMessageTimeout(edit, WM_SETTEXT, 0, op[1],
+                                                SMTO_ABORTIFHUNG, SEND_TIMEOUT_MS)
+        return bool(result)
+        yield  # 没有等待，仅为与其他输入方式一致写成生成器
+
+    def _text_clipboard(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> Generator[float, None, bool]:
+        """
+        剪贴板粘贴：有编辑控件时同步发送 WM_PASTE，否则向焦点控件投递 ctrl+v。
+        以控件文本长度是否变化判断是否粘贴成功，无法确认时返回 False 交给下一种方式
+        """
+        try:
+            import pyperclip
+        except ImportError:
             return False
+        _, text, _, _, paste_ops, point = op
 
-    def _background_input_text(self, hwnd: int, text: str) -> bool:
-        """后台输入文本"""
+        edit = self._resolve_edit_child(hwnd, point, callback)
+        target = edit or self.window_manager.get_focused_child(hwnd)
+        if not target:
+            if callback:
+                callback("未找到可确认粘贴结果的控件，改用下一种方式")
+            return False
+
+        # 其他项目占用剪贴板时排队（等待交给驱动方），期间可被停止；
+        # 锁可能在另一个线程释放（步骤模式下每一步可能在不同线程执行），因此用 Lock 而不是 RLock
+        while not _clipboard_lock.acquire(blocking=False):
+            if self.token.is_stopped():
+                return False
+            yield CLIPBOARD_LOCK_POLL
         try:
-            for char in text:
-                # 使用 WM_CHAR 发送字符
-                win32gui.PostMessage(hwnd, WM_CHAR, ord(char), 0)
-                time.sleep(0.02)
-            return True
-        except Exception as e:
-            print(f"后台输入文本失败: {e}")
+            before = self._text_length(target)
+            previous = pyperclip.paste()
+            pyperclip.copy(text)
+            try:
+                if edit:
+                    # WM_PASTE 是同步处理的，返回时粘贴已完成
+                    win32gui.SendMessageTimeout(edit, WM_PASTE, 0, 0, SMTO_ABORTIFHUNG, SEND_TIMEOUT_MS)
+                else:
+                    for paste_op in paste_ops:
+                        if not (yield from self._op_steps(hwnd, paste_op, callback)):
+                            return False
+                    # 投递的按键是异步处理的：等待一段时间并做一次同步往返，
+                    # 让目标处理完 ctrl+v（读取剪贴板）后再恢复
+                    yield CLIPBOARD_SETTLE
+                    self._probe_window(hwnd)
+            finally:
+                pyperclip.copy(previous)
+            after = self._text_length(target)
+        finally:
+            _clipboard_lock.release()
+
+        if before is None or after is None or after == before:
+            if callback:
+                callback("无法确认剪贴板粘贴结果，改用下一种方式")
             return False
+        return True
 
-    def _wait(self, milliseconds: int) -> bool:
-        """等待"""
-        start_time = time.time()
-        while (time.time() - start_time) * 1000 < milliseconds:
-            if self._stop_flag:
+    def _text_chunked(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> Generator[float, None, bool]:
+        """批量投递 WM_CHAR，批内不休眠，批间只让出一次"""
+        text = op[1]
+        for i in range(0, len(text), TEXT_CHUNK_SIZE):
+            if self.token.is_stopped():
                 return False
-            time.sleep(0.1)
+            if i:
+                yield 0
+            for char in text[i:i + TEXT_CHUNK_SIZE]:
+                self._post(hwnd, WM_CHAR, ord(char), 0)
         return True
 
-    def find_child_at_point(self, hwnd: int, x: int, y: int) -> int:
-        """查找指定位置的子窗口"""
+    def _text_per_char(self, hwnd: int, op: tuple, callback: Optional[Callable]) -> Generator[float, None, bool]:
+        """逐字投递 WM_CHAR，字符之间按时间配置等待（步骤模式下交给驱动方），停止后不再继续输入"""
+        text, char_interval = op[1], op[3]
+        slept = 0.0
         try:
-            # 转换为屏幕坐标
-            rect = win32gui.GetWindowRect(hwnd)
-            screen_x = rect[0] + x
-            screen_y = rect[1] + y
-            
-            # 查找该位置的窗口
-            child = win32gui.WindowFromPoint((screen_x, screen_y))
-            
-            # 确保是目标窗口的子窗口
-            if child and (child == hwnd or win32gui.IsChild(hwnd, child)):
-                return child
-            
-            return hwnd
-        except:
-            return hwnd
\ No newline at end of file
+            for char in text:
+                if self.token.is_stopped():
+                    return False
+                # 使用 WM_CHAR 发送字符
+                self._post(hwnd, WM_CHAR, ord(char), 0)
+                if char_interval > 0:
+                    start = time.perf_counter()
+                    yield char_interval
+                    slept += time.perf_counter() - start
+            return True
+        finally:
+            if slept:
+                self.metrics.add_time(f"sleep.{SLEEP_GAP}", slept)
+
+    def find_child_at_point(self, hwnd: int, x: int, y: int) -> int:
+        """查找客户区坐标 (x, y) 处最深的子窗口（不含遮挡窗口），找不到时返回 hwnd"""
+        router = self.child_router or ChildWindowRouter(self.metrics)
+        return router.route(hwnd, x, y)[0]
@@ -0,0 +1,106 @@
+"""延迟校准 - 实测每个操作真正需要的等待时间，给出 delay_after 建议值
+
+校准运行时，每个操作（包括延迟为 0 和启用了等待画面稳定的操作）之后都改为“等待画面稳定”并记录实际耗时；
+运行结束后按百分位 + 余量生成建议，以项目 JSON 的 diff 形式交给用户确认后再写回。
+本模块不依赖 win32/Qt。
+"""
+import difflib
+import json
+import math
+import threading
+from dataclasses import dataclass
+from typing import Dict, List
+from models import Project
+
+
+# 建议值 = 实测耗时的 DEFAULT_PERCENTILE 分位 + DEFAULT_MARGIN_MS，向上取整到 ROUND_MS
+DEFAULT_PERCENTILE = 0.95
+DEFAULT_MARGIN_MS = 50
+ROUND_MS = 10
+# 样本数少于该值的操作不给建议
+MIN_SAMPLES = 3
+# 校准时等待画面稳定的上限为原延迟的倍数，且不少于 CALIBRATION_MIN_WINDOW 秒（延迟为 0 的操作也能测出所需时间）
+CALIBRATION_MAX_FACTOR = 3
+CALIBRATION_MIN_WINDOW = 1.0
+
+
+@dataclass
+class DelayProposal:
+    """单个操作的延迟建议"""
+    scene_name: str
+    action_id: str
+    action_name: str
+    old_delay: int
+    new_delay: int
+    samples: int
+    percentile_ms: float
+    settle_enabled: bool = False    # 操作启用了等待画面稳定，建议值在关闭后才生效
+
+
+def percentile(values: List[float], p: float) -> float:
+    """最近秩法百分位"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p * len(ordered)))
+    return ordered[rank - 1]
+
+
+class DelayCalibrator:
+    """收集校准样本（秒），线程安全"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = {}
+
+    def record(self, action_id: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(action_id, []).append(seconds)
+
+    def samples(self, action_id: str) -> List[float]:
+        with self._lock:
+            return list(self._samples.get(action_id, []))
+
+    def propose(self, project: Project, p: float = DEFAULT_PERCENTILE,
+                margin_ms: int = DEFAULT_MARGIN_MS) -> List[DelayProposal]:
+        """生成与当前值不同的延迟建议"""
+        proposals = []
+        for scene in project.scenes:
+            for action in scene.actions:
+                values = self.samples(action.id)
+                if len(values) < MIN_SAMPLES:
+                    continue
+                needed_ms = percentile(values, p) * 1000
+                new_delay = int(math.ceil((needed_ms + margin_ms) / ROUND_MS) * ROUND_MS)
+                if new_delay == action.delay_after:
+                    continue
+                proposals.append(DelayProposal(scene.name, action.id, action.name,
+                                               action.delay_after, new_delay,
+                                               len(values), needed_ms, action.settle_enabled))
+        return proposals
+
+
+def apply_proposals(project: Project, proposals: List[DelayProposal]) -> int:
+    """把建议写回项目，返回修改的操作数"""
+    new_delays = {p.action_id: p.new_delay for p in proposals}
+    changed = 0
+    for scene in project.scenes:
+        for action in scene.actions:
+            if action.id in new_delays:
+                action.delay_after = new_delays[action.id]
+                changed += 1
+    return changed
+
+
+def proposal_diff(project: Project, proposals: List[DelayProposal]) -> str:
+    """应用建议前后项目 JSON 的 unified diff（不修改传入的项目）"""
+    before = project.to_dict()
+    updated = Project.from_dict(before)
+    apply_proposals(updated, proposals)
+    after = updated.to_dict()
+    filename = f"{project.id}.json"
+    return "".join(difflib.unified_diff(
+        json.dumps(before, ensure_ascii=False, indent=2).splitlines(keepends=True),
+        json.dumps(after, ensure_ascii=False, indent=2).splitlines(keepends=True),
+        fromfile=f"a/{filename}", tofile=f"b/{filename}"
+    ))
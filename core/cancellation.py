@@ -0,0 +1,60 @@
+"""取消令牌 - 基于 threading.Event 的停止/暂停信号
+
+所有等待都挂在事件上，停止或恢复时立即唤醒，不再按固定间隔轮询标志位。
+"""
+import threading
+import time
+from typing import Optional
+
+
+class CancellationToken:
+    """停止/暂停令牌，同一个项目的工作线程与执行器共享一个实例"""
+
+    def __init__(self):
+        self._stopped = threading.Event()
+        self._resumed = threading.Event()
+        self._resumed.set()
+        # 请求停止的时刻（perf_counter），用于统计停止响应延迟
+        self.stop_requested_at: Optional[float] = None
+
+    def stop(self):
+        if not self._stopped.is_set():
+            self.stop_requested_at = time.perf_counter()
+            self._stopped.set()
+        # 同时唤醒暂停中的等待
+        self._resumed.set()
+
+    def pause(self):
+        if not self._stopped.is_set():
+            self._resumed.clear()
+
+    def resume(self):
+        self._resumed.set()
+
+    def reset(self):
+        self.stop_requested_at = None
+        self._stopped.clear()
+        self._resumed.set()
+
+    def is_stopped(self) -> bool:
+        return self._stopped.is_set()
+
+    def is_paused(self) -> bool:
+        return not self._resumed.is_set()
+
+    def wait(self, seconds: float) -> bool:
+        """等待指定秒数，返回 True 表示等满，False 表示期间被停止"""
+        if seconds <= 0:
+            return not self._stopped.is_set()
+        return not self._stopped.wait(seconds)
+
+    def wait_if_paused(self) -> bool:
+        """暂停时阻塞直到恢复或停止，返回 False 表示已停止"""
+        self._resumed.wait()
+        return not self._stopped.is_set()
+
+    def stop_latency(self) -> Optional[float]:
+        """从请求停止到现在经过的秒数，未请求停止时返回 None"""
+        if self.stop_requested_at is None:
+            return None
+        return time.perf_counter() - self.stop_requested_at
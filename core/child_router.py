@@ -0,0 +1,98 @@
+"""子窗口路由 - 把鼠标消息投递给坐标下方的子控件
+
+Qt、内嵌浏览器、老式 MFC 程序的按钮等往往是独立的子窗口，消息必须发给子窗口本身
+（且坐标换算到子窗口客户区）才会生效。命中结果按 (窗口, 客户区尺寸, 坐标分桶) 缓存，
+窗口尺寸变化时整窗失效。
+按下鼠标按钮时固定目标子窗口（模拟 SetCapture），之后的移动和抬起都发给它，直到按钮全部抬起，
+避免拖拽经过其他子窗口时抬起消息发错窗口、按下的控件一直处于按住状态。
+"""
+import win32gui
+from typing import Dict, Tuple
+from .metrics import ExecutionMetrics
+
+
+WM_MOUSEFIRST = 0x0200
+WM_MOUSELAST = 0x020E
+
+CWP_SKIPINVISIBLE = 0x0001
+CWP_SKIPDISABLED = 0x0002
+CWP_SKIPTRANSPARENT = 0x0004
+
+# 坐标分桶大小（像素）：同一桶内的点视为命中同一个子窗口
+BUCKET_SIZE = 4
+# 子窗口嵌套查找的最大深度
+MAX_DEPTH = 8
+
+
+class ChildWindowRouter:
+    """子窗口命中缓存"""
+
+    def __init__(self, metrics: ExecutionMetrics):
+        self.metrics = metrics
+        # (hwnd, 宽, 高, 桶x, 桶y) -> (子窗口, 子窗口原点在父窗口客户区中的 x, y)
+        self._cache: Dict[tuple, Tuple[int, int, int]] = {}
+        self._sizes: Dict[int, Tuple[int, int]] = {}
+        # hwnd -> 按下按钮时固定的 (子窗口, 原点 x, y)
+        self._captured: Dict[int, Tuple[int, int, int]] = {}
+
+    @staticmethod
+    def is_mouse_message(msg: int) -> bool:
+        return WM_MOUSEFIRST <= msg <= WM_MOUSELAST
+
+    def update_size(self, hwnd: int, width: int, height: int):
+        """记录客户区尺寸，尺寸变化时清除该窗口的缓存"""
+        if self._sizes.get(hwnd) != (width, height):
+            self.invalidate(hwnd)
+            self._sizes[hwnd] = (width, height)
+
+    def invalidate(self, hwnd: int):
+        for key in [k for k in self._cache if k[0] == hwnd]:
+            del self._cache[key]
+        self._captured.pop(hwnd, None)
+
+    def capture(self, hwnd: int, x: int, y: int):
+        """按下按钮：固定 (x, y) 处的子窗口为之后鼠标消息的目标（已固定时保持不变）"""
+        if hwnd not in self._captured:
+            self._captured[hwnd] = self._hit(hwnd, x, y)
+
+    def release_capture(self, hwnd: int):
+        self._captured.pop(hwnd, None)
+
+    def route(self, hwnd: int, x: int, y: int) -> Tuple[int, int, int]:
+        """返回 (目标窗口, 目标客户区 x, y)，有固定目标时发给固定目标"""
+        hit = self._captured.get(hwnd) or self._hit(hwnd, x, y)
+        child, origin_x, origin_y = hit
+        return child, x - origin_x, y - origin_y
+
+    def _hit(self, hwnd: int, x: int, y: int) -> Tuple[int, int, int]:
+        """(子窗口, 原点 x, y)，按坐标分桶缓存"""
+        width, height = self._sizes.get(hwnd, (0, 0))
+        key = (hwnd, width, height, x // BUCKET_SIZE, y // BUCKET_SIZE)
+        hit = self._cache.get(key)
+        if hit is None:
+            self.metrics.incr("child_route.miss")
+            hit = self._cache[key] = self._resolve(hwnd, x, y)
+        else:
+            self.metrics.incr("child_route.hit")
+        return hit
+
+    def _resolve(self, hwnd: int, x: int, y: int) -> Tuple[int, int, int]:
+        """逐层 ChildWindowFromPointEx 找到最深的子窗口"""
+        flags = CWP_SKIPINVISIBLE | CWP_SKIPDISABLED | CWP_SKIPTRANSPARENT
+        try:
+            screen_x, screen_y = win32gui.ClientToScreen(hwnd, (x, y))
+            target = hwnd
+            for _ in range(MAX_DEPTH):
+                cx, cy = win32gui.ScreenToClient(target, (screen_x, screen_y))
+                child = win32gui.ChildWindowFromPointEx(target, (cx, cy), flags)
+                if not child or child == target:
+                    break
+                target = child
+
+            if target == hwnd:
+                return hwnd, 0, 0
+            origin = win32gui.ClientToScreen(target, (0, 0))
+            origin_x, origin_y = win32gui.ScreenToClient(hwnd, origin)
+            return target, origin_x, origin_y
+        except Exception:
+            return hwnd, 0, 0
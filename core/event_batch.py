@@ -0,0 +1,104 @@
+"""执行事件合并 - 工作线程只入队，GUI 线程定时取出并按项目合并
+
+工作线程中的回调只向 queue.SimpleQueue 追加一个元组（C 实现，入队不经过 Python 层的锁），
+GUI 线程按固定频率 drain()，把同一项目在这一周期内的事件合并为一个 ProjectEventBatch：
+日志按顺序累积，进度/当前操作/状态只保留最后一次。结束与校准结果不会被合并丢弃。
+本模块不依赖 Qt。
+"""
+import queue
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from .project_runner import RunnerListener
+
+
+# 每次 drain 最多处理的事件数，剩余的留到下一周期，避免一次占用 GUI 线程太久
+MAX_EVENTS_PER_DRAIN = 5000
+
+_LOG = "log"
+_SCENE = "scene"
+_ACTION = "action"
+_PROGRESS = "progress"
+_STATUS = "status"
+_FINISHED = "finished"
+_CALIBRATED = "calibrated"
+
+
+@dataclass
+class ProjectEventBatch:
+    """一个项目在一个周期内的合并事件"""
+    project_id: str
+    logs: List[str] = field(default_factory=list)
+    scene: Optional[str] = None
+    action: Optional[str] = None
+    progress: Optional[Tuple[int, int]] = None
+    status: Optional[str] = None
+    finished: Optional[Tuple[bool, str]] = None
+    proposals: Optional[list] = None
+
+
+class EventBatcher(RunnerListener):
+    """把执行事件放入队列的监听器，可被多个项目、多个线程共用"""
+
+    def __init__(self):
+        self._events = queue.SimpleQueue()
+        # 最近一次 drain 前的队列深度及历史最大值
+        self.last_depth = 0
+        self.max_depth = 0
+
+    def on_log(self, project_id: str, message: str):
+        self._events.put((_LOG, project_id, message))
+
+    def on_scene(self, project_id: str, scene_name: str):
+        self._events.put((_SCENE, project_id, scene_name))
+
+    def on_action(self, project_id: str, action_name: str):
+        self._events.put((_ACTION, project_id, action_name))
+
+    def on_progress(self, project_id: str, current: int, total: int):
+        self._events.put((_PROGRESS, project_id, (current, total)))
+
+    def on_status(self, project_id: str, status: str):
+        self._events.put((_STATUS, project_id, status))
+
+    def on_finished(self, project_id: str, success: bool, message: str):
+        self._events.put((_FINISHED, project_id, (success, message)))
+
+    def on_calibrated(self, project_id: str, proposals: List):
+        self._events.put((_CALIBRATED, project_id, proposals))
+
+    def pending(self) -> int:
+        """当前队列深度（近似值）"""
+        return self._events.qsize()
+
+    def drain(self, max_events: int = MAX_EVENTS_PER_DRAIN) -> List[ProjectEventBatch]:
+        """取出队列中的事件并按项目合并，按各项目首个事件的先后顺序返回"""
+        depth = self._events.qsize()
+        self.last_depth = depth
+        self.max_depth = max(self.max_depth, depth)
+
+        batches: Dict[str, ProjectEventBatch] = {}
+        for _ in range(max_events):
+            try:
+                kind, project_id, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            batch = batches.get(project_id)
+            if batch is None:
+                batch = batches[project_id] = ProjectEventBatch(project_id)
+            if kind == _LOG:
+                batch.logs.append(payload)
+            elif kind == _SCENE:
+                batch.scene = payload
+                batch.logs.append(f"场景: {payload}")
+            elif kind == _ACTION:
+                batch.action = payload
+                batch.logs.append(f"操作: {payload}")
+            elif kind == _PROGRESS:
+                batch.progress = payload
+            elif kind == _STATUS:
+                batch.status = payload
+            elif kind == _FINISHED:
+                batch.finished = payload
+            elif kind == _CALIBRATED:
+                batch.proposals = payload
+        return list(batches.values())
@@ -1,156 +1,95 @@
 """执行管理器 - 管理多个项目的并行执行"""
 import time
-from typing import Dict, Optional, Callable, List
-from PyQt5.QtCore import QObject, QThread, pyqtSignal
-from models import Project, Scene
+from typing import Dict, Optional, List
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
+from models import Project
 from .window_manager import WindowManager
-from .scene_manager import SceneManager
-from .background_executor import BackgroundExecutor
+from .metrics import ExecutionMetrics, TimingStat
+from .project_runner import ProjectRunner, RunnerListener
+from .task_pool import TaskPool, TaskHandle, DEFAULT_POOL_SIZE
+from .async_engine import AsyncEngine
+from .recognition_scheduler import RecognitionScheduler
+from .event_batch import EventBatcher
+from .project_manager import ProjectManager
+from .supervisor import WorkerSupervisor, SupervisionRecord
+
+
+# GUI 线程取出并合并执行事件的间隔（毫秒），约 15 次/秒
+EVENT_DRAIN_INTERVAL_MS = 66
+# 停止时等待执行结束的上限（秒），stop_all 对所有项目共用这一上限
+STOP_TIMEOUT = 3.0
+# 检查崩溃/卡住项目及到期重启的间隔（毫秒）
+SUPERVISE_INTERVAL_MS = 1000
 
 
 class ProjectExecutionWorker(QThread):
-    """项目执行工作线程"""
-    
-    # 信号定义
-    log_signal = pyqtSignal(str, str)  # project_id, message
-    scene_changed = pyqtSignal(str, str)  # project_id, scene_name
-    action_executed = pyqtSignal(str, str)  # project_id, action_name
-    progress_signal = pyqtSignal(str, int, int)  # project_id, current, total
-    status_changed = pyqtSignal(str, str)  # project_id, status
-    finished_signal = pyqtSignal(str, bool, str)  # project_id, success, message
-
-    def __init__(self, project: Project, hwnd: int):
+    """项目执行工作线程（执行流程见 ProjectRunner，执行事件交给 listener，通常是共用的 EventBatcher）"""
+
+    def __init__(self, project: Project, hwnd: int, listener: RunnerListener, calibrate_loops: int = 0):
         super().__init__()
         self.project = project
         self.hwnd = hwnd
         self.project_id = project.id
-        
-        self.window_manager = WindowManager()
-        self.scene_manager = SceneManager()
-        self.executor = BackgroundExecutor()
-        
-        self._stop_flag = False
-        self._pause_flag = False
+        self.runner = ProjectRunner(project, hwnd, listener, calibrate_loops)
+        self.metrics = self.runner.metrics
+        self.token = self.runner.token
+        self.executor = self.runner.executor
+        # 在共享线程池 / asyncio 引擎中执行时的任务句柄（TaskHandle 或 AsyncTask）
+        self._task: Optional[TaskHandle] = None
 
     def run(self):
         """执行项目"""
-        try:
-            self.status_changed.emit(self.project_id, "running")
-            loop_count = 0
-            max_loops = self.project.max_loop_count if self.project.loop_execution else 1
-
-            while not self._stop_flag:
-                loop_count += 1
-                self.log_signal.emit(self.project_id, f"=== 开始第 {loop_count} 轮执行 ===")
-
-                # 检查窗口
-                if not self.window_manager.is_window_valid(self.hwnd):
-                    self.finished_signal.emit(self.project_id, False, "目标窗口已关闭")
-                    return
-
-                # 识别或获取场景
-                scene = self._get_current_scene()
-                if not scene:
-                    self.finished_signal.emit(self.project_id, False, "没有可执行的场景")
-                    return
-
-                self.scene_changed.emit(self.project_id, scene.name)
-                self.log_signal.emit(self.project_id, f"当前场景: {scene.name}")
-
-                # 执行场景
-                success = self._execute_scene(scene)
-                
-                if not success and self._stop_flag:
-                    self.finished_signal.emit(self.project_id, False, "已停止")
-                    return
-
-                # 检查循环
-                if not self.project.loop_execution:
-                    break
-
-                if max_loops > 0 and loop_count >= max_loops:
-                    self.log_signal.emit(self.project_id, f"已达到最大循环次数: {max_loops}")
-                    break
-
-                # 循环间隔
-                self._wait_with_check(self.project.recognize_interval / 1000)
-
-            self.finished_signal.emit(self.project_id, True, "执行完成")
-
-        except Exception as e:
-            self.finished_signal.emit(self.project_id, False, f"执行错误: {str(e)}")
-        finally:
-            self.status_changed.emit(self.project_id, "stopped")
-
-    def _get_current_scene(self) -> Optional[Scene]:
-        """获取当前场景"""
-        if self.project.auto_recognize_scene:
-            scene = self.scene_manager.recognize_scene(
-                self.hwnd,
-                self.project.get_enabled_scenes()
-            )
-            if scene:
-                return scene
-        
-        return self.project.get_default_scene()
-
-    def _execute_scene(self, scene: Scene) -> bool:
-        """执行场景中的操作"""
-        actions = scene.get_enabled_actions()
-        total = len(actions)
+        self.runner.run()
 
-        for i, action in enumerate(actions):
-            if self._stop_flag:
-                return False
+    def start_in_pool(self, pool: TaskPool):
+        """不占用独立线程，作为协作任务提交到共享线程池"""
+        self.runner.defer_waits = True
+        self._task = pool.submit(self.runner.steps(), name=self.project_id)
 
-            while self._pause_flag:
-                time.sleep(0.1)
-                if self._stop_flag:
-                    return False
+    def start_async(self, engine: AsyncEngine):
+        """作为协程在 asyncio 引擎中执行"""
+        self.runner.defer_waits = True
+        self._task = engine.submit(self.runner.steps(), name=self.project_id)
 
-            self.progress_signal.emit(self.project_id, i + 1, total)
-            self.action_executed.emit(self.project_id, action.name)
-
-            def log_callback(msg):
-                self.log_signal.emit(self.project_id, msg)
-
-            success = self.executor.execute_action(action, self.hwnd, log_callback)
-            
-            if not success:
-                self.log_signal.emit(self.project_id, f"操作失败: {action.name}")
-
-        return True
-
-    def _wait_with_check(self, seconds: float):
-        """等待并检查停止标志"""
-        start_time = time.time()
-        while time.time() - start_time < seconds:
-            if self._stop_flag:
-                break
-            time.sleep(0.1)
+    def wait_finished(self, timeout: float) -> bool:
+        """等待执行结束，返回是否已结束"""
+        if self._task is not None:
+            return self._task.wait(timeout)
+        return self.wait(int(timeout * 1000))
 
     def stop(self):
         """停止执行"""
-        self._stop_flag = True
-        self.executor.stop()
+        self.runner.stop()
+        if self._task is not None:
+            # 正在等待的任务立即唤醒，尽快结束
+            self._task.wake()
 
     def pause(self):
         """暂停执行"""
-        self._pause_flag = True
-        self.executor.pause()
-        self.status_changed.emit(self.project_id, "paused")
+        self.runner.pause()
 
     def resume(self):
         """恢复执行"""
-        self._pause_flag = False
-        self.executor.resume()
-        self.status_changed.emit(self.project_id, "running")
+        self.runner.resume()
+        if self._task is not None:
+            self._task.wake()
+
+    def apply_changes(self, project: Project):
+        """提交修改后的项目，在下一轮开始前生效"""
+        self.project = project
+        self.runner.apply_changes(project)
+
+    def is_active(self) -> bool:
+        """独立线程或线程池任务是否仍在执行"""
+        if self._task is not None:
+            return not self._task.done()
+        return self.isRunning()
 
     def is_running(self) -> bool:
-        return self.isRunning() and not self._stop_flag
+        return self.is_active() and not self.token.is_stopped()
 
     def is_paused(self) -> bool:
-        return self._pause_flag
+        return self.token.is_paused()
 
 
 class ExecutionManager(QObject):
@@ -159,10 +98,10 @@ class ExecutionManager(QObject):
     # 汇总信号
     project_started = pyqtSignal(str)  # project_id
     project_stopped = pyqtSignal(str)  # project_id
-    project_log = pyqtSignal(str, str)  # project_id, message
-    project_progress = pyqtSignal(str, int, int)  # project_id, current, total
-    project_status = pyqtSignal(str, str)  # project_id, status
+    project_events = pyqtSignal(str, object)  # project_id, ProjectEventBatch（每周期每项目一次）
     project_finished = pyqtSignal(str, bool, str)  # project_id, success, message
+    project_calibrated = pyqtSignal(str, object)  # project_id, List[DelayProposal]
+    project_restarted = pyqtSignal(str, int, str)  # project_id, 累计自动重启次数, 原因
 
     _instance = None
 
@@ -179,13 +118,86 @@ class ExecutionManager(QObject):
         self._initialized = True
         self._workers: Dict[str, ProjectExecutionWorker] = {}
         self.window_manager = WindowManager()
-
-    def start_project(self, project: Project) -> tuple:
-        """启动项目执行"""
+        # 共享线程池，None 表示每个项目一个独立线程
+        self._pool: Optional[TaskPool] = None
+        # 全局识别调度：按项目优先级和并发/CPU 预算放行场景识别
+        self.recognition_scheduler = RecognitionScheduler()
+        # asyncio 引擎（启用时优先于线程池）
+        self._engine: Optional[AsyncEngine] = None
+        # 所有项目的执行事件先入队，GUI 线程定时取出并按项目合并后发出
+        self._events = EventBatcher()
+        self._event_timer = QTimer(self)
+        self._event_timer.setInterval(EVENT_DRAIN_INTERVAL_MS)
+        self._event_timer.timeout.connect(self._drain_events)
+        # 项目保存后自动应用到正在运行的执行（下一轮开始前生效）
+        ProjectManager().add_save_listener(self.apply_project_changes)
+        # 崩溃/卡住的项目按退避策略自动重启（校准运行除外）
+        self.supervisor = WorkerSupervisor()
+        self.auto_restart = True
+        self._restart_projects: Dict[str, Project] = {}
+        # 卡住后未能停止、已被新执行替换的旧工作对象，退出后再释放
+        self._abandoned: List[ProjectExecutionWorker] = []
+        self._supervise_timer = QTimer(self)
+        self._supervise_timer.setInterval(SUPERVISE_INTERVAL_MS)
+        self._supervise_timer.timeout.connect(self._supervise)
+
+    @property
+    def pool_size(self) -> int:
+        return self._pool.size if self._pool else 0
+
+    def set_pool_size(self, size: int):
+        """
+        设置共享线程池大小，0 表示每个项目一个独立线程。
+        只影响之后启动的项目，已在旧线程池中运行的项目继续运行到结束
+        """
+        if size == self.pool_size:
+            return
+        old_pool = self._pool
+        self._pool = TaskPool(size) if size > 0 else None
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    @property
+    def async_engine_enabled(self) -> bool:
+        return self._engine is not None
+
+    def set_async_engine(self, enabled: bool):
+        """
+        启用/停用 asyncio 引擎：每个项目一个协程，阻塞调用在 pool_size 个工作线程中执行
+        （未设置线程池大小时使用 DEFAULT_POOL_SIZE）。只影响之后启动的项目
+        """
+        if enabled == self.async_engine_enabled:
+            return
+        old_engine = self._engine
+        self._engine = AsyncEngine(self.pool_size or DEFAULT_POOL_SIZE) if enabled else None
+        if old_engine is not None:
+            old_engine.shutdown(wait=False)
+
+    def set_recognition_budget(self, max_concurrent: int, cpu_target: float = 0.0):
+        """设置全局识别预算：最多同时识别 max_concurrent 个项目，cpu_target > 0 时本进程 CPU 占用超过该百分比也暂缓"""
+        self.recognition_scheduler.configure(max_concurrent, cpu_target)
+
+    def get_queue_wait(self, project_id: str) -> TimingStat:
+        """项目识别排队等待时间的统计"""
+        return self.recognition_scheduler.queue_wait(project_id)
+
+    def set_auto_restart(self, enabled: bool):
+        """启用/停用崩溃或卡住后的自动重启，停用时取消已安排的重启"""
+        self.auto_restart = enabled
+        if not enabled:
+            for project_id in list(self._restart_projects):
+                self._cancel_restart(project_id)
+
+    def get_supervision(self, project_id: str) -> Optional[SupervisionRecord]:
+        """项目的自动重启次数、卡住时长等监督记录"""
+        return self.supervisor.get_record(project_id)
+
+    def start_project(self, project: Project, calibrate_loops: int = 0, restart: bool = False) -> tuple:
+        """启动项目执行，calibrate_loops > 0 时以校准模式运行指定轮数；restart 表示由监督器自动重启"""
         # 检查是否已在运行
         if project.id in self._workers:
             worker = self._workers[project.id]
-            if worker.isRunning():
+            if worker.is_active():
                 return False, "项目已在运行中"
 
         # 查找目标窗口
@@ -194,32 +206,30 @@ class ExecutionManager(QObject):
             return False, f"未找到目标窗口: {project.target_window_title}"
 
         # 创建工作线程
-        worker = ProjectExecutionWorker(project, window.hwnd)
-        
-        # 连接信号
-        worker.log_signal.connect(self.project_log.emit)
-        worker.progress_signal.connect(self.project_progress.emit)
-        worker.status_changed.connect(self.project_status.emit)
-        worker.finished_signal.connect(self._on_worker_finished)
-        worker.scene_changed.connect(lambda pid, s: self.project_log.emit(pid, f"场景: {s}"))
-        worker.action_executed.connect(lambda pid, a: self.project_log.emit(pid, f"操作: {a}"))
+        worker = ProjectExecutionWorker(project, window.hwnd, self._events, calibrate_loops)
+        worker.runner.recognition_scheduler = self.recognition_scheduler
 
         self._workers[project.id] = worker
-        worker.start()
+        if not restart:
+            self.supervisor.reset(project.id)
+        if not self._event_timer.isActive():
+            self._event_timer.start()
+        if not self._supervise_timer.isActive():
+            self._supervise_timer.start()
+        if self._engine is not None:
+            worker.start_async(self._engine)
+        elif self._pool is not None:
+            worker.start_in_pool(self._pool)
+        else:
+            worker.start()
         
         self.project_started.emit(project.id)
         return True, "已启动"
 
-    def stop_project(self, project_id: str):
-        """停止项目执行"""
-        if project_id in self._workers:
-            worker = self._workers[project_id]
-            if worker.isRunning():
-                worker.stop()
-                worker.wait(3000)  # 等待最多3秒
-                if worker.isRunning():
-                    worker.terminate()
-            self.project_stopped.emit(project_id)
+    def stop_project(self, project_id: str, timeout: float = STOP_TIMEOUT) -> bool:
+        """停止项目执行，返回是否在 timeout 内结束"""
+        self._cancel_restart(project_id)
+        return not self._stop_workers([project_id], timeout)
 
     def pause_project(self, project_id: str):
         """暂停项目执行"""
@@ -231,10 +241,38 @@ class ExecutionManager(QObject):
         if project_id in self._workers:
             self._workers[project_id].resume()
 
-    def stop_all(self):
-        """停止所有项目"""
-        for project_id in list(self._workers.keys()):
-            self.stop_project(project_id)
+    def apply_project_changes(self, project: Project) -> bool:
+        """把修改后的项目应用到正在运行的执行（下一轮开始前整体替换），项目未运行时返回 False"""
+        worker = self._workers.get(project.id)
+        if worker is None or not worker.is_running():
+            return False
+        worker.apply_changes(project)
+        return True
+
+    def stop_all(self, timeout: float = STOP_TIMEOUT) -> List[str]:
+        """并行停止所有项目，总耗时不超过 timeout，返回未能按时结束的项目ID"""
+        for project_id in list(self._restart_projects):
+            self._cancel_restart(project_id)
+        return self._stop_workers(list(self._workers.keys()), timeout)
+
+    def _stop_workers(self, project_ids: List[str], timeout: float) -> List[str]:
+        """
+        先向所有项目发出停止请求，再在同一截止时间内等待它们结束。
+        执行在各阻塞点响应停止并自行释放按键和截图资源，不强制终止线程；
+        超时未结束的项目会在下一个阻塞点退出，返回它们的ID
+        """
+        workers = [(pid, self._workers[pid]) for pid in project_ids if pid in self._workers]
+        for _, worker in workers:
+            if worker.is_active():
+                worker.stop()
+        deadline = time.perf_counter() + timeout
+        unfinished = []
+        for project_id, worker in workers:
+            if worker.is_active() and not worker.wait_finished(max(0.0, deadline - time.perf_counter())):
+                unfinished.append(project_id)
+                print(f"项目 {project_id} 未能在 {timeout:.0f} 秒内停止，将在下一个等待点退出")
+            self.project_stopped.emit(project_id)
+        return unfinished
 
     def is_running(self, project_id: str) -> bool:
         """检查项目是否正在运行"""
@@ -248,13 +286,98 @@ class ExecutionManager(QObject):
             return self._workers[project_id].is_paused()
         return False
 
+    def get_metrics(self, project_id: str) -> Optional[ExecutionMetrics]:
+        """获取运行中项目的执行统计"""
+        if project_id in self._workers:
+            return self._workers[project_id].metrics
+        return None
+
     def get_running_projects(self) -> List[str]:
         """获取正在运行的项目ID列表"""
         return [pid for pid, worker in self._workers.items() if worker.is_running()]
 
-    def _on_worker_finished(self, project_id: str, success: bool, message: str):
-        """工作线程完成回调"""
-        self.project_finished.emit(project_id, success, message)
-        if project_id in self._workers:
-            self._workers[project_id].deleteLater()
-            del self._workers[project_id]
\ No newline at end of file
+    def event_queue_depth(self) -> tuple:
+        """执行事件队列深度：(当前, 最近一次取出前, 历史最大)"""
+        return self._events.pending(), self._events.last_depth, self._events.max_depth
+
+    def _drain_events(self):
+        """GUI 线程定时取出执行事件，每个项目发出一次合并后的事件；全部项目结束且队列为空时停止定时器"""
+        for batch in self._events.drain():
+            project_id = batch.project_id
+            self.project_events.emit(project_id, batch)
+            if batch.proposals is not None:
+                self.project_calibrated.emit(project_id, batch.proposals)
+            if batch.finished is not None:
+                self.project_finished.emit(project_id, *batch.finished)
+        self._remove_finished_workers()
+        if not self._events.pending() and not self._workers:
+            self._event_timer.stop()
+
+    def _remove_finished_workers(self):
+        """移除已执行完且线程/任务已退出的工作对象，因异常结束的安排自动重启"""
+        for project_id, worker in list(self._workers.items()):
+            if worker.runner.is_finished() and not worker.is_active():
+                if worker.runner.error is not None and self._supervised(worker):
+                    self._schedule_restart(worker.project, f"执行错误: {worker.runner.error}")
+                worker.deleteLater()
+                del self._workers[project_id]
+        for worker in [w for w in self._abandoned if not w.is_active()]:
+            self._abandoned.remove(worker)
+            worker.deleteLater()
+
+    # ---------- 自动重启 ----------
+
+    def _supervised(self, worker: ProjectExecutionWorker) -> bool:
+        return (self.auto_restart and worker.runner.calibrate_loops == 0
+                and not self.supervisor.is_pending(worker.project_id))
+
+    def _supervise(self):
+        """定时检查：卡住的项目请求停止并安排重启，到期的重启重新启动；无事可做时停止定时器"""
+        now = time.perf_counter()
+        for worker in list(self._workers.values()):
+            if not worker.is_running() or not self._supervised(worker):
+                continue
+            stall = self.supervisor.stall_duration(worker.runner, now)
+            if stall > 0:
+                self._schedule_restart(worker.project, f"{stall:.0f} 秒无心跳，判定为卡住", stall)
+                worker.stop()
+        for project_id in self.supervisor.due(now):
+            self._restart(project_id)
+        if not self._workers and not self._restart_projects:
+            self._supervise_timer.stop()
+
+    def _schedule_restart(self, project: Project, reason: str, stall: float = 0.0):
+        delay = self.supervisor.schedule_restart(project.id, reason, stall)
+        if delay is None:
+            self._restart_projects.pop(project.id, None)
+            policy = self.supervisor.policy
+            self._events.on_log(project.id, f"{reason}；{policy.crash_window:.0f} 秒内已自动重启 "
+                                            f"{policy.max_restarts} 次，不再自动重启")
+            return
+        self._restart_projects[project.id] = project
+        self._events.on_log(project.id, f"{reason}，{delay:.0f} 秒后自动重启")
+        if not self._supervise_timer.isActive():
+            self._supervise_timer.start()
+
+    def _cancel_restart(self, project_id: str):
+        self._restart_projects.pop(project_id, None)
+        self.supervisor.cancel(project_id)
+
+    def _restart(self, project_id: str):
+        project = self._restart_projects.pop(project_id, None)
+        if project is None:
+            return
+        old = self._workers.get(project_id)
+        if old is not None and old.is_active():
+            # 卡住的执行仍未响应停止：不再转发它的事件，由新执行接替
+            old.runner.listener = RunnerListener()
+            old.runner.abandoned = True
+            self._abandoned.append(old)
+            del self._workers[project_id]
+            self._events.on_log(project_id, "卡住的执行未能停止，已由新的执行接替")
+        success, message = self.start_project(project, restart=True)
+        if success:
+            record = self.supervisor.get_record(project_id)
+            self.project_restarted.emit(project_id, record.restarts, record.last_reason)
+        else:
+            self._schedule_restart(project, f"自动重启失败: {message}")
\ No newline at end of file
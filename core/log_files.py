@@ -0,0 +1,40 @@
+"""执行日志文件 - 每个项目一个按大小轮转的日志文件
+
+界面只保留最近的日志行，完整日志写入 data/logs/{project_id}.log，
+超过 LOG_MAX_BYTES 时轮转为 .1 ~ .LOG_BACKUP_COUNT。本模块不依赖 Qt。
+"""
+import logging
+import os
+from logging.handlers import RotatingFileHandler
+from typing import List
+
+
+LOG_DIR = "data/logs"
+LOG_MAX_BYTES = 2 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+
+class ProjectLogFile:
+    """项目执行日志文件，每次写入一批已带时间戳的行"""
+
+    def __init__(self, project_id: str, log_dir: str = LOG_DIR):
+        self.path = os.path.join(log_dir, f"{project_id}.log")
+        self._handler = None
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            self._handler = RotatingFileHandler(self.path, maxBytes=LOG_MAX_BYTES,
+                                                backupCount=LOG_BACKUP_COUNT, encoding="utf-8",
+                                                delay=True)
+        except Exception as e:
+            print(f"创建日志文件失败: {self.path} {e}")
+
+    def write_lines(self, lines: List[str]):
+        if self._handler is None or not lines:
+            return
+        record = logging.makeLogRecord({"msg": "\n".join(lines)})
+        self._handler.handle(record)
+
+    def close(self):
+        if self._handler is not None:
+            self._handler.close()
+            self._handler = None
@@ -0,0 +1,161 @@
+"""执行统计 - 按项目汇总的计时与计数"""
+import bisect
+import threading
+from typing import Dict, Tuple
+
+
+class TimingStat:
+    """计时统计（秒）"""
+
+    __slots__ = ("count", "total", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        if self.count == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+class Histogram:
+    """固定分桶的耗时分布（秒），桶上界按毫秒给出，最后一桶为溢出桶"""
+
+    BOUNDS_MS: Tuple[int, ...] = (10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    __slots__ = ("counts", "stat")
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.stat = TimingStat()
+
+    def add(self, value: float):
+        self.counts[bisect.bisect_left(self.BOUNDS_MS, value * 1000)] += 1
+        self.stat.add(value)
+
+    def percentile(self, p: float) -> float:
+        """近似百分位（秒）：返回所在桶的上界，溢出桶返回最大值"""
+        total = self.stat.count
+        if total == 0:
+            return 0.0
+        rank = p * total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if i < len(self.BOUNDS_MS):
+                    return min(self.BOUNDS_MS[i] / 1000, self.stat.max)
+                return self.stat.max
+        return self.stat.max
+
+    def format(self) -> str:
+        """非空桶的文字描述，如 ≤50ms:3 ≤100ms:1 >5000ms:1"""
+        parts = []
+        for i, count in enumerate(self.counts):
+            if not count:
+                continue
+            label = f"≤{self.BOUNDS_MS[i]}ms" if i < len(self.BOUNDS_MS) else f">{self.BOUNDS_MS[-1]}ms"
+            parts.append(f"{label}:{count}")
+        return " ".join(parts)
+
+    def to_dict(self) -> dict:
+        data = self.stat.to_dict()
+        data["buckets_ms"] = list(self.BOUNDS_MS)
+        data["counts"] = list(self.counts)
+        return data
+
+
+class ExecutionMetrics:
+    """执行统计（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings: Dict[str, TimingStat] = {}
+        self._counters: Dict[str, int] = {}
+        self._histograms: Dict[str, Histogram] = {}
+
+    def add_time(self, name: str, seconds: float):
+        with self._lock:
+            stat = self._timings.get(name)
+            if stat is None:
+                stat = self._timings[name] = TimingStat()
+            stat.add(seconds)
+
+    def observe(self, name: str, seconds: float):
+        """记录一次耗时到分布统计"""
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = Histogram()
+            hist.add(seconds)
+
+    def get_histogram(self, name: str) -> Histogram:
+        """返回分布统计的副本"""
+        with self._lock:
+            copy = Histogram()
+            hist = self._histograms.get(name)
+            if hist:
+                copy.counts = list(hist.counts)
+                stat = hist.stat
+                copy.stat.count, copy.stat.total, copy.stat.min, copy.stat.max = (
+                    stat.count, stat.total, stat.min, stat.max)
+            return copy
+
+    def histogram_names(self, prefix: str = "") -> list:
+        with self._lock:
+            return [name for name in self._histograms if name.startswith(prefix)]
+
+    def incr(self, name: str, n: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def get_timing(self, name: str) -> TimingStat:
+        """返回计时统计的副本"""
+        with self._lock:
+            copy = TimingStat()
+            stat = self._timings.get(name)
+            if stat:
+                copy.count, copy.total, copy.min, copy.max = stat.count, stat.total, stat.min, stat.max
+            return copy
+
+    def total_time(self, name: str) -> float:
+        with self._lock:
+            stat = self._timings.get(name)
+            return stat.total if stat else 0.0
+
+    def counter(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "timings": {k: v.to_dict() for k, v in self._timings.items()},
+                "counters": dict(self._counters),
+                "histograms": {k: v.to_dict() for k, v in self._histograms.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+            self._histograms.clear()
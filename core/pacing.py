@@ -0,0 +1,58 @@
+"""投递节流 - 根据目标窗口的响应速度自适应调整 PostMessage 速率
+
+每投递若干条消息，同步发送一次 WM_NULL（SendMessageTimeout），其往返时间反映了
+目标线程消息队列的积压程度：往返变慢或超时就拉大投递间隔，响应迅速则逐步缩小。
+"""
+import time
+from typing import Callable, Optional
+from .metrics import ExecutionMetrics
+
+
+class MessagePacer:
+    """投递节流器（每个执行器一个）"""
+
+    PROBE_EVERY = 16            # 每投递多少条消息探测一次
+    TARGET_RTT = 0.005          # 期望的往返时间（秒），超过则降速
+    MIN_INTERVAL = 0.001        # 开始降速时的最小投递间隔
+    MAX_INTERVAL = 0.05         # 投递间隔上限
+
+    def __init__(self, probe: Callable[[int], Optional[float]],
+                 sleep: Callable[[float], bool], metrics: ExecutionMetrics):
+        """
+        probe: 同步探测目标窗口，返回往返秒数，超时或失败返回 None
+        sleep: 可被停止打断的等待函数
+        """
+        self._probe = probe
+        self._sleep = sleep
+        self.metrics = metrics
+        self.interval = 0.0
+        self._since_probe = 0
+
+    def before_post(self, hwnd: int):
+        """每次投递前调用：按需探测并执行当前的投递间隔"""
+        delay = self.delay_before_post(hwnd)
+        if delay > 0:
+            start = time.perf_counter()
+            self._sleep(delay)
+            self.metrics.add_time("sleep.pacing", time.perf_counter() - start)
+
+    def delay_before_post(self, hwnd: int) -> float:
+        """每次投递前调用：按需探测，返回投递前应等待的秒数（由调用方等待）"""
+        self._since_probe += 1
+        if self._since_probe >= self.PROBE_EVERY:
+            self._since_probe = 0
+            self._adapt(hwnd, self._probe(hwnd))
+        return self.interval
+
+    def _adapt(self, hwnd: int, rtt: Optional[float]):
+        if rtt is None:
+            # 超时：目标可能已挂起或严重积压，直接降到最慢
+            self.metrics.incr(f"rtt.{hwnd:#x}.timeout")
+            self.interval = self.MAX_INTERVAL
+            return
+
+        self.metrics.add_time(f"rtt.{hwnd:#x}", rtt)
+        if rtt > self.TARGET_RTT:
+            self.interval = min(max(self.interval * 2, self.MIN_INTERVAL), self.MAX_INTERVAL)
+        elif rtt < self.TARGET_RTT / 2:
+            self.interval = self.interval / 2 if self.interval > self.MIN_INTERVAL else 0.0
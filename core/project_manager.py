@@ -2,7 +2,7 @@
 import os
 import shutil
 import json
-from typing import List, Optional, Dict
+from typing import Callable, List, Optional, Dict
 from models import Project
 import uuid
 
@@ -19,6 +19,7 @@ class ProjectManager:
             cls._instance.data_dir = data_dir
             cls._instance._projects = []
             cls._instance._groups = {}  # group_id -> group_name
+            cls._instance._save_listeners = []  # 项目保存后的回调 (project)
             os.makedirs(data_dir, exist_ok=True)
             cls._instance._load_groups()
             cls._instance.load_all_projects()
@@ -129,6 +130,16 @@ class ProjectManager:
 
     def save_project(self, project: Project):
         project.save(self.data_dir)
+        for listener in self._save_listeners:
+            try:
+                listener(project)
+            except Exception as e:
+                print(f"项目保存回调出错: {e}")
+
+    def add_save_listener(self, listener: Callable[[Project], None]):
+        """注册项目保存后的回调（如把修改应用到正在运行的执行）"""
+        if listener not in self._save_listeners:
+            self._save_listeners.append(listener)
 
     def delete_project(self, project_id: str) -> bool:
         project = self.get_project(project_id)
@@ -0,0 +1,539 @@
+"""项目执行流程 - 不依赖 Qt 的单个项目执行循环
+
+ProjectRunner 把一次项目执行写成生成器：每轮识别并执行场景，轮与轮之间的等待以
+yield 秒数的形式交还给驱动方（defer_waits 时操作中的各种等待和识别排队也是）。驱动方可以是独占线程（run()，直接在取消令牌上等待），
+也可以是共享线程池（等待变成定时器条目，不占用线程）。
+执行过程中的日志、进度、状态通过 RunnerListener 回调通知。
+执行只读启动时取的 ProjectSnapshot，保存的修改经 apply_changes 在两轮之间整体替换，
+只重建有变化的场景程序和识别配置，场景跳转状态和循环计数保留。
+"""
+import time
+from typing import Generator, List, Optional
+from models import Project, Scene
+from .window_manager import WindowManager
+from .scene_manager import SceneManager
+from .background_executor import BackgroundExecutor, FRAME_MAX_AGE
+from .action_compiler import SLEEP_GAP, SLEEP_DELAY, expected_duration
+from .metrics import ExecutionMetrics
+from .cancellation import CancellationToken
+from .calibration import DelayCalibrator
+from .recognition_pool import RecognitionPool
+from .recognition_scheduler import RecognitionScheduler
+from .project_snapshot import ProjectSnapshot
+
+
+# defer_waits 模式下暂停时每次交还驱动方的等待秒数（恢复时会被提前唤醒）
+PAUSE_WAIT = 1.0
+# defer_waits 模式下识别排队时检查是否放行的间隔（秒）
+ADMIT_STEP_INTERVAL = 0.02
+# 每轮的耗时、定时抖动、目标响应只记入统计，每隔该秒数（以及执行结束时）汇总输出一次
+LOOP_STATS_INTERVAL = 60.0
+
+
+class RunnerListener:
+    """执行事件回调（默认全部忽略），回调可能在任意工作线程中触发"""
+
+    def on_log(self, project_id: str, message: str):
+        pass
+
+    def on_scene(self, project_id: str, scene_name: str):
+        pass
+
+    def on_action(self, project_id: str, action_name: str):
+        pass
+
+    def on_progress(self, project_id: str, current: int, total: int):
+        pass
+
+    def on_status(self, project_id: str, status: str):
+        pass
+
+    def on_finished(self, project_id: str, success: bool, message: str):
+        pass
+
+    def on_calibrated(self, project_id: str, proposals: List):
+        pass
+
+
+class ProjectRunner:
+    """单个项目的执行流程"""
+
+    def __init__(self, project: Project, hwnd: int,
+                 listener: Optional[RunnerListener] = None, calibrate_loops: int = 0):
+        # 执行期间只读的项目快照；apply_changes 提交的新快照在下一轮开始前替换
+        self.snapshot = ProjectSnapshot.take(project)
+        self._pending_snapshot: Optional[ProjectSnapshot] = None
+        self.hwnd = hwnd
+        self.project_id = project.id
+        self.listener = listener or RunnerListener()
+
+        self.window_manager = WindowManager()
+        self.scene_manager = SceneManager()
+        self.metrics = ExecutionMetrics()
+        self.token = CancellationToken()
+        self.executor = BackgroundExecutor(self.metrics, self.token, self.scene_manager)
+        self.executor.scheduler.configure(project.late_policy, project.late_tolerance)
+        self.executor.set_pacing(project.pacing_enabled)
+        self.executor.set_child_routing(project.route_to_child)
+        # 校准模式：固定运行 calibrate_loops 轮，测量每个操作实际需要的延迟
+        self.calibrate_loops = calibrate_loops
+        self.calibrator = DelayCalibrator() if calibrate_loops > 0 else None
+        self.executor.calibrator = self.calibrator
+        self.executor.compiler.calibrating = self.calibrator is not None
+        # 场景跳转状态：上一个执行的场景及其连续执行次数
+        self._last_scene_id: Optional[str] = None
+        self._scene_repeats = 0
+        # 执行结果 (success, message)，结束前为 None；因异常结束时 error 为该异常
+        self.result: Optional[tuple] = None
+        self.error: Optional[Exception] = None
+        # 卡住后已由新的执行接替（同一项目ID）：结束时不再释放识别进程和识别调度中的登记，
+        # 这些登记已属于新的执行
+        self.abandoned = False
+        # 轮次统计上次汇总输出的时刻和当时的累计值
+        self._loop_stats_at = time.perf_counter()
+        self._loop_stats_base = self._loop_totals()
+        # 心跳：最近一次有进展的时刻，以及到下一次心跳前正常需要的秒数（供监督器判断是否卡住）
+        self.last_beat = time.perf_counter()
+        self.beat_budget = 0.0
+        # 为 True 时等待操作、操作后延迟和暂停也以 yield 交给驱动方，不占用执行线程
+        self.defer_waits = False
+        # 进程池识别，None 表示在当前线程中识别
+        self.recognition_pool: Optional[RecognitionPool] = (
+            RecognitionPool() if project.process_recognition else None
+        )
+        # 全局识别调度（由驱动方设置），None 表示识别不排队
+        self.recognition_scheduler: Optional[RecognitionScheduler] = None
+        self._interval_factor = 1.0
+
+    @property
+    def project(self) -> Project:
+        """当前快照中的项目（只读）"""
+        return self.snapshot.project
+
+    def apply_changes(self, project: Project):
+        """
+        提交修改后的项目：在调用线程中生成新快照，执行线程在下一轮开始前整体替换，
+        正在执行的场景不受影响。多次提交时只应用最后一次（未生效前连续保存不会重复重建）。
+        """
+        self._pending_snapshot = ProjectSnapshot.take(project, self.snapshot.version + 1)
+
+    @property
+    def expected_tick(self) -> float:
+        """正常情况下两轮之间的间隔（秒）"""
+        return self.project.recognize_interval * self._interval_factor / 1000
+
+    def _beat(self, budget: float = 0.0):
+        self.last_beat = time.perf_counter()
+        self.beat_budget = budget
+
+    def run(self):
+        """在当前线程中执行到结束，轮间等待挂在取消令牌上"""
+        for delay in self.steps():
+            self.token.wait(delay)
+
+    def steps(self) -> Generator[float, None, None]:
+        """执行生成器：每次 yield 继续前需要等待的秒数（驱动方可提前唤醒）"""
+        try:
+            self.listener.on_status(self.project_id, "running")
+            if self.recognition_pool is not None:
+                self._register_recognition()
+            if self.recognition_scheduler is not None:
+                self.recognition_scheduler.register(self.project_id, self.project.priority)
+            yield from self._loop()
+        except Exception as e:
+            self.error = e
+            self._finish(False, f"执行错误: {str(e)}")
+        finally:
+            # 无论以何种方式结束，都抬起仍按住的键和鼠标按钮
+            released = self.executor.release_held(self.hwnd)
+            if released:
+                self._log(f"已释放 {released} 个未抬起的按键/鼠标按钮")
+            if self.result is None:
+                # 生成器在等待中被驱动方关闭
+                self._finish(False, self._stopped_message())
+            if self.recognition_pool is not None and not self.abandoned:
+                self.recognition_pool.release(self.project_id)
+            self._log_loop_stats()
+            self._log_settle_histograms()
+            self._log_recognition_stats()
+            if self.recognition_scheduler is not None and not self.abandoned:
+                self.recognition_scheduler.unregister(self.project_id)
+            self.listener.on_status(self.project_id, "stopped")
+
+    def _loop(self) -> Generator[float, None, None]:
+        loop_count = 0
+        max_loops = self.project.max_loop_count if self.project.loop_execution else 1
+        if self.calibrator:
+            max_loops = self.calibrate_loops
+            self._log(f"校准模式：运行 {max_loops} 轮，测量操作后实际所需延迟")
+
+        while not self.token.is_stopped():
+            self._beat()
+            self._swap_snapshot()
+            loop_count += 1
+            self._log(f"=== 开始第 {loop_count} 轮执行 ===")
+            loop_start = time.perf_counter()
+
+            # 检查窗口
+            if not self.window_manager.is_window_valid(self.hwnd):
+                self._finish(False, "目标窗口已关闭")
+                return
+
+            # 识别或获取场景
+            scene = yield from self._get_current_scene()
+            if not scene:
+                self._finish(False, "没有可执行的场景")
+                return
+
+            self.listener.on_scene(self.project_id, scene.name)
+            self._log(f"当前场景: {scene.name}")
+
+            # 执行场景
+            success = yield from self._execute_scene(scene)
+            self._record_scene(scene)
+
+            if not success and self.token.is_stopped():
+                self._finish(False, self._stopped_message())
+                return
+
+            self.metrics.add_time("loop.time", time.perf_counter() - loop_start)
+            if time.perf_counter() - self._loop_stats_at >= LOOP_STATS_INTERVAL:
+                self._log_loop_stats()
+
+            # 检查循环
+            if not self.project.loop_execution and not self.calibrator:
+                break
+
+            if max_loops > 0 and loop_count >= max_loops:
+                self._log(f"已达到最大循环次数: {max_loops}")
+                break
+
+            # 循环间隔：场景已通过验证提前结束时立即重新识别
+            if self.executor.scene_finished:
+                self.metrics.incr("scene.early_exit")
+                self._log("已离开当前场景，立即重新识别")
+            else:
+                interval = self._next_interval()
+                self._beat(interval)
+                yield interval
+
+        if self.token.is_stopped():
+            self._finish(False, self._stopped_message())
+            return
+        if self.calibrator:
+            proposals = self.calibrator.propose(self.project)
+            self._log(f"校准完成，{len(proposals)} 个操作的延迟建议调整")
+            self.listener.on_calibrated(self.project_id, proposals)
+        self._finish(True, "执行完成")
+
+    def _swap_snapshot(self):
+        """安全点（两轮之间）：应用已提交的新快照，只重建有变化的部分"""
+        pending, self._pending_snapshot = self._pending_snapshot, None
+        if pending is None:
+            return
+        old = self.snapshot
+        diff = pending.diff(old)
+        self.snapshot = pending
+        project = pending.project
+        self.executor.scheduler.configure(project.late_policy, project.late_tolerance)
+        self.executor.set_pacing(project.pacing_enabled)
+        self.executor.set_child_routing(project.route_to_child)
+        if self.recognition_scheduler is not None:
+            self.recognition_scheduler.register(self.project_id, project.priority)
+        # 上一个场景被删除、停用或识别配置改变时，不能再据它推断下一个场景
+        if self._last_scene_id is not None:
+            last = pending.get_scene(self._last_scene_id)
+            if (last is None or not last.enabled
+                    or pending.recognition_keys.get(last.id) != old.recognition_keys.get(last.id)):
+                self._last_scene_id = None
+                self._scene_repeats = 0
+
+        # 修改过的场景丢弃旧程序，下次执行时按新版本编译；未修改的场景继续命中缓存
+        if diff.changed_scenes:
+            self.executor.compiler.discard(diff.changed_scenes)
+        # 只丢弃不再使用的模板，仍在使用的模板保留缓存（图片文件被覆盖时按修改时间重新读取）
+        if diff.removed_templates:
+            self.scene_manager.discard_templates(diff.removed_templates)
+        if diff.recognition_changed and self.recognition_pool is not None:
+            # 重复注册会更新识别进程中的场景，已加载的模板不会重新读取
+            self._register_recognition()
+
+        self.metrics.incr("snapshot.applied")
+        parts = []
+        if diff.changed_scenes:
+            parts.append(f"{len(diff.changed_scenes)} 个场景的操作已更新")
+        if diff.recognition_changed:
+            parts.append("识别配置已更新")
+        self._log(f"已应用项目修改（版本 {pending.version}）：{'，'.join(parts) or '场景和识别配置未变化'}")
+
+    def _log(self, message: str):
+        self.listener.on_log(self.project_id, message)
+
+    def _finish(self, success: bool, message: str):
+        self.result = (success, message)
+        self.listener.on_finished(self.project_id, success, message)
+
+    def _get_current_scene(self) -> Generator[float, None, Optional[Scene]]:
+        """获取当前场景：优先按场景跳转预测，预测不成立时再完整识别（defer_waits 时识别排队以 yield 等待）"""
+        predicted = self._predict_next_scene()
+        if predicted is not None:
+            if not self.project.verify_transitions or self.scene_manager.quick_check(
+                    self.hwnd, predicted, FRAME_MAX_AGE, self.executor.last_input_at):
+                self.metrics.incr("recognition.avoided")
+                return predicted
+            self.metrics.incr("transition.mismatch")
+            self._log(f"预期场景「{predicted.name}」未确认，重新识别")
+
+        if self.project.auto_recognize_scene:
+            scenes = list(self.snapshot.enabled_scenes)
+            if self.defer_waits and self.recognition_scheduler is not None:
+                scene = yield from self._scheduled_recognize_steps(scenes)
+            else:
+                scene = self._scheduled_recognize(scenes)
+            if scene:
+                return scene
+        
+        return self.snapshot.default_scene
+
+    def _register_recognition(self):
+        """把项目分配到识别进程，失败时改为线程内识别"""
+        try:
+            index = self.recognition_pool.register(self.project_id, list(self.snapshot.enabled_scenes))
+            self._log(f"场景识别在识别进程 #{index} 中执行")
+        except Exception as e:
+            self._log(f"启动识别进程失败，改为线程内识别: {e}")
+            self.recognition_pool.release(self.project_id)
+            self.recognition_pool = None
+
+    def _scheduled_recognize(self, scenes: List[Scene]) -> Optional[Scene]:
+        """经全局识别调度放行后完整识别，记录排队等待和识别耗时"""
+        if self.recognition_scheduler is None:
+            return self._timed_recognize(scenes)
+        with self.recognition_scheduler.admit(self.project_id, self.token) as waited:
+            if waited is None:
+                return None
+            self.metrics.add_time("recognition.queue_wait", waited)
+            return self._timed_recognize(scenes)
+
+    def _scheduled_recognize_steps(self, scenes: List[Scene]) -> Generator[float, None, Optional[Scene]]:
+        """与 _scheduled_recognize 相同，但排队时 yield 给驱动方，不占用线程"""
+        scheduler = self.recognition_scheduler
+        seq = scheduler.enqueue(self.project_id)
+        waited = scheduler.try_admit(seq)
+        while waited is None:
+            if self.token.is_stopped():
+                scheduler.cancel(seq)
+                return None
+            try:
+                yield ADMIT_STEP_INTERVAL
+            except GeneratorExit:
+                scheduler.cancel(seq)
+                raise
+            waited = scheduler.try_admit(seq)
+        try:
+            self.metrics.add_time("recognition.queue_wait", waited)
+            return self._timed_recognize(scenes)
+        finally:
+            scheduler.release()
+
+    def _timed_recognize(self, scenes: List[Scene]) -> Optional[Scene]:
+        self.metrics.incr("recognition.full")
+        start = time.perf_counter()
+        scene = self._recognize(scenes)
+        self.metrics.add_time("recognition.time", time.perf_counter() - start)
+        return scene
+
+    def _next_interval(self) -> float:
+        """下一轮前的等待秒数：识别排队时低优先级项目按调度器给出的倍数延长"""
+        factor = 1.0
+        if self.recognition_scheduler is not None:
+            factor = self.recognition_scheduler.interval_factor(self.project_id)
+        if factor != self._interval_factor:
+            self._interval_factor = factor
+            if factor > 1.0:
+                self._log(f"识别排队中，识别间隔延长为 {self.project.recognize_interval * factor:.0f}ms")
+            else:
+                self._log("识别不再排队，恢复原识别间隔")
+        return self.project.recognize_interval * factor / 1000
+
+    def _recognize(self, scenes: List[Scene]) -> Optional[Scene]:
+        """完整识别：启用进程池时截图后交给识别进程，识别进程出错时回退到本线程"""
+        if self.recognition_pool is None:
+            return self.scene_manager.recognize_scene(self.hwnd, scenes)
+        frame = self.scene_manager.capture_frame(self.hwnd)
+        if frame is None:
+            return None
+        try:
+            return self.recognition_pool.recognize(self.project_id, frame, scenes)
+        except Exception as e:
+            print(f"识别进程出错，改为线程内识别: {e}")
+            return self.scene_manager.select_scene(frame, scenes, self.scene_manager.load_template)
+
+    def _predict_next_scene(self) -> Optional[Scene]:
+        """根据上一个场景的 loop_count / next_scene_id 推断下一个场景，无法推断时返回 None"""
+        if self._last_scene_id is None:
+            return None
+        last = self.snapshot.get_scene(self._last_scene_id)
+        if last is None or not last.enabled:
+            return None
+        if self._scene_repeats < last.loop_count:
+            return last
+        if last.next_scene_id:
+            next_scene = self.snapshot.get_scene(last.next_scene_id)
+            if next_scene and next_scene.enabled:
+                return next_scene
+        return None
+
+    def _record_scene(self, scene: Scene):
+        """记录已执行的场景，用于推断下一个场景"""
+        if scene.id == self._last_scene_id:
+            self._scene_repeats += 1
+        else:
+            self._last_scene_id = scene.id
+            self._scene_repeats = 1
+        # 已验证离开该场景时不再重复执行
+        if self.executor.scene_finished:
+            self._scene_repeats = max(self._scene_repeats, scene.loop_count)
+
+    def _execute_scene(self, scene: Scene) -> Generator[float, None, bool]:
+        """执行场景中的操作（defer_waits 时 yield 操作间的等待）"""
+        # 每个场景只取一次客户区尺寸，按尺寸获取（缓存的）编译程序
+        _, _, width, height = self.window_manager.get_client_rect(self.hwnd)
+        if width <= 0 or height <= 0:
+            self._log("窗口大小无效")
+            return True
+
+        snapshot = self.snapshot
+        program = self.executor.compiler.get_program(
+            scene, snapshot.scene_versions[scene.id], width, height,
+            snapshot.project.timing_profile, snapshot.enabled_actions.get(scene.id)
+        )
+        total = len(program.actions)
+
+        # 定时操作以场景开始为基准
+        self.executor.begin_scene(self.hwnd, width, height, scene)
+
+        for i, action_program in enumerate(program.actions):
+            if self.defer_waits:
+                while self.token.is_paused() and not self.token.is_stopped():
+                    yield PAUSE_WAIT
+                if self.token.is_stopped():
+                    return False
+            elif not self.token.wait_if_paused():
+                return False
+
+            self.listener.on_progress(self.project_id, i + 1, total)
+            self.listener.on_action(self.project_id, action_program.name)
+            self._beat(expected_duration(action_program.ops))
+
+            if self.defer_waits:
+                success = yield from self.executor.program_steps(action_program, self.hwnd, self._log)
+            else:
+                success = self.executor.run_program(action_program, self.hwnd, self._log)
+            
+            if not success:
+                self._log(f"操作失败: {action_program.name}")
+
+            # 已验证离开当前场景，剩余操作不再适用
+            if self.executor.scene_finished:
+                break
+
+        return True
+
+    def _loop_totals(self) -> tuple:
+        """当前累计值，作为下一次汇总的起点"""
+        return (self.metrics.get_timing("loop.time"),
+                self.metrics.total_time(f"sleep.{SLEEP_GAP}"),
+                self.metrics.total_time(f"sleep.{SLEEP_DELAY}"),
+                self.metrics.get_timing("schedule.jitter"))
+
+    def _log_loop_stats(self):
+        """汇总输出上次输出以来各轮的耗时（及消息间隔、操作后延迟所占比例）、定时操作抖动和目标响应"""
+        loop_before, gap_before, delay_before, jitter_before = self._loop_stats_base
+        self._loop_stats_base = self._loop_totals()
+        self._loop_stats_at = time.perf_counter()
+        loop, gap_total, delay_total, jitter = self._loop_stats_base
+
+        count = loop.count - loop_before.count
+        elapsed = loop.total - loop_before.total
+        if count <= 0 or elapsed <= 0:
+            return
+        gap = gap_total - gap_before
+        delay = delay_total - delay_before
+        self._log(
+            f"最近 {count} 轮 平均耗时 {elapsed / count * 1000:.0f}ms（累计最长 {loop.max * 1000:.0f}ms），"
+            f"消息间隔 {gap / elapsed:.0%}，操作后延迟 {delay / elapsed:.0%}"
+        )
+
+        scheduled = jitter.count - jitter_before.count
+        if scheduled > 0:
+            mean = (jitter.total - jitter_before.total) / scheduled
+            self._log(
+                f"定时操作 {scheduled} 个，平均偏差 {mean * 1000:.2f}ms，累计最大偏差 {jitter.max * 1000:.2f}ms，"
+                f"迟到 {self.metrics.counter('schedule.late')} 次，跳过 {self.metrics.counter('schedule.skipped')} 次"
+            )
+
+        pacer = self.executor.pacer
+        rtt = self.metrics.get_timing(f"rtt.{self.hwnd:#x}")
+        if pacer is not None and rtt.count:
+            self._log(
+                f"目标响应 平均 {rtt.mean * 1000:.1f}ms / 最大 {rtt.max * 1000:.1f}ms，"
+                f"超时 {self.metrics.counter(f'rtt.{self.hwnd:#x}.timeout')} 次，"
+                f"当前投递间隔 {pacer.interval * 1000:.1f}ms"
+            )
+
+    def _log_recognition_stats(self):
+        """输出完整识别的平均耗时，以及场景跳转节省的识别次数"""
+        timing = self.metrics.get_timing("recognition.time")
+        if timing.count:
+            where = "识别进程" if self.recognition_pool is not None else "线程内"
+            self._log(f"场景识别（{where}）{timing.count} 次，平均 {timing.mean * 1000:.1f}ms，"
+                      f"最大 {timing.max * 1000:.1f}ms")
+        queue_wait = self.metrics.get_timing("recognition.queue_wait")
+        if queue_wait.count and queue_wait.max > 0:
+            self._log(f"识别排队 平均 {queue_wait.mean * 1000:.1f}ms / 最大 {queue_wait.max * 1000:.1f}ms")
+        avoided = self.metrics.counter("recognition.avoided")
+        mismatch = self.metrics.counter("transition.mismatch")
+        if avoided == 0 and mismatch == 0:
+            return
+        self._log(
+            f"场景跳转：避免识别 {avoided} 次，预测未确认 {mismatch} 次，"
+            f"完整识别 {self.metrics.counter('recognition.full')} 次"
+        )
+
+    def _log_settle_histograms(self):
+        """输出各操作等待画面稳定的耗时分布"""
+        names = {action.id: action.name
+                 for scene in self.project.scenes for action in scene.actions}
+        for key in sorted(self.metrics.histogram_names("settle.")):
+            hist = self.metrics.get_histogram(key)
+            action_id = key[len("settle."):]
+            self._log(
+                f"画面稳定耗时 [{names.get(action_id, action_id)}] {hist.stat.count} 次，"
+                f"平均 {hist.stat.mean * 1000:.0f}ms，P95≈{hist.percentile(0.95) * 1000:.0f}ms：{hist.format()}"
+            )
+
+    def _stopped_message(self) -> str:
+        """记录停止响应延迟并生成结束消息"""
+        latency = self.token.stop_latency()
+        if latency is None:
+            return "已停止"
+        self.metrics.add_time("stop_latency", latency)
+        return f"已停止（响应 {latency * 1000:.1f}ms）"
+
+    def stop(self):
+        """停止执行"""
+        self.token.stop()
+
+    def pause(self):
+        """暂停执行"""
+        self.token.pause()
+        self.listener.on_status(self.project_id, "paused")
+
+    def resume(self):
+        """恢复执行"""
+        self.token.resume()
+        self.listener.on_status(self.project_id, "running")
+
+    def is_finished(self) -> bool:
+        return self.result is not None
@@ -0,0 +1,95 @@
+"""项目执行快照 - 启动时对项目做一次不可变、预先索引的拷贝
+
+执行期间编辑器仍可修改并保存原项目，执行只读快照，不会读到修改了一半的状态，
+也不用每轮重新筛选启用的场景、排序启用的操作或计算场景版本。
+修改通过 ProjectRunner.apply_changes 生成新快照，在安全点整体替换；
+diff() 给出两份快照之间变化的部分，替换时只重建这些部分。本模块不依赖 win32/Qt。
+"""
+import hashlib
+import json
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import FrozenSet, Mapping, Optional, Tuple
+from models import Project, Scene, Action
+from .action_compiler import scene_version
+
+
+def recognition_key(scene: Scene) -> str:
+    """场景识别配置的指纹：启用状态、整图识别图片和阈值、锚点"""
+    payload = json.dumps({
+        "enabled": scene.enabled,
+        "image": scene.recognition_image_path,
+        "threshold": scene.recognition_threshold,
+        "anchors": [a.to_dict() for a in scene.anchors],
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def template_paths(scenes) -> FrozenSet[str]:
+    """场景用到的全部模板图片路径"""
+    paths = set()
+    for scene in scenes:
+        paths.update(a.image_path for a in scene.anchors if a.image_path)
+        if scene.recognition_image_path:
+            paths.add(scene.recognition_image_path)
+    return frozenset(paths)
+
+
+@dataclass(frozen=True)
+class SnapshotDiff:
+    """两份快照之间的差异"""
+    changed_scenes: FrozenSet[str]      # 启用操作有变化（含新增、删除）的场景ID
+    recognition_changed: bool           # 识别用的场景集合或其锚点/识别图有变化
+    removed_templates: FrozenSet[str]   # 新快照不再使用的模板图片路径
+
+    def is_empty(self) -> bool:
+        return not self.changed_scenes and not self.recognition_changed
+
+
+@dataclass(frozen=True)
+class ProjectSnapshot:
+    """项目的不可变执行快照"""
+    project: Project                                # 取快照时的深拷贝，执行期间只读
+    version: int                                    # 快照序号，每次应用修改加 1
+    scenes: Tuple[Scene, ...]
+    enabled_scenes: Tuple[Scene, ...]
+    default_scene: Optional[Scene]
+    scenes_by_id: Mapping[str, Scene]
+    enabled_actions: Mapping[str, Tuple[Action, ...]]  # 场景ID -> 按 order 排好序的启用操作
+    scene_versions: Mapping[str, str]                  # 场景ID -> 启用操作内容的指纹
+    recognition_keys: Mapping[str, str]                # 场景ID -> 识别配置的指纹
+
+    @classmethod
+    def take(cls, project: Project, version: int = 0) -> 'ProjectSnapshot':
+        """深拷贝项目并建立索引（在调用线程中完成，不影响正在执行的快照）"""
+        copy = Project.from_dict(project.to_dict())
+        scenes = tuple(copy.scenes)
+        return cls(
+            project=copy,
+            version=version,
+            scenes=scenes,
+            enabled_scenes=tuple(s for s in scenes if s.enabled),
+            default_scene=copy.get_default_scene(),
+            scenes_by_id=MappingProxyType({s.id: s for s in scenes}),
+            enabled_actions=MappingProxyType({s.id: tuple(s.get_enabled_actions()) for s in scenes}),
+            scene_versions=MappingProxyType({s.id: scene_version(s) for s in scenes}),
+            recognition_keys=MappingProxyType({s.id: recognition_key(s) for s in scenes}),
+        )
+
+    def get_scene(self, scene_id: str) -> Optional[Scene]:
+        return self.scenes_by_id.get(scene_id)
+
+    def diff(self, older: 'ProjectSnapshot') -> SnapshotDiff:
+        """与旧快照比较，只列出需要重建的部分"""
+        scene_ids = set(self.scene_versions) | set(older.scene_versions)
+        changed = frozenset(sid for sid in scene_ids
+                            if self.scene_versions.get(sid) != older.scene_versions.get(sid))
+        recognition_changed = (
+            [s.id for s in self.enabled_scenes] != [s.id for s in older.enabled_scenes]
+            or dict(self.recognition_keys) != dict(older.recognition_keys)
+        )
+        return SnapshotDiff(
+            changed_scenes=changed,
+            recognition_changed=recognition_changed,
+            removed_templates=template_paths(older.scenes) - template_paths(self.scenes),
+        )
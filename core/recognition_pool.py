@@ -0,0 +1,181 @@
+"""进程池场景识别 - 把 CPU 密集的场景识别放到独立进程，绕开 GIL
+
+matchTemplate 本身会释放 GIL，但 recognize_scene 中的 Python 胶水代码和 numpy 转换仍需持有 GIL，
+十几个项目同时识别时会被串行化。启用后：
+- 每个识别进程是一个单进程的 ProcessPoolExecutor，项目固定分配到其中一个（按已分配项目数最少），
+  该项目的场景和模板只在这个进程中加载一次，之后一直命中缓存；
+- 截图通过每个项目一块的共享内存传递，父进程只做一次内存拷贝，不做 pickle；
+- 识别进程只返回命中的场景 ID。
+
+识别进程的启动和每次调用的往返都有固定开销，项目少时线程内识别更快，
+何时值得开启见 README「进程池识别」一节。
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional
+import numpy as np
+from models import Scene
+from .scene_manager import SceneManager, TemplateCache
+
+
+DEFAULT_RECOGNITION_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+# ---------- 以下函数在识别进程中执行 ----------
+
+_worker_templates = TemplateCache()
+_worker_scenes: Dict[str, List[Scene]] = {}
+_worker_frames: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def _worker_register(project_id: str, scenes: List[Scene]) -> int:
+    """登记项目的场景并预加载模板，返回加载成功的模板数"""
+    _worker_scenes[project_id] = scenes
+    loaded = 0
+    for scene in scenes:
+        paths = [anchor.image_path for anchor in scene.anchors] + [scene.recognition_image_path]
+        for path in paths:
+            if _worker_templates.load(path) is not None:
+                loaded += 1
+    return loaded
+
+
+def _worker_recognize(project_id: str, shm_name: str, shape: tuple) -> Optional[str]:
+    """识别共享内存中的截图，返回命中场景的 ID"""
+    shm = _worker_frames.get(project_id)
+    if shm is None or shm.name != shm_name:
+        if shm is not None:
+            shm.close()
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _worker_frames[project_id] = shm
+    frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    scene = SceneManager.select_scene(frame, _worker_scenes.get(project_id, []), _worker_templates.load)
+    del frame  # 释放对共享内存的引用，之后才能 close
+    return scene.id if scene else None
+
+
+def _worker_release(project_id: str):
+    _worker_scenes.pop(project_id, None)
+    shm = _worker_frames.pop(project_id, None)
+    if shm is not None:
+        shm.close()
+
+
+# ---------- 父进程 ----------
+
+class RecognitionPool:
+    """识别进程池（单例），项目固定分配到一个识别进程"""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._lock = threading.Lock()
+        self._size = DEFAULT_RECOGNITION_WORKERS
+        self._workers: List[ProcessPoolExecutor] = []
+        self._assigned: Dict[str, int] = {}  # project_id -> 识别进程序号
+        self._frames: Dict[str, shared_memory.SharedMemory] = {}
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def set_size(self, size: int):
+        """设置识别进程数；已有项目在使用时，待它们全部释放后才生效"""
+        with self._lock:
+            self._size = max(1, size)
+            if not self._assigned:
+                self._shutdown_workers()
+
+    def worker_of(self, project_id: str) -> Optional[int]:
+        return self._assigned.get(project_id)
+
+    def register(self, project_id: str, scenes: List[Scene]) -> int:
+        """把项目分配到负载最少的识别进程并预加载其模板，返回进程序号（重复调用会更新场景）"""
+        with self._lock:
+            if not self._workers:
+                self._workers = [ProcessPoolExecutor(max_workers=1) for _ in range(self._size)]
+            index = self._assigned.get(project_id)
+            if index is None:
+                loads = [0] * len(self._workers)
+                for assigned in self._assigned.values():
+                    loads[assigned] += 1
+                index = loads.index(min(loads))
+                self._assigned[project_id] = index
+            worker = self._workers[index]
+        worker.submit(_worker_register, project_id, list(scenes)).result()
+        return index
+
+    def recognize(self, project_id: str, frame: np.ndarray, scenes: List[Scene]) -> Optional[Scene]:
+        """在项目所在的识别进程中识别截图（需先 register）"""
+        with self._lock:
+            worker = self._workers[self._assigned[project_id]]
+            shm = self._frame_buffer(project_id, frame.nbytes)
+        np.ndarray(frame.shape, dtype=np.uint8, buffer=shm.buf)[...] = frame
+        scene_id = worker.submit(_worker_recognize, project_id, shm.name, frame.shape).result()
+        if scene_id is None:
+            return None
+        for scene in scenes:
+            if scene.id == scene_id:
+                return scene
+        return None
+
+    def release(self, project_id: str):
+        """项目结束：通知识别进程丢弃缓存并释放共享内存"""
+        with self._lock:
+            index = self._assigned.pop(project_id, None)
+            shm = self._frames.pop(project_id, None)
+            worker = self._workers[index] if index is not None else None
+            idle = not self._assigned and len(self._workers) != self._size
+        if worker is not None:
+            try:
+                worker.submit(_worker_release, project_id).result()
+            except Exception as e:
+                print(f"释放识别进程缓存失败: {e}")
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        if idle:
+            # 进程数已修改，等最后一个项目释放后再按新数量重建
+            with self._lock:
+                if not self._assigned:
+                    self._shutdown_workers()
+
+    def shutdown(self):
+        with self._lock:
+            frames = list(self._frames.values())
+            self._frames.clear()
+            self._assigned.clear()
+            self._shutdown_workers()
+        for shm in frames:
+            shm.close()
+            shm.unlink()
+
+    # ---------- 内部 ----------
+
+    def _frame_buffer(self, project_id: str, nbytes: int) -> shared_memory.SharedMemory:
+        """项目的截图共享内存，容量不足时重新分配（调用方持有锁）"""
+        shm = self._frames.get(project_id)
+        if shm is not None and shm.size >= nbytes:
+            return shm
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self._frames[project_id] = shm
+        return shm
+
+    def _shutdown_workers(self):
+        for worker in self._workers:
+            worker.shutdown(wait=False)
+        self._workers = []
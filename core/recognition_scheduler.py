@@ -0,0 +1,197 @@
+"""识别调度 - 按项目优先级和全局预算放行场景识别
+
+所有运行中的项目共用一个调度器：同时进行的识别不超过 max_concurrent 个，
+设置了 cpu_target 时系统 CPU 占用超过目标也暂缓放行（至少放行一个，避免饿死）。
+CPU 占用用 psutil 按整机统计（包含识别进程池的子进程）；未安装 psutil 时只能统计本进程。
+排队的识别按优先级高者先、同优先级先到先得放行，并记录每个项目的排队等待时间。
+出现排队时，优先级低于当前最高优先级的项目按差距延长识别间隔。
+admit() 在排队时阻塞调用线程；共享线程池 / asyncio 驱动时改用 enqueue() + try_admit() 轮询，
+排队期间不占用线程。本模块不依赖 win32/Qt。
+"""
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from .metrics import TimingStat
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+DEFAULT_MAX_CONCURRENT = max(1, (os.cpu_count() or 2) // 2)
+# CPU 占用的采样间隔（秒）
+CPU_SAMPLE_INTERVAL = 0.5
+# 排队等待超过该值（秒）视为存在竞争；竞争状态在最后一次排队后保持 CONTENTION_HOLD 秒
+CONTENTION_WAIT = 0.005
+CONTENTION_HOLD = 5.0
+# 竞争时每低一级优先级，识别间隔增加的倍数，以及倍数上限
+INTERVAL_STEP = 0.5
+MAX_INTERVAL_FACTOR = 4.0
+# 排队时检查停止标志的间隔（秒），放行/停止时会被提前唤醒
+ADMIT_POLL_INTERVAL = 0.1
+
+
+class RecognitionScheduler:
+    """全局识别调度器"""
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT, cpu_target: float = 0.0):
+        self.max_concurrent = max(1, max_concurrent)
+        # CPU 占用目标（占全部核心的百分比），0 表示不限制
+        self.cpu_target = cpu_target
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._active = 0
+        self._waiting: Dict[int, tuple] = {}  # 序号 -> (优先级, 项目ID, 排队时刻)
+        self._priorities: Dict[str, int] = {}
+        self._waits: Dict[str, TimingStat] = {}
+        # 已结束项目的排队统计，保留到被 queue_wait 读取一次（或项目重新登记）
+        self._finished_waits: Dict[str, TimingStat] = {}
+        self._contended_until = 0.0
+        self._cpu_sample = (time.perf_counter(), time.process_time())
+        self._cpu_percent = 0.0
+        if psutil is not None:
+            psutil.cpu_percent(interval=None)  # 第一次调用只建立基准
+
+    def configure(self, max_concurrent: int, cpu_target: float = 0.0):
+        with self._cond:
+            self.max_concurrent = max(1, max_concurrent)
+            self.cpu_target = cpu_target
+            self._cond.notify_all()
+
+    def register(self, project_id: str, priority: int):
+        with self._cond:
+            self._priorities[project_id] = priority
+            self._finished_waits.pop(project_id, None)
+            self._waits.setdefault(project_id, TimingStat())
+
+    def unregister(self, project_id: str):
+        with self._cond:
+            self._priorities.pop(project_id, None)
+            stat = self._waits.pop(project_id, None)
+            if stat is not None and stat.count:
+                self._finished_waits[project_id] = stat
+
+    @contextmanager
+    def admit(self, project_id: str, token=None):
+        """
+        排队直到放行后执行 with 块，产出排队等待的秒数；
+        token 已停止时不再等待，产出 None（调用方应跳过识别）
+        """
+        waited = self._acquire(project_id, token)
+        try:
+            yield waited
+        finally:
+            if waited is not None:
+                self.release()
+
+    def enqueue(self, project_id: str) -> int:
+        """不阻塞地排队，返回排队号，之后用 try_admit 轮询（放行后须调用 release）"""
+        with self._cond:
+            seq = next(self._seq)
+            self._waiting[seq] = (self._priorities.get(project_id, 0), project_id, time.perf_counter())
+            return seq
+
+    def try_admit(self, seq: int) -> Optional[float]:
+        """排队号已可放行时出队并返回排队等待的秒数，否则返回 None"""
+        with self._cond:
+            if not self._can_admit(seq):
+                return None
+            return self._admit(seq)
+
+    def cancel(self, seq: int):
+        """放弃排队（如已停止）"""
+        with self._cond:
+            if self._waiting.pop(seq, None) is not None:
+                self._cond.notify_all()
+
+    def release(self):
+        """识别结束，释放放行名额"""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def interval_factor(self, project_id: str) -> float:
+        """识别间隔的放大倍数：无竞争或为最高优先级时为 1"""
+        with self._cond:
+            if time.perf_counter() >= self._contended_until or not self._priorities:
+                return 1.0
+            top = max(self._priorities.values())
+            priority = self._priorities.get(project_id, top)
+            return min(MAX_INTERVAL_FACTOR, 1.0 + (top - priority) * INTERVAL_STEP)
+
+    def queue_wait(self, project_id: str) -> TimingStat:
+        """项目识别排队等待时间的统计副本（已结束项目的统计读取一次后丢弃）"""
+        with self._cond:
+            stat = self._waits.get(project_id) or self._finished_waits.pop(project_id, None)
+            copy = TimingStat()
+            if stat:
+                copy.count, copy.total, copy.min, copy.max = stat.count, stat.total, stat.min, stat.max
+            return copy
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._waiting)
+
+    def active_count(self) -> int:
+        with self._cond:
+            return self._active
+
+    def cpu_percent(self) -> float:
+        """最近的 CPU 占用（占全部核心的百分比，未安装 psutil 时为本进程）"""
+        with self._cond:
+            return self._sample_cpu()
+
+    # ---------- 内部 ----------
+
+    def _acquire(self, project_id: str, token) -> Optional[float]:
+        seq = self.enqueue(project_id)
+        with self._cond:
+            while not self._can_admit(seq):
+                if token is not None and token.is_stopped():
+                    del self._waiting[seq]
+                    self._cond.notify_all()
+                    return None
+                self._cond.wait(ADMIT_POLL_INTERVAL)
+            return self._admit(seq)
+
+    def _admit(self, seq: int) -> float:
+        """调用方持有锁：出队并占用一个名额，记录排队等待"""
+        _, project_id, start = self._waiting.pop(seq)
+        # 本项目出队后，排在后面的项目可能已满足放行条件
+        self._cond.notify_all()
+        self._active += 1
+        waited = time.perf_counter() - start
+        stat = self._waits.get(project_id)
+        if stat is not None:
+            stat.add(waited)
+        if waited >= CONTENTION_WAIT:
+            self._contended_until = time.perf_counter() + CONTENTION_HOLD
+        return waited
+
+    def _can_admit(self, seq: int) -> bool:
+        """调用方持有锁：预算有空余且该请求排在最前（优先级高者先，同级按先后）"""
+        if self._active >= self.max_concurrent:
+            return False
+        if self.cpu_target > 0 and self._active > 0 and self._sample_cpu() > self.cpu_target:
+            return False
+        first = min(self._waiting, key=lambda s: (-self._waiting[s][0], s))
+        return first == seq
+
+    def _sample_cpu(self) -> float:
+        """调用方持有锁：按 CPU_SAMPLE_INTERVAL 更新 CPU 占用"""
+        now = time.perf_counter()
+        last_wall, last_cpu = self._cpu_sample
+        if now - last_wall >= CPU_SAMPLE_INTERVAL:
+            if psutil is not None:
+                # 整机占用，包含识别进程池的子进程
+                self._cpu_percent = psutil.cpu_percent(interval=None)
+                self._cpu_sample = (now, last_cpu)
+            else:
+                cpu = time.process_time()
+                self._cpu_percent = (cpu - last_cpu) / (now - last_wall) / (os.cpu_count() or 1) * 100
+                self._cpu_sample = (now, cpu)
+        return self._cpu_percent
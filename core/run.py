@@ -0,0 +1,169 @@
+"""无界面运行 - 不加载 PyQt5，按项目或分组执行，适合作为服务/由进程守护程序管理
+
+    python -m core.run --project <项目ID或名称> [--project ...] [--group <分组ID或名称>]
+                       [--pool N] [--log-dir data/logs] [--metrics metrics.json]
+
+日志输出到标准输出（--log-dir 时同时写入每个项目的轮转日志文件），
+结束时可把各项目的执行统计写入 JSON 文件。收到 Ctrl+C / SIGTERM 时停止所有项目后退出。
+退出码：0 全部成功，1 有项目失败或被停止，2 参数错误或找不到项目/窗口。
+
+为了冷启动快，执行相关模块在解析完参数后才导入（--help 不加载 win32/cv2）。
+"""
+import argparse
+import json
+import signal
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m core.run", description="无界面运行项目")
+    parser.add_argument("--project", action="append", default=[], metavar="ID",
+                        help="要运行的项目 ID 或名称，可重复")
+    parser.add_argument("--group", action="append", default=[], metavar="ID",
+                        help="运行该分组（ID 或名称）中的全部项目，可重复")
+    parser.add_argument("--data-dir", default="data/projects", help="项目目录（默认 data/projects）")
+    parser.add_argument("--pool", type=int, default=0, metavar="N",
+                        help="共享线程池大小，0 表示每个项目一个线程（默认）")
+    parser.add_argument("--log-dir", default="", help="同时把日志写入该目录下的 {项目ID}.log（按大小轮转）")
+    parser.add_argument("--metrics", default="", metavar="FILE", help="结束时把执行统计写入该 JSON 文件")
+    parser.add_argument("--quiet", action="store_true", help="不在标准输出打印日志")
+    args = parser.parse_args(argv)
+    if not args.project and not args.group:
+        parser.error("至少指定一个 --project 或 --group")
+    return args
+
+
+def _select_projects(manager, args: argparse.Namespace) -> list:
+    """按参数选出项目（保持去重后的指定顺序），找不到时抛出 LookupError"""
+    projects = manager.get_all_projects()
+    selected = []
+    for key in args.project:
+        matches = [p for p in projects if p.id == key] or [p for p in projects if p.name == key]
+        if not matches:
+            raise LookupError(f"未找到项目: {key}")
+        selected.append(matches[0])
+    groups = manager.get_groups()
+    for key in args.group:
+        group_id = key if key in groups else next((gid for gid, name in groups.items() if name == key), None)
+        if group_id is None:
+            raise LookupError(f"未找到分组: {key}")
+        selected.extend(manager.get_projects_by_group(group_id))
+    unique = {}
+    for project in selected:
+        unique.setdefault(project.id, project)
+    return list(unique.values())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+
+    from models import Project
+    from .project_manager import ProjectManager
+    from .window_manager import WindowManager
+    from .project_runner import ProjectRunner, RunnerListener
+    from .recognition_scheduler import RecognitionScheduler
+    from .task_pool import TaskPool
+    from .log_files import ProjectLogFile
+
+    class ConsoleListener(RunnerListener):
+        """把执行事件打印到标准输出（并写入日志文件），多个项目线程共用"""
+
+        def __init__(self, names: Dict[str, str]):
+            self._names = names
+            self._lock = threading.Lock()
+            self._files: Dict[str, ProjectLogFile] = {}
+
+        def open_log(self, project_id: str, log_dir: str):
+            self._files[project_id] = ProjectLogFile(project_id, log_dir)
+
+        def close(self):
+            for log_file in self._files.values():
+                log_file.close()
+
+        def on_log(self, project_id: str, message: str):
+            line = f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] [{self._names.get(project_id, project_id)}] {message}"
+            with self._lock:
+                if not args.quiet:
+                    print(line, flush=True)
+                log_file = self._files.get(project_id)
+                if log_file is not None:
+                    log_file.write_lines([line])
+
+        def on_scene(self, project_id: str, scene_name: str):
+            self.on_log(project_id, f"场景: {scene_name}")
+
+        def on_action(self, project_id: str, action_name: str):
+            self.on_log(project_id, f"操作: {action_name}")
+
+        def on_status(self, project_id: str, status: str):
+            self.on_log(project_id, f"状态: {status}")
+
+        def on_finished(self, project_id: str, success: bool, message: str):
+            self.on_log(project_id, f"{'完成' if success else '结束'}: {message}")
+
+    try:
+        projects: List[Project] = _select_projects(ProjectManager(args.data_dir), args)
+    except LookupError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if not projects:
+        print("没有可运行的项目", file=sys.stderr)
+        return 2
+
+    window_manager = WindowManager()
+    listener = ConsoleListener({p.id: p.name for p in projects})
+    scheduler = RecognitionScheduler()
+    runners: List[ProjectRunner] = []
+    for project in projects:
+        window = window_manager.find_window_by_title(project.target_window_title)
+        if not window:
+            print(f"[{project.name}] 未找到目标窗口: {project.target_window_title}", file=sys.stderr)
+            return 2
+        if args.log_dir:
+            listener.open_log(project.id, args.log_dir)
+        runner = ProjectRunner(project, window.hwnd, listener)
+        runner.recognition_scheduler = scheduler
+        runners.append(runner)
+
+    def request_stop(signum=None, frame=None):
+        for r in runners:
+            r.stop()
+        for task in tasks:
+            task.wake()
+
+    tasks = []
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    pool = TaskPool(args.pool) if args.pool > 0 else None
+    threads = []
+    for runner in runners:
+        if pool is not None:
+            runner.defer_waits = True
+            tasks.append(pool.submit(runner.steps(), name=runner.project_id))
+        else:
+            thread = threading.Thread(target=runner.run, name=runner.project_id, daemon=True)
+            thread.start()
+            threads.append(thread)
+
+    # 短间隔等待，保证主线程能及时响应 Ctrl+C
+    while any(t.is_alive() for t in threads) or any(not t.done() for t in tasks):
+        time.sleep(0.2)
+    if pool is not None:
+        pool.shutdown()
+    listener.close()
+
+    if args.metrics:
+        snapshot = {r.project_id: {"name": r.project.name, "result": r.result,
+                                   "metrics": r.metrics.snapshot()} for r in runners}
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=2)
+
+    return 0 if all(r.result and r.result[0] for r in runners) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,159 @@
 """场景管理器"""
+import threading
+import time
 import cv2
 import numpy as np
 from PIL import Image
-from typing import Optional, List
+from typing import Optional, List, Tuple, Callable
 import os
 from models import Scene
 from .window_manager import WindowManager
 
 
+class TemplateCache:
+    """模板图片缓存：路径 -> (文件修改时间, 图像)，文件变化后重新读取"""
+
+    def __init__(self):
+        self._templates = {}
+
+    def load(self, path: str) -> Optional[np.ndarray]:
+        """读取模板图片（支持中文路径），文件未变化时使用缓存"""
+        if not path or not os.path.exists(path):
+            return None
+        mtime = os.path.getmtime(path)
+        cached = self._templates.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            tmpl = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+        except Exception as e:
+            print(f"读取模板图片失败: {path} {e}")
+            return None
+        if tmpl is not None:
+            self._templates[path] = (mtime, tmpl)
+        return tmpl
+
+    def discard(self, paths):
+        """丢弃不再使用的模板"""
+        for path in paths:
+            self._templates.pop(path, None)
+
+
 class SceneManager:
     """场景管理器"""
 
     def __init__(self):
         self.window_manager = WindowManager()
+        self._templates = TemplateCache()
+        # 最近一帧截图：(hwnd, 截图时刻 perf_counter, BGR 图像)，供操作复用
+        self._last_frame: Optional[Tuple[int, float, np.ndarray]] = None
+        self._frame_lock = threading.Lock()
+
+    def load_template(self, path: str) -> Optional[np.ndarray]:
+        """读取模板图片（支持中文路径），文件未变化时使用缓存"""
+        return self._templates.load(path)
+
+    def discard_templates(self, paths):
+        self._templates.discard(paths)
+
+    def capture_frame(self, hwnd: int) -> Optional[np.ndarray]:
+        """截取窗口并转换为 BGR 图像，同时记录为最近一帧"""
+        image = self.window_manager.capture_window(hwnd)
+        if not image:
+            return None
+        frame = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+        with self._frame_lock:
+            self._last_frame = (hwnd, time.perf_counter(), frame)
+        return frame
+
+    def capture_thumbnail(self, hwnd: int, width: int = 96) -> Optional[np.ndarray]:
+        """截取窗口并缩小为灰度小图，用于快速比较画面变化"""
+        frame = self.capture_frame(hwnd)
+        if frame is None:
+            return None
+        h, w = frame.shape[:2]
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        height = max(1, int(h * width / max(w, 1)))
+        return cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def frame_difference(a: np.ndarray, b: np.ndarray) -> float:
+        """两张同尺寸灰度小图的平均像素差（0~255），尺寸不同视为完全变化"""
+        if a.shape != b.shape:
+            return 255.0
+        return float(cv2.absdiff(a, b).mean())
+
+    def get_frame(self, hwnd: int, max_age: float, not_before: float = 0.0) -> Optional[np.ndarray]:
+        """
+        获取窗口画面：最近一帧截图足够新（不超过 max_age 秒，且晚于 not_before 时刻）时直接复用，
+        否则重新截图
+        """
+        with self._frame_lock:
+            last = self._last_frame
+        if last and last[0] == hwnd:
+            captured_at = last[1]
+            if captured_at >= not_before and time.perf_counter() - captured_at <= max_age:
+                return last[2]
+        return self.capture_frame(hwnd)
+
+    @staticmethod
+    def match_in_roi(frame: np.ndarray, tmpl: np.ndarray, roi_x: float, roi_y: float,
+                     roi_w: float, roi_h: float) -> Tuple[float, Optional[Tuple[int, int]]]:
+        """
+        在 ROI（相对坐标）内做模板匹配。
+        返回 (最高相似度, 命中区域中心在整帧中的像素坐标)，ROI 比模板小时返回 (0.0, None)
+        """
+        h, w = frame.shape[:2]
+        th, tw = tmpl.shape[:2]
+
+        # 计算 ROI 像素区域
+        x1 = int(w * roi_x)
+        y1 = int(h * roi_y)
+        x2 = int(w * (roi_x + roi_w))
+        y2 = int(h * (roi_y + roi_h))
+
+        # 边界保护
+        x1 = max(0, min(x1, w - 1))
+        y1 = max(0, min(y1, h - 1))
+        x2 = max(x1 + 1, min(x2, w))
+        y2 = max(y1 + 1, min(y2, h))
+
+        roi = frame[y1:y2, x1:x2]
+        rh, rw = roi.shape[:2]
+        if rh < th or rw < tw:
+            return 0.0, None
+
+        res = cv2.matchTemplate(roi, tmpl, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        return max_val, (x1 + max_loc[0] + tw // 2, y1 + max_loc[1] + th // 2)
+
+    def check_pixel(self, hwnd: int, x: int, y: int, color: Tuple[int, int, int],
+                    tolerance: int, max_age: float = 0.0, not_before: float = 0.0) -> bool:
+        """截图像素坐标 (x, y) 处的颜色与 color (RGB) 各通道差值都不超过 tolerance"""
+        frame = self.get_frame(hwnd, max_age, not_before)
+        if frame is None:
+            return False
+        h, w = frame.shape[:2]
+        if not (0 <= x < w and 0 <= y < h):
+            return False
+        b, g, r = (int(v) for v in frame[y, x][:3])
+        return (abs(r - color[0]) <= tolerance and abs(g - color[1]) <= tolerance
+                and abs(b - color[2]) <= tolerance)
+
+    def find_template(self, hwnd: int, image_path: str, roi: Tuple[float, float, float, float],
+                      threshold: float, max_age: float = 0.0,
+                      not_before: float = 0.0) -> Optional[Tuple[int, int]]:
+        """在窗口画面的 ROI 内查找模板，命中返回中心点（截图像素坐标）"""
+        tmpl = self.load_template(image_path)
+        if tmpl is None:
+            return None
+        frame = self.get_frame(hwnd, max_age, not_before)
+        if frame is None:
+            return None
+        score, point = self.match_in_roi(frame, tmpl, *roi)
+        if point is None or score < threshold:
+            return None
+        return point
 
     def capture_scene_image(self, hwnd: int, save_path: str) -> bool:
         """捕获场景图像并保存"""
@@ -30,112 +171,114 @@ class SceneManager:
     def recognize_scene(self, hwnd: int, scenes: List[Scene]) -> Optional[Scene]:
         """基于锚点（anchor）的局部模板匹配，优先识别场景"""
         try:
-            current_image = self.window_manager.capture_window(hwnd)
-            if not current_image:
+            current_cv = self.capture_frame(hwnd)
+            if current_cv is None:
                 return None
-
-            current_cv = cv2.cvtColor(np.array(current_image), cv2.COLOR_RGB2BGR)
-            h, w = current_cv.shape[:2]
-
-            best_scene = None
-            best_score = 0.0
-
-            for scene in scenes:
-                if not scene.enabled:
-                    continue
-
-                scene_best = 0.0
-                matched_by_anchor = False
-
-                # ---------- 1. 优先使用 anchors ----------
-                if getattr(scene, "anchors", None):
-                    for anchor in scene.anchors:
-                        if not anchor.image_path or not os.path.exists(anchor.image_path):
-                            continue
-
-                        # 读取 anchor 模板（支持中文路径）
-                        try:
-                            tmpl = cv2.imdecode(
-                                np.fromfile(anchor.image_path, dtype=np.uint8),
-                                cv2.IMREAD_COLOR
-                            )
-                        except Exception as e:
-                            print(f"读取锚点图片失败: {anchor.image_path} {e}")
-                            continue
-
-                        if tmpl is None:
-                            continue
-
-                        th, tw = tmpl.shape[:2]
-
-                        # 计算 ROI 像素区域
-                        x1 = int(w * anchor.roi_x)
-                        y1 = int(h * anchor.roi_y)
-                        x2 = int(w * (anchor.roi_x + anchor.roi_w))
-                        y2 = int(h * (anchor.roi_y + anchor.roi_h))
-
-                        # 边界保护
-                        x1 = max(0, min(x1, w - 1))
-                        y1 = max(0, min(y1, h - 1))
-                        x2 = max(x1 + 1, min(x2, w))
-                        y2 = max(y1 + 1, min(y2, h))
-
-                        roi = current_cv[y1:y2, x1:x2]
-                        rh, rw = roi.shape[:2]
-
-                        if rh < th or rw < tw:
-                            # ROI 比模板小，跳过这个 anchor
-                            continue
-
-                        # 模板匹配
-                        res = cv2.matchTemplate(roi, tmpl, cv2.TM_CCOEFF_NORMED)
-                        _, max_val, _, _ = cv2.minMaxLoc(res)
-
-                        if max_val > scene_best:
-                            scene_best = max_val
-
-                        # 如果单个锚点达到自己的阈值，就认为该场景被 anchors 匹配到了
-                        if max_val >= anchor.threshold:
-                            matched_by_anchor = True
-
-                    if matched_by_anchor:
-                        # 这个场景被 anchors 命中，使用 anchors 得到的最高分参与全局比较
-                        if scene_best > best_score:
-                            best_score = scene_best
-                            best_scene = scene
-                        # 已经用 anchors 决定该场景，不再用整图兜底
-                        continue
-
-                # ---------- 2. 回退：使用整图模板匹配 ----------
-                if scene.recognition_image_path and os.path.exists(scene.recognition_image_path):
-                    try:
-                        template = cv2.imdecode(
-                            np.fromfile(scene.recognition_image_path, dtype=np.uint8),
-                            cv2.IMREAD_COLOR
-                        )
-                    except Exception as e:
-                        print(f"读取场景整图失败: {scene.recognition_image_path} {e}")
-                        template = None
-
-                    if template is not None:
-                        score = self._match_images(current_cv, template)
-                        if score > scene.recognition_threshold and score > best_score:
-                            best_score = score
-                            best_scene = scene
-
-            # 没有任何场景匹配，则返回默认场景
-            if best_scene is None:
-                for scene in scenes:
-                    if scene.is_default and scene.enabled:
-                        return scene
-
-            return best_scene
+            return self.select_scene(current_cv, scenes, self.load_template)
 
         except Exception as e:
             print(f"场景识别失败: {e}")
             return None
 
-    def _match_images(self, image1: np.ndarray, image2: np.ndarray) -> float:
+    @staticmethod
+    def select_scene(frame: np.ndarray, scenes: List[Scene],
+                     load_template: Callable[[str], Optional[np.ndarray]]) -> Optional[Scene]:
+        """在画面中选出相似度最高的命中场景，没有命中时返回默认场景（识别进程也使用此函数）"""
+        best_scene = None
+        best_score = 0.0
+
+        for scene in scenes:
+            if not scene.enabled:
+                continue
+
+            matched, score = SceneManager.score_scene_with(frame, scene, load_template)
+            if matched and score > best_score:
+                best_score = score
+                best_scene = scene
+
+        # 没有任何场景匹配，则返回默认场景
+        if best_scene is None:
+            for scene in scenes:
+                if scene.is_default and scene.enabled:
+                    return scene
+
+        return best_scene
+
+    def score_scene(self, frame: np.ndarray, scene: Scene) -> Tuple[bool, float]:
+        """
+        判断画面是否为该场景，返回 (是否命中, 相似度)。
+        优先使用锚点，任一锚点达到自身阈值即命中；锚点都未命中时回退到整图匹配
+        """
+        return self.score_scene_with(frame, scene, self.load_template)
+
+    @staticmethod
+    def score_scene_with(frame: np.ndarray, scene: Scene,
+                         load_template: Callable[[str], Optional[np.ndarray]]) -> Tuple[bool, float]:
+        """score_scene 的无状态版本，模板由 load_template 提供"""
+        scene_best = 0.0
+        matched_by_anchor = False
+
+        # ---------- 1. 优先使用 anchors ----------
+        for anchor in getattr(scene, "anchors", None) or []:
+            # 读取 anchor 模板（支持中文路径，带缓存）
+            tmpl = load_template(anchor.image_path)
+            if tmpl is None:
+                continue
+
+            # 模板匹配（ROI 比模板小时跳过这个 anchor）
+            max_val, point = SceneManager.match_in_roi(
+                frame, tmpl,
+                anchor.roi_x, anchor.roi_y, anchor.roi_w, anchor.roi_h
+            )
+            if point is None:
+                continue
+
+            if max_val > scene_best:
+                scene_best = max_val
+
+            # 如果单个锚点达到自己的阈值，就认为该场景被 anchors 匹配到了
+            if max_val >= anchor.threshold:
+                matched_by_anchor = True
+
+        if matched_by_anchor:
+            # 使用 anchors 得到的最高分参与全局比较，不再用整图兜底
+            return True, scene_best
+
+        # ---------- 2. 回退：使用整图模板匹配 ----------
+        if scene.recognition_image_path:
+            template = load_template(scene.recognition_image_path)
+            if template is not None:
+                score = SceneManager._match_images(frame, template)
+                if score > scene.recognition_threshold:
+                    return True, score
+        return False, 0.0
+
+    def scene_matches(self, hwnd: int, scene: Scene, max_age: float = 0.0,
+                      not_before: float = 0.0) -> bool:
+        """当前画面是否仍为该场景"""
+        frame = self.get_frame(hwnd, max_age, not_before)
+        if frame is None:
+            return False
+        return self.score_scene(frame, scene)[0]
+
+    def quick_check(self, hwnd: int, scene: Scene, max_age: float = 0.0,
+                    not_before: float = 0.0) -> bool:
+        """只用场景的第一个有效锚点快速确认画面；没有锚点时无法低成本确认，直接视为通过"""
+        for anchor in scene.anchors:
+            tmpl = self.load_template(anchor.image_path)
+            if tmpl is None:
+                continue
+            frame = self.get_frame(hwnd, max_age, not_before)
+            if frame is None:
+                return False
+            score, point = self.match_in_roi(
+                frame, tmpl, anchor.roi_x, anchor.roi_y, anchor.roi_w, anchor.roi_h
+            )
+            return point is not None and score >= anchor.threshold
+        return True
+
+    @staticmethod
+    def _match_images(image1: np.ndarray, image2: np.ndarray) -> float:
         """比较两张图片的相似度（整图匹配兜底）"""
         try:
             h1, w1 = image1.shape[:2]
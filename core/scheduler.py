@@ -0,0 +1,87 @@
+"""操作调度器 - 基于 time.perf_counter 的高精度等待与定时操作
+
+定时操作以场景开始时刻为基准放置在绝对截止时间上，误差不会随操作数量累积。
+等待采用“先休眠、后自旋”的混合方式：长段挂在取消令牌上（可立即停止），
+最后一小段用高精度休眠加自旋补齐。
+"""
+import time
+from typing import Callable, Optional
+from models import LatePolicy
+from .cancellation import CancellationToken
+from .metrics import ExecutionMetrics
+
+
+# Windows 下事件等待的精度约为一个系统时钟周期（15.6ms），最后这段改用 time.sleep
+COARSE_MARGIN = 0.016
+# 最后 1ms 自旋
+SPIN_THRESHOLD = 0.001
+
+
+class ActionSkipped(Exception):
+    """迟到的定时操作按策略被跳过"""
+
+
+class ActionScheduler:
+    """操作调度器（每个执行器一个）"""
+
+    def __init__(self, token: CancellationToken, metrics: ExecutionMetrics):
+        self.token = token
+        self.metrics = metrics
+        self.late_policy = LatePolicy.FLAG
+        self.late_tolerance = 0.02
+        self._scene_start = time.perf_counter()
+
+    def configure(self, late_policy: LatePolicy, late_tolerance_ms: int):
+        self.late_policy = late_policy
+        self.late_tolerance = late_tolerance_ms / 1000
+
+    def begin_scene(self):
+        """以当前时刻作为场景的时间基准"""
+        self._scene_start = time.perf_counter()
+
+    def shift(self, seconds: float):
+        """时间基准后移（暂停期间不计入场景时间）"""
+        self._scene_start += seconds
+
+    def sleep(self, seconds: float) -> bool:
+        """高精度相对等待，返回 False 表示期间被停止"""
+        return self.wait_until(time.perf_counter() + seconds)
+
+    def wait_until(self, deadline: float) -> bool:
+        """等待到 perf_counter 的绝对时刻，返回 False 表示期间被停止"""
+        remaining = deadline - time.perf_counter()
+        if remaining > COARSE_MARGIN:
+            if not self.token.wait(remaining - COARSE_MARGIN):
+                return False
+            remaining = deadline - time.perf_counter()
+        if remaining > SPIN_THRESHOLD:
+            time.sleep(remaining - SPIN_THRESHOLD)
+        while time.perf_counter() < deadline:
+            pass
+        return not self.token.is_stopped()
+
+    def time_until_offset(self, offset: float) -> float:
+        """距场景开始后 offset 秒还有多久（已过时为负数）"""
+        return self._scene_start + offset - time.perf_counter()
+
+    def wait_for_offset(self, offset: float, callback: Optional[Callable] = None) -> bool:
+        """
+        等待到场景开始后 offset 秒。已超过容差的迟到操作按策略处理：
+        SKIP 抛出 ActionSkipped，FLAG 记录后立即执行。返回 False 表示被停止。
+        """
+        deadline = self._scene_start + offset
+        lateness = time.perf_counter() - deadline
+        if lateness > self.late_tolerance:
+            self.metrics.incr("schedule.late")
+            if self.late_policy == LatePolicy.SKIP:
+                self.metrics.incr("schedule.skipped")
+                raise ActionSkipped(f"跳过迟到 {lateness * 1000:.0f}ms 的定时操作")
+            if callback:
+                callback(f"定时操作迟到 {lateness * 1000:.0f}ms")
+            self.metrics.add_time("schedule.jitter", lateness)
+            return not self.token.is_stopped()
+
+        if not self.wait_until(deadline):
+            return False
+        self.metrics.add_time("schedule.jitter", abs(time.perf_counter() - deadline))
+        return True
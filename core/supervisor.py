@@ -0,0 +1,113 @@
+"""执行监督 - 发现崩溃或卡住的项目，按退避策略自动重启
+
+崩溃：执行因未处理的异常结束（ProjectRunner.error 不为 None）。
+卡住：超过 max(stall_factor × 识别间隔, min_stall) 秒没有心跳（心跳之后预计的正常耗时不计入，暂停时不判断）。
+重启间隔按 backoff_base × 2^(n-1) 递增，不超过 backoff_max；crash_window 内重启超过 max_restarts 次
+视为崩溃循环，不再自动重启。本模块不依赖 Qt，由驱动方定时调用。
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from .metrics import TimingStat
+
+
+@dataclass
+class RestartPolicy:
+    """自动重启策略"""
+    stall_factor: float = 5.0     # 超过多少个识别间隔没有心跳视为卡住
+    min_stall: float = 15.0       # 卡住判定的下限（秒）
+    backoff_base: float = 2.0     # 首次重启前的等待（秒）
+    backoff_max: float = 60.0
+    max_restarts: int = 5         # crash_window 内最多自动重启次数
+    crash_window: float = 300.0
+
+
+@dataclass
+class SupervisionRecord:
+    """单个项目的监督记录"""
+    restarts: int = 0
+    crashes: int = 0
+    stalls: int = 0
+    stall_time: TimingStat = field(default_factory=TimingStat)  # 每次卡住被发现时已卡住的时长
+    last_reason: str = ""
+    given_up: bool = False                                      # 崩溃循环，已停止自动重启
+    restart_at: Optional[float] = None                          # 已安排的重启时刻
+    recent: List[float] = field(default_factory=list)           # crash_window 内的重启时刻
+
+
+class WorkerSupervisor:
+    """按项目记录崩溃/卡住并安排重启"""
+
+    def __init__(self, policy: Optional[RestartPolicy] = None):
+        self.policy = policy or RestartPolicy()
+        self._records: Dict[str, SupervisionRecord] = {}
+        self._lock = threading.Lock()
+
+    def stall_duration(self, runner, now: Optional[float] = None) -> float:
+        """runner 已卡住的秒数（超出心跳预计耗时的部分），未达到卡住判定时返回 0"""
+        if runner.token.is_paused() or runner.is_finished():
+            return 0.0
+        now = now if now is not None else time.perf_counter()
+        overdue = now - runner.last_beat - runner.beat_budget
+        limit = max(self.policy.stall_factor * runner.expected_tick, self.policy.min_stall)
+        return overdue if overdue > limit else 0.0
+
+    def schedule_restart(self, project_id: str, reason: str, stall: float = 0.0,
+                         now: Optional[float] = None) -> Optional[float]:
+        """记录一次崩溃（stall 为 0）或卡住，返回距重启的秒数；进入崩溃循环时返回 None"""
+        now = now if now is not None else time.perf_counter()
+        policy = self.policy
+        with self._lock:
+            record = self._records.setdefault(project_id, SupervisionRecord())
+            record.last_reason = reason
+            if stall > 0:
+                record.stalls += 1
+                record.stall_time.add(stall)
+            else:
+                record.crashes += 1
+            record.recent = [t for t in record.recent if now - t < policy.crash_window]
+            if len(record.recent) >= policy.max_restarts:
+                record.given_up = True
+                record.restart_at = None
+                return None
+            delay = min(policy.backoff_base * 2 ** len(record.recent), policy.backoff_max)
+            record.recent.append(now)
+            record.restart_at = now + delay
+            return delay
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """到达重启时刻的项目ID（取出后不再重复返回）"""
+        now = now if now is not None else time.perf_counter()
+        with self._lock:
+            ids = [pid for pid, r in self._records.items() if r.restart_at is not None and r.restart_at <= now]
+            for pid in ids:
+                record = self._records[pid]
+                record.restart_at = None
+                record.restarts += 1
+            return ids
+
+    def is_pending(self, project_id: str) -> bool:
+        with self._lock:
+            record = self._records.get(project_id)
+            return record is not None and record.restart_at is not None
+
+    def cancel(self, project_id: str):
+        """取消已安排的重启（用户手动停止时）"""
+        with self._lock:
+            record = self._records.get(project_id)
+            if record is not None:
+                record.restart_at = None
+
+    def reset(self, project_id: str):
+        """用户重新手动启动：清除崩溃循环状态，保留累计统计"""
+        with self._lock:
+            record = self._records.get(project_id)
+            if record is not None:
+                record.given_up = False
+                record.restart_at = None
+                record.recent.clear()
+
+    def get_record(self, project_id: str) -> Optional[SupervisionRecord]:
+        with self._lock:
+            return self._records.get(project_id)
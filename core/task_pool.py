@@ -0,0 +1,203 @@
+"""共享线程池 - 在固定数量的工作线程上协作式地执行多个项目
+
+任务是生成器：每次 yield 一个秒数表示“等待这么久后再继续”。等待不占用线程，
+而是变成定时器堆中的一个条目，到期后再把下一步提交给执行器。
+因此 N 个项目可以共享少量线程，只有真正在识别/执行操作的项目才占用线程。
+
+执行器只需提供 submit(fn, *args)，时钟可替换；配合 InlineExecutor、start=False
+和 run_pending() 即可在不启动任何线程（也不依赖 Qt）的情况下逐步驱动。
+本模块不依赖 win32/Qt。
+"""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Generator, List, Optional
+
+
+DEFAULT_POOL_SIZE = 4
+
+
+class InlineExecutor:
+    """在调用线程中同步执行的执行器（用于不启动线程的驱动和调试）"""
+
+    def submit(self, fn: Callable, *args):
+        fn(*args)
+
+    def shutdown(self, wait: bool = True):
+        pass
+
+
+class TaskHandle:
+    """提交到线程池的任务"""
+
+    def __init__(self, pool: 'TaskPool', gen: Generator, name: str = ""):
+        self.pool = pool
+        self.name = name
+        self.error: Optional[BaseException] = None
+        self.steps = 0
+        self._gen = gen
+        self._done = threading.Event()
+        self._timer_seq: Optional[int] = None  # 等待中的定时器条目序号，None 表示正在执行或已结束
+        self._wake_pending = False  # 步骤执行期间收到的 wake，该步结束后不再等待
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待任务结束，返回是否已结束"""
+        return self._done.wait(timeout)
+
+    def wake(self):
+        """提前结束当前等待（例如请求停止后尽快让任务检查取消标志）"""
+        self.pool.wake(self)
+
+    def cancel(self):
+        """关闭生成器（执行其 finally），正在执行的步骤结束后生效"""
+        self.pool.cancel(self)
+
+
+class TaskPool:
+    """协作式任务线程池"""
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, executor=None,
+                 clock: Callable[[], float] = time.perf_counter, start: bool = True):
+        self.size = size
+        self._executor = executor or ThreadPoolExecutor(max_workers=size,
+                                                        thread_name_prefix="task-pool")
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._timers: List[tuple] = []  # (到期时刻, 序号, 任务)
+        self._seq = itertools.count()
+        self._tasks: List[TaskHandle] = []
+        self._cancelled = set()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        if start:
+            self._thread = threading.Thread(target=self._dispatch_loop, name="task-pool-timer",
+                                            daemon=True)
+            self._thread.start()
+
+    def submit(self, gen: Generator, name: str = "") -> TaskHandle:
+        """提交生成器任务，立即开始第一步"""
+        handle = TaskHandle(self, gen, name)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("线程池已关闭")
+            self._tasks.append(handle)
+        self._schedule(handle, 0.0)
+        return handle
+
+    def active_count(self) -> int:
+        """未结束的任务数"""
+        with self._cond:
+            return sum(1 for t in self._tasks if not t.done())
+
+    def waiting_count(self) -> int:
+        """正在等待定时器的任务数"""
+        with self._cond:
+            return sum(1 for t in self._tasks if t._timer_seq is not None)
+
+    def wake(self, handle: TaskHandle):
+        # 检查与重新排期在同一把（可重入）锁内完成，避免与 run_pending 竞争导致同一任务并发执行
+        with self._cond:
+            if handle._timer_seq is not None:
+                self._schedule(handle, 0.0)
+            else:
+                handle._wake_pending = True
+
+    def cancel(self, handle: TaskHandle):
+        with self._cond:
+            self._cancelled.add(handle)
+        self.wake(handle)
+
+    def next_deadline(self) -> Optional[float]:
+        with self._cond:
+            return self._timers[0][0] if self._timers else None
+
+    def run_pending(self) -> int:
+        """把所有已到期的任务提交给执行器，返回提交的步数"""
+        due = []
+        with self._cond:
+            now = self._clock()
+            while self._timers and self._timers[0][0] <= now:
+                _, seq, handle = heapq.heappop(self._timers)
+                if handle._timer_seq != seq:
+                    continue  # 已被 wake 重新排期的旧条目
+                handle._timer_seq = None
+                due.append(handle)
+        for handle in due:
+            self._executor.submit(self._step, handle)
+        return len(due)
+
+    def shutdown(self, wait: bool = True):
+        """
+        停止接受新任务。已提交的任务继续执行到结束，之后定时器线程退出并关闭执行器；
+        wait=True 时阻塞到此为止（调用前应先让任务结束，例如停止所有项目）
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is None:
+            self._executor.shutdown(wait=wait)
+        elif wait:
+            self._thread.join()
+
+    # ---------- 内部 ----------
+
+    def _schedule(self, handle: TaskHandle, delay: float):
+        with self._cond:
+            seq = next(self._seq)
+            handle._timer_seq = seq
+            heapq.heappush(self._timers, (self._clock() + max(0.0, delay), seq, handle))
+            self._cond.notify()
+
+    def _step(self, handle: TaskHandle):
+        """在工作线程中执行任务的一步"""
+        with self._cond:
+            cancelled = handle in self._cancelled
+            # 在执行这一步之前清除唤醒标志，步骤执行期间的 wake 会让随后的等待立即结束
+            handle._wake_pending = False
+        try:
+            if cancelled:
+                handle._gen.close()
+                self._finish(handle)
+                return
+            delay = next(handle._gen)
+            handle.steps += 1
+        except StopIteration:
+            self._finish(handle)
+            return
+        except Exception as e:
+            print(f"线程池任务出错 [{handle.name}]: {e}")
+            handle.error = e
+            self._finish(handle)
+            return
+        with self._cond:
+            if handle._wake_pending:
+                handle._wake_pending = False
+                delay = 0.0
+            self._schedule(handle, delay or 0.0)
+
+    def _finish(self, handle: TaskHandle):
+        with self._cond:
+            self._cancelled.discard(handle)
+            if handle in self._tasks:
+                self._tasks.remove(handle)
+            self._cond.notify_all()
+        handle._done.set()
+
+    def _dispatch_loop(self):
+        """定时器线程：等到最近的到期时刻，把到期任务交给执行器"""
+        while True:
+            with self._cond:
+                if self._closed and not self._tasks:
+                    break
+                deadline = self._timers[0][0] if self._timers else None
+                timeout = None if deadline is None else deadline - self._clock()
+                if timeout is None or timeout > 0:
+                    self._cond.wait(timeout)
+                    continue
+            self.run_pending()
+        self._executor.shutdown(wait=True)
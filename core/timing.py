@@ -0,0 +1,36 @@
+"""时间配置 - 消息原语之间的间隔参数
+
+每个配置定义按下/抬起、修饰键、拖拽、逐字输入等原语之间的休眠时长（秒），
+可在项目级别设置，也可由单个操作覆盖。
+"""
+from dataclasses import dataclass
+from typing import Dict
+
+
+@dataclass(frozen=True)
+class TimingProfile:
+    """时间配置"""
+    name: str
+    display_name: str
+    click_hold: float       # 鼠标按下到抬起
+    key_hold: float         # 按键按下到抬起
+    modifier_gap: float     # 组合键中修饰键之间
+    drag_press: float       # 拖拽按下后到开始移动
+    drag_max_rate: float    # 拖拽移动消息的最大频率（条/秒）
+    char_interval: float    # 逐字输入每个字符之间
+
+
+DEFAULT_TIMING_PROFILE = "safe"
+
+TIMING_PROFILES: Dict[str, TimingProfile] = {
+    # 与最初的硬编码取值一致，兼容性最好
+    "safe": TimingProfile("safe", "稳妥", 0.05, 0.05, 0.02, 0.05, 50, 0.02),
+    "fast": TimingProfile("fast", "快速", 0.02, 0.02, 0.01, 0.03, 100, 0.005),
+    # 只保留最小间隔，适合消息处理快的目标程序
+    "turbo": TimingProfile("turbo", "极速", 0.005, 0.005, 0.0, 0.01, 200, 0.0),
+}
+
+
+def get_timing_profile(name: str) -> TimingProfile:
+    """按名称获取时间配置，未知名称回退到默认配置"""
+    return TIMING_PROFILES.get(name) or TIMING_PROFILES[DEFAULT_TIMING_PROFILE]
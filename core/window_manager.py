@@ -9,6 +9,21 @@ from typing import List, Optional, Tuple
 from PIL import Image
 
 
+class _GUIThreadInfo(ctypes.Structure):
+    """GUITHREADINFO"""
+    _fields_ = [
+        ("cbSize", wintypes.DWORD),
+        ("flags", wintypes.DWORD),
+        ("hwndActive", wintypes.HWND),
+        ("hwndFocus", wintypes.HWND),
+        ("hwndCapture", wintypes.HWND),
+        ("hwndMenuOwner", wintypes.HWND),
+        ("hwndMoveSize", wintypes.HWND),
+        ("hwndCaret", wintypes.HWND),
+        ("rcCaret", wintypes.RECT),
+    ]
+
+
 @dataclass
 class WindowInfo:
     """窗口信息"""
@@ -120,6 +135,46 @@ class WindowManager:
             pass
         return None
 
+    @staticmethod
+    def is_edit_control(hwnd: int) -> bool:
+        """是否为可见的文本编辑控件（Edit / RichEdit）"""
+        try:
+            return "edit" in win32gui.GetClassName(hwnd).lower() and bool(win32gui.IsWindowVisible(hwnd))
+        except:
+            return False
+
+    @staticmethod
+    def find_edit_children(hwnd: int) -> List[int]:
+        """窗口中全部可见的文本编辑控件（按枚举顺序）"""
+        found = []
+
+        def enum_callback(child, _):
+            if WindowManager.is_edit_control(child):
+                found.append(child)
+            return True
+
+        try:
+            win32gui.EnumChildWindows(hwnd, enum_callback, None)
+        except Exception:
+            pass
+        return found
+
+    @staticmethod
+    def get_focused_child(hwnd: int) -> Optional[int]:
+        """窗口所在 GUI 线程当前拥有键盘焦点的控件，焦点不在该窗口（或其子窗口）内时返回 None"""
+        try:
+            thread_id = ctypes.windll.user32.GetWindowThreadProcessId(hwnd, None)
+            info = _GUIThreadInfo()
+            info.cbSize = ctypes.sizeof(_GUIThreadInfo)
+            if not thread_id or not ctypes.windll.user32.GetGUIThreadInfo(thread_id, ctypes.byref(info)):
+                return None
+            focus = info.hwndFocus or 0
+            if focus and (focus == hwnd or win32gui.IsChild(hwnd, focus)):
+                return focus
+            return None
+        except:
+            return None
+
     @staticmethod
     def get_client_rect(hwnd: int) -> Tuple[int, int, int, int]:
         """获取客户区矩形"""
@@ -129,9 +184,20 @@ class WindowManager:
         except:
             return (0, 0, 0, 0)
 
+    @staticmethod
+    def get_client_offset(hwnd: int) -> Tuple[int, int]:
+        """客户区左上角在窗口截图中的位置（截图包含标题栏和边框）"""
+        try:
+            left, top, _, _ = win32gui.GetWindowRect(hwnd)
+            client_x, client_y = win32gui.ClientToScreen(hwnd, (0, 0))
+            return client_x - left, client_y - top
+        except:
+            return (0, 0)
+
     @staticmethod
     def capture_window(hwnd: int) -> Optional[Image.Image]:
-        """截取窗口图像（后台截图）"""
+        """截取窗口图像（后台截图），DC 和位图在任何情况下都会释放"""
+        hwnd_dc = mfc_dc = save_dc = bitmap = None
         try:
             left, top, right, bottom = win32gui.GetWindowRect(hwnd)
             width = right - left
@@ -154,23 +220,29 @@ class WindowManager:
             bmpinfo = bitmap.GetInfo()
             bmpstr = bitmap.GetBitmapBits(True)
             
-            image = Image.frombuffer(
+            return Image.frombuffer(
                 'RGB',
                 (bmpinfo['bmWidth'], bmpinfo['bmHeight']),
                 bmpstr, 'raw', 'BGRX', 0, 1
             )
 
-            win32gui.DeleteObject(bitmap.GetHandle())
-            save_dc.DeleteDC()
-            mfc_dc.DeleteDC()
-            win32gui.ReleaseDC(hwnd, hwnd_dc)
-
-            return image
-
         except Exception as e:
             print(f"截取窗口失败: {e}")
             return None
 
+        finally:
+            # 按创建的相反顺序释放，单个释放失败不影响其余
+            for release in (
+                lambda: win32gui.DeleteObject(bitmap.GetHandle()) if bitmap is not None else None,
+                lambda: save_dc.DeleteDC() if save_dc is not None else None,
+                lambda: mfc_dc.DeleteDC() if mfc_dc is not None else None,
+                lambda: win32gui.ReleaseDC(hwnd, hwnd_dc) if hwnd_dc is not None else None,
+            ):
+                try:
+                    release()
+                except Exception:
+                    pass
+
     @staticmethod
     def is_window_valid(hwnd: int) -> bool:
         """检查窗口是否有效"""
@@ -1,6 +1,7 @@
 """窗口自动化控制软件 - 后台执行版"""
 import sys
 import os
+import multiprocessing
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -71,4 +72,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包为 EXE 后识别进程（进程池识别）需要
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -1,7 +1,7 @@
 # models/__init__.py
 
-from .action import Action, ActionType
+from .action import Action, ActionType, TextInputStrategy, DragEasing, WaitCondition, PostCondition
 from .scene import Scene, SceneAnchor
-from .project import Project
+from .project import Project, LatePolicy
 
-__all__ = ['Action', 'ActionType', 'Scene', 'SceneAnchor', 'Project']
\ No newline at end of file
+__all__ = ['Action', 'ActionType', 'TextInputStrategy', 'DragEasing', 'WaitCondition', 'PostCondition', 'Scene', 'SceneAnchor', 'Project', 'LatePolicy']
\ No newline at end of file
@@ -1,6 +1,7 @@
 """操作模型"""
 from dataclasses import dataclass, field
 from enum import Enum
+from typing import List
 import uuid
 
 
@@ -13,6 +14,8 @@ class ActionType(Enum):
     KEY_PRESS = "key_press"
     INPUT_TEXT = "input_text"
     WAIT = "wait"
+    FIND_CLICK = "find_click"
+    WAIT_FOR = "wait_for"
     
     @classmethod
     def get_display_name(cls, action_type: 'ActionType') -> str:
@@ -23,11 +26,87 @@ class ActionType(Enum):
             cls.DRAG: "拖拽",
             cls.KEY_PRESS: "按键",
             cls.INPUT_TEXT: "输入文本",
-            cls.WAIT: "等待"
+            cls.WAIT: "等待",
+            cls.FIND_CLICK: "查找并点击",
+            cls.WAIT_FOR: "等待画面条件"
         }
         return names.get(action_type, action_type.value)
 
 
+class TextInputStrategy(Enum):
+    """文本输入方式（按速度从快到慢排列，失败时依次向后回退）"""
+    SET_TEXT = "set_text"
+    CLIPBOARD = "clipboard"
+    CHUNKED = "chunked"
+    PER_CHAR = "per_char"
+
+    @classmethod
+    def get_display_name(cls, strategy: 'TextInputStrategy') -> str:
+        names = {
+            cls.SET_TEXT: "设置控件文本（覆盖原内容）",
+            cls.CLIPBOARD: "剪贴板粘贴",
+            cls.CHUNKED: "批量字符消息",
+            cls.PER_CHAR: "逐字输入"
+        }
+        return names.get(strategy, strategy.value)
+
+    @classmethod
+    def fallback_chain(cls, strategy: 'TextInputStrategy') -> tuple:
+        """从指定方式开始的回退顺序"""
+        order = list(cls)
+        return tuple(order[order.index(strategy):])
+
+
+class DragEasing(Enum):
+    """拖拽缓动曲线"""
+    LINEAR = "linear"
+    EASE_IN = "ease_in"
+    EASE_OUT = "ease_out"
+    EASE_IN_OUT = "ease_in_out"
+
+    @classmethod
+    def get_display_name(cls, easing: 'DragEasing') -> str:
+        names = {
+            cls.LINEAR: "匀速",
+            cls.EASE_IN: "加速",
+            cls.EASE_OUT: "减速",
+            cls.EASE_IN_OUT: "先加速后减速"
+        }
+        return names.get(easing, easing.value)
+
+
+class WaitCondition(Enum):
+    """等待条件类型"""
+    TEMPLATE = "template"
+    PIXEL = "pixel"
+
+    @classmethod
+    def get_display_name(cls, condition: 'WaitCondition') -> str:
+        names = {
+            cls.TEMPLATE: "目标图片",
+            cls.PIXEL: "像素颜色"
+        }
+        return names.get(condition, condition.value)
+
+
+class PostCondition(Enum):
+    """操作后验证条件"""
+    NONE = "none"
+    FRAME_CHANGED = "frame_changed"
+    ANCHOR_APPEARED = "anchor_appeared"
+    SCENE_CHANGED = "scene_changed"
+
+    @classmethod
+    def get_display_name(cls, condition: 'PostCondition') -> str:
+        names = {
+            cls.NONE: "不验证",
+            cls.FRAME_CHANGED: "画面发生变化",
+            cls.ANCHOR_APPEARED: "目标图片出现",
+            cls.SCENE_CHANGED: "离开当前场景"
+        }
+        return names.get(condition, condition.value)
+
+
 @dataclass
 class Action:
     """操作模型"""
@@ -38,13 +117,52 @@ class Action:
     relative_y: float = 0.5
     end_relative_x: float = 0.5
     end_relative_y: float = 0.5
+    # 拖拽时长（毫秒），0 表示按距离自动计算
+    drag_duration: int = 0
+    drag_easing: DragEasing = DragEasing.LINEAR
+    # 起点与终点之间的途经点（相对坐标 [[x, y], ...]）
+    drag_path: List[List[float]] = field(default_factory=list)
     key: str = ""
     text: str = ""
+    text_strategy: TextInputStrategy = TextInputStrategy.PER_CHAR
     wait_time: int = 1000
     delay_after: int = 300
+    # 定时偏移（毫秒）：距场景开始的绝对时刻执行，-1 表示紧接上一个操作
+    schedule_offset: int = -1
     description: str = ""
     order: int = 0
     enabled: bool = True
+    # 时间配置名称（safe/fast/turbo），为空时跟随项目设置
+    timing_profile: str = ""
+    # 查找模板：图片路径、查找区域（相对坐标 [x, y, w, h]）与相似度阈值
+    template_path: str = ""
+    match_roi: List[float] = field(default_factory=lambda: [0.0, 0.0, 1.0, 1.0])
+    match_threshold: float = 0.8
+    # 点击位置相对命中中心的偏移（像素）
+    match_offset_x: int = 0
+    match_offset_y: int = 0
+    # 查找/等待超时（毫秒）
+    match_timeout: int = 1000
+    # 超时未找到时点击 relative_x/relative_y
+    match_fallback: bool = True
+    # 等待画面条件：图片（使用上面的查找设置）或 relative_x/relative_y 处的像素颜色
+    wait_condition: WaitCondition = WaitCondition.TEMPLATE
+    # True 等待出现，False 等待消失
+    wait_appear: bool = True
+    pixel_color: str = "#000000"
+    pixel_tolerance: int = 10
+    # 等待画面稳定：启用后代替固定的操作后延迟，在 [settle_min, settle_max] 毫秒内检测画面不再变化
+    settle_enabled: bool = False
+    settle_min: int = 50
+    settle_max: int = 2000
+    # 操作后验证：在 verify_timeout 毫秒内检查条件，不满足时重新执行操作，最多 verify_retries 次
+    verify: PostCondition = PostCondition.NONE
+    verify_timeout: int = 500
+    verify_retries: int = 1
+    # 验证“目标图片出现”使用的图片、查找区域（相对坐标 [x, y, w, h]）与相似度阈值
+    verify_template_path: str = ""
+    verify_roi: List[float] = field(default_factory=lambda: [0.0, 0.0, 1.0, 1.0])
+    verify_threshold: float = 0.8
 
     def to_dict(self) -> dict:
         return {
@@ -55,17 +173,45 @@ class Action:
             "relative_y": self.relative_y,
             "end_relative_x": self.end_relative_x,
             "end_relative_y": self.end_relative_y,
+            "drag_duration": self.drag_duration,
+            "drag_easing": self.drag_easing.value,
+            "drag_path": [list(p) for p in self.drag_path],
             "key": self.key,
             "text": self.text,
+            "text_strategy": self.text_strategy.value,
             "wait_time": self.wait_time,
             "delay_after": self.delay_after,
+            "schedule_offset": self.schedule_offset,
             "description": self.description,
             "order": self.order,
-            "enabled": self.enabled
+            "enabled": self.enabled,
+            "timing_profile": self.timing_profile,
+            "template_path": self.template_path,
+            "match_roi": list(self.match_roi),
+            "match_threshold": self.match_threshold,
+            "match_offset_x": self.match_offset_x,
+            "match_offset_y": self.match_offset_y,
+            "match_timeout": self.match_timeout,
+            "match_fallback": self.match_fallback,
+            "wait_condition": self.wait_condition.value,
+            "wait_appear": self.wait_appear,
+            "pixel_color": self.pixel_color,
+            "pixel_tolerance": self.pixel_tolerance,
+            "settle_enabled": self.settle_enabled,
+            "settle_min": self.settle_min,
+            "settle_max": self.settle_max,
+            "verify": self.verify.value,
+            "verify_timeout": self.verify_timeout,
+            "verify_retries": self.verify_retries,
+            "verify_template_path": self.verify_template_path,
+            "verify_roi": list(self.verify_roi),
+            "verify_threshold": self.verify_threshold
         }
 
     @classmethod
     def from_dict(cls, data: dict) -> 'Action':
+        # 旧版本“目标图片出现”验证使用查找设置，没有单独的验证图片时沿用
+        legacy_verify = "verify_template_path" not in data and data.get("verify") == "anchor_appeared"
         return cls(
             id=data.get("id", str(uuid.uuid4())),
             name=data.get("name", ""),
@@ -74,13 +220,43 @@ class Action:
             relative_y=data.get("relative_y", 0.5),
             end_relative_x=data.get("end_relative_x", 0.5),
             end_relative_y=data.get("end_relative_y", 0.5),
+            drag_duration=data.get("drag_duration", 0),
+            drag_easing=DragEasing(data.get("drag_easing", "linear")),
+            drag_path=[list(p) for p in data.get("drag_path", [])],
             key=data.get("key", ""),
             text=data.get("text", ""),
+            text_strategy=TextInputStrategy(data.get("text_strategy", "per_char")),
             wait_time=data.get("wait_time", 1000),
             delay_after=data.get("delay_after", 300),
+            schedule_offset=data.get("schedule_offset", -1),
             description=data.get("description", ""),
             order=data.get("order", 0),
-            enabled=data.get("enabled", True)
+            enabled=data.get("enabled", True),
+            timing_profile=data.get("timing_profile", ""),
+            template_path=data.get("template_path", ""),
+            match_roi=list(data.get("match_roi", [0.0, 0.0, 1.0, 1.0])),
+            match_threshold=data.get("match_threshold", 0.8),
+            match_offset_x=data.get("match_offset_x", 0),
+            match_offset_y=data.get("match_offset_y", 0),
+            match_timeout=data.get("match_timeout", 1000),
+            match_fallback=data.get("match_fallback", True),
+            wait_condition=WaitCondition(data.get("wait_condition", "template")),
+            wait_appear=data.get("wait_appear", True),
+            pixel_color=data.get("pixel_color", "#000000"),
+            pixel_tolerance=data.get("pixel_tolerance", 10),
+            settle_enabled=data.get("settle_enabled", False),
+            settle_min=data.get("settle_min", 50),
+            settle_max=data.get("settle_max", 2000),
+            verify=PostCondition(data.get("verify", "none")),
+            verify_timeout=data.get("verify_timeout", 500),
+            verify_retries=data.get("verify_retries", 1),
+            verify_template_path=data.get("verify_template_path",
+                                          data.get("template_path", "") if legacy_verify else ""),
+            verify_roi=list(data.get("verify_roi",
+                                     data.get("match_roi", [0.0, 0.0, 1.0, 1.0]) if legacy_verify
+                                     else [0.0, 0.0, 1.0, 1.0])),
+            verify_threshold=data.get("verify_threshold",
+                                      data.get("match_threshold", 0.8) if legacy_verify else 0.8)
         )
 
     # ★★ 新增：克隆方法，用于“复制操作”
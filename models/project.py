@@ -1,5 +1,6 @@
 """项目模型"""
 from dataclasses import dataclass, field
+from enum import Enum
 from typing import List, Optional
 from datetime import datetime
 import uuid
@@ -8,6 +9,20 @@ import os
 from .scene import Scene
 
 
+class LatePolicy(Enum):
+    """定时操作迟到时的处理策略"""
+    FLAG = "flag"
+    SKIP = "skip"
+
+    @classmethod
+    def get_display_name(cls, policy: 'LatePolicy') -> str:
+        names = {
+            cls.FLAG: "记录并立即执行",
+            cls.SKIP: "跳过该操作"
+        }
+        return names.get(policy, policy.value)
+
+
 @dataclass
 class Project:
     """项目模型"""
@@ -27,6 +42,21 @@ class Project:
     group_id: str = "default"
     # 新增：是否折叠显示
     collapsed: bool = False
+    # 消息间隔的时间配置（safe/fast/turbo）
+    timing_profile: str = "safe"
+    # 定时操作迟到超过容差（毫秒）时的处理策略
+    late_policy: LatePolicy = LatePolicy.FLAG
+    late_tolerance: int = 20
+    # 投递节流：探测目标窗口响应速度并自适应调整消息速率
+    pacing_enabled: bool = False
+    # 鼠标消息投递给坐标下方的子窗口（Qt / 内嵌浏览器 / MFC 控件）
+    route_to_child: bool = False
+    # 按场景跳转进入下一场景前，用该场景的第一个锚点快速确认
+    verify_transitions: bool = True
+    # 在独立的识别进程中做完整场景识别（项目很多时绕开 GIL）
+    process_recognition: bool = False
+    # 识别调度优先级（1 最低 ~ 5 最高），识别排队时高优先级先放行，低优先级延长识别间隔
+    priority: int = 3
 
     def __post_init__(self):
         if not self.scenes:
@@ -80,7 +110,15 @@ class Project:
             "loop_execution": self.loop_execution,
             "max_loop_count": self.max_loop_count,
             "group_id": self.group_id,
-            "collapsed": self.collapsed
+            "collapsed": self.collapsed,
+            "timing_profile": self.timing_profile,
+            "late_policy": self.late_policy.value,
+            "late_tolerance": self.late_tolerance,
+            "pacing_enabled": self.pacing_enabled,
+            "route_to_child": self.route_to_child,
+            "verify_transitions": self.verify_transitions,
+            "process_recognition": self.process_recognition,
+            "priority": self.priority
         }
 
     @classmethod
@@ -98,7 +136,15 @@ class Project:
             loop_execution=data.get("loop_execution", False),
             max_loop_count=data.get("max_loop_count", 0),
             group_id=data.get("group_id", "default"),
-            collapsed=data.get("collapsed", False)
+            collapsed=data.get("collapsed", False),
+            timing_profile=data.get("timing_profile", "safe"),
+            late_policy=LatePolicy(data.get("late_policy", "flag")),
+            late_tolerance=data.get("late_tolerance", 20),
+            pacing_enabled=data.get("pacing_enabled", False),
+            route_to_child=data.get("route_to_child", False),
+            verify_transitions=data.get("verify_transitions", True),
+            process_recognition=data.get("process_recognition", False),
+            priority=data.get("priority", 3)
         )
         project.scenes = [Scene.from_dict(s) for s in data.get("scenes", [])]
         if not project.scenes:
@@ -58,6 +58,7 @@ class Scene:
     actions: List[Action] = field(default_factory=list)
     is_default: bool = False
     enabled: bool = True
+    # 场景跳转：连续执行 loop_count 次（0 视为 1 次）后直接进入 next_scene_id，不做完整识别
     next_scene_id: Optional[str] = None
     loop_count: int = 0
     # 新增：场景识别锚点列表
@@ -0,0 +1,152 @@
+"""动作编译器测试：检查生成的原语序列（不依赖 win32/Qt）"""
+import unittest
+
+from models import Action, ActionType, Scene, TextInputStrategy
+from core.action_compiler import (
+    ActionCompiler, MAKELPARAM, OP_CHECK, OP_POST, OP_SLEEP, OP_TEXT,
+    SLEEP_DELAY, SLEEP_GAP, DRAG_PIXELS_PER_STEP,
+    WM_LBUTTONDOWN, WM_LBUTTONUP, WM_MOUSEMOVE, WM_KEYDOWN, WM_KEYUP, MK_LBUTTON,
+    scene_version,
+)
+from core.timing import get_timing_profile
+
+
+def make_action(action_type: ActionType, **kwargs) -> Action:
+    action = Action(action_type=action_type, delay_after=0)
+    for name, value in kwargs.items():
+        setattr(action, name, value)
+    return action
+
+
+def posts(ops) -> list:
+    """只保留投递消息的 (msg, wparam, lparam)"""
+    return [op[1:] for op in ops if op[0] == OP_POST]
+
+
+class CompileActionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.compiler = ActionCompiler(lambda vk: vk + 1000)
+        self.safe = get_timing_profile("safe")
+
+    def test_click(self):
+        action = make_action(ActionType.CLICK, relative_x=0.5, relative_y=0.25, delay_after=300)
+        program = self.compiler.compile_action(action, 800, 600, "safe")
+        lparam = MAKELPARAM(400, 150)
+        self.assertEqual(program.error, "")
+        self.assertEqual(program.ops, (
+            (OP_CHECK,),
+            (OP_POST, WM_LBUTTONDOWN, MK_LBUTTON, lparam),
+            (OP_SLEEP, self.safe.click_hold, SLEEP_GAP),
+            (OP_POST, WM_LBUTTONUP, 0, lparam),
+            (OP_SLEEP, 0.3, SLEEP_DELAY),
+        ))
+
+    def test_combo_key(self):
+        action = make_action(ActionType.KEY_PRESS, key="ctrl+shift+a")
+        program = self.compiler.compile_action(action, 800, 600, "turbo")
+        ctrl, shift, a = 0x11, 0x10, ord("A")
+        self.assertEqual(posts(program.ops), [
+            (WM_KEYDOWN, ctrl, ((ctrl + 1000) << 16) | 1),
+            (WM_KEYDOWN, shift, ((shift + 1000) << 16) | 1),
+            (WM_KEYDOWN, a, ((a + 1000) << 16) | 1),
+            (WM_KEYUP, a, ((a + 1000) << 16) | 0xC0000001),
+            (WM_KEYUP, shift, ((shift + 1000) << 16) | 0xC0000001),
+            (WM_KEYUP, ctrl, ((ctrl + 1000) << 16) | 0xC0000001),
+        ])
+        # 极速配置的修饰键间隔为 0，不生成休眠原语
+        self.assertFalse([op for op in program.ops if op[0] == OP_SLEEP and op[1] == 0])
+
+    def test_empty_key_is_error_program(self):
+        program = self.compiler.compile_action(make_action(ActionType.KEY_PRESS, key=""), 800, 600)
+        self.assertEqual(program.ops, ())
+        self.assertIn("不支持的按键", program.error)
+
+    def test_drag_step_count_follows_distance(self):
+        action = make_action(ActionType.DRAG, relative_x=0.0, relative_y=0.0,
+                             end_relative_x=1.0, end_relative_y=0.0, drag_duration=5000)
+        moves = [m for m in posts(self.compiler.compile_action(action, 800, 600, "safe").ops)
+                 if m[0] == WM_MOUSEMOVE]
+        self.assertEqual(len(moves), 800 // DRAG_PIXELS_PER_STEP)
+        self.assertEqual(moves[-1], (WM_MOUSEMOVE, MK_LBUTTON, MAKELPARAM(800, 0)))
+
+        # 短距离拖拽步数随距离减少
+        action.end_relative_x = 0.05
+        moves = [m for m in posts(self.compiler.compile_action(action, 800, 600, "safe").ops)
+                 if m[0] == WM_MOUSEMOVE]
+        self.assertEqual(len(moves), 40 // DRAG_PIXELS_PER_STEP)
+
+    def test_drag_step_count_capped_by_rate(self):
+        action = make_action(ActionType.DRAG, relative_x=0.0, relative_y=0.0,
+                             end_relative_x=1.0, end_relative_y=0.0, drag_duration=100)
+        moves = [m for m in posts(self.compiler.compile_action(action, 800, 600, "safe").ops)
+                 if m[0] == WM_MOUSEMOVE]
+        self.assertEqual(len(moves), int(0.1 * self.safe.drag_max_rate))
+
+    def test_zero_length_drag(self):
+        action = make_action(ActionType.DRAG, relative_x=0.5, relative_y=0.5,
+                             end_relative_x=0.5, end_relative_y=0.5)
+        program = self.compiler.compile_action(action, 800, 600, "safe")
+        lparam = MAKELPARAM(400, 300)
+        self.assertEqual(program.error, "")
+        self.assertEqual(posts(program.ops), [
+            (WM_LBUTTONDOWN, MK_LBUTTON, lparam),
+            (WM_MOUSEMOVE, MK_LBUTTON, lparam),
+            (WM_LBUTTONUP, 0, lparam),
+        ])
+
+    def test_text(self):
+        action = make_action(ActionType.INPUT_TEXT, text="你好", relative_x=0.25, relative_y=0.5,
+                             text_strategy=TextInputStrategy.CLIPBOARD)
+        program = self.compiler.compile_action(action, 800, 600, "safe")
+        kind, text, strategies, char_interval, paste_ops, point = program.ops[1]
+        self.assertEqual((kind, text, point), (OP_TEXT, "你好", (200, 300)))
+        self.assertEqual(strategies, (TextInputStrategy.CLIPBOARD, TextInputStrategy.CHUNKED,
+                                      TextInputStrategy.PER_CHAR))
+        self.assertEqual(char_interval, self.safe.char_interval)
+        self.assertEqual([m[:2] for m in posts(paste_ops)], [
+            (WM_KEYDOWN, 0x11), (WM_KEYDOWN, ord("V")), (WM_KEYUP, ord("V")), (WM_KEYUP, 0x11),
+        ])
+
+
+class ProgramCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.compiler = ActionCompiler()
+        self.scene = Scene(name="s")
+        self.scene.actions.append(make_action(ActionType.CLICK))
+
+    def get(self, width=800, height=600, profile="safe"):
+        return self.compiler.get_program(self.scene, scene_version(self.scene), width, height, profile)
+
+    def test_hit_for_same_key(self):
+        self.assertIs(self.get(), self.get())
+
+    def test_client_size_and_profile_are_part_of_key(self):
+        program = self.get()
+        self.assertIsNot(program, self.get(width=1024))
+        self.assertIsNot(program, self.get(profile="fast"))
+        self.assertIs(program, self.get())
+
+    def test_scene_change_changes_version(self):
+        program = self.get()
+        self.scene.actions[0].relative_x = 0.1
+        changed = self.get()
+        self.assertNotEqual(program.version, changed.version)
+        self.assertNotEqual(program.actions[0].ops, changed.actions[0].ops)
+
+    def test_version_is_not_recomputed_on_hit(self):
+        version = scene_version(self.scene)
+        program = self.compiler.get_program(self.scene, version, 800, 600)
+        # 命中缓存只看传入的版本，不再序列化场景
+        self.scene.actions[0].relative_x = 0.1
+        self.assertIs(program, self.compiler.get_program(self.scene, version, 800, 600))
+
+    def test_discard(self):
+        program = self.get()
+        self.compiler.discard({self.scene.id})
+        self.assertIsNot(program, self.get())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""asyncio 执行引擎测试：等待、唤醒与停止响应（不依赖 win32/Qt）"""
+import asyncio
+import threading
+import time
+import unittest
+
+from core.async_engine import AsyncEngine, AsyncTask
+from core.cancellation import CancellationToken
+
+
+def fake_runner(token: CancellationToken, interval: float, on_step=None):
+    """模拟 ProjectRunner.steps()：每轮执行一步后 yield 识别间隔，停止后结束"""
+    while not token.is_stopped():
+        if on_step is not None:
+            on_step()
+        yield interval
+
+
+class RunStepsTest(unittest.TestCase):
+    """调用方驱动事件循环"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.engine = AsyncEngine(2, loop=self.loop)
+
+    def tearDown(self):
+        self.engine._executor.shutdown(wait=True)
+        self.loop.close()
+
+    def test_yielded_waits_become_sleeps(self):
+        stamps = []
+
+        def steps():
+            for delay in (0.05, 0.1, 0):
+                stamps.append(time.perf_counter())
+                yield delay
+            stamps.append(time.perf_counter())
+
+        task = AsyncTask(self.engine, "p")
+        self.loop.run_until_complete(self.engine.run_steps(steps(), task))
+        self.assertTrue(task.done())
+        self.assertIsNone(task.error)
+        self.assertEqual(task.steps, 3)
+        gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+        self.assertGreaterEqual(gaps[0], 0.045)
+        self.assertGreaterEqual(gaps[1], 0.095)
+        self.assertLess(gaps[2], 0.05)
+
+    def test_error_in_step_finishes_task(self):
+        def steps():
+            yield 0
+            raise ValueError("boom")
+
+        task = AsyncTask(self.engine, "p")
+        self.loop.run_until_complete(self.engine.run_steps(steps(), task))
+        self.assertTrue(task.done())
+        self.assertIsInstance(task.error, ValueError)
+
+
+class BackgroundEngineTest(unittest.TestCase):
+    """引擎自带事件循环线程"""
+
+    def setUp(self):
+        self.engine = AsyncEngine(2)
+
+    def tearDown(self):
+        self.engine.shutdown(wait=True)
+
+    def test_wake_cuts_wait_short(self):
+        resumed = threading.Event()
+
+        def steps():
+            yield 5.0
+            resumed.set()
+
+        task = self.engine.submit(steps(), name="p")
+        time.sleep(0.05)
+        start = time.perf_counter()
+        task.wake()
+        self.assertTrue(resumed.wait(1.0))
+        self.assertTrue(task.wait(1.0))
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+    def test_stop_during_step_is_prompt(self):
+        """步骤执行中请求停止并唤醒，不应再等待完整的识别间隔"""
+        token = CancellationToken()
+        in_step = threading.Event()
+        release = threading.Event()
+
+        def slow_step():
+            in_step.set()
+            release.wait(1.0)
+
+        task = self.engine.submit(fake_runner(token, 5.0, slow_step), name="p")
+        self.assertTrue(in_step.wait(1.0))
+        start = time.perf_counter()
+        token.stop()
+        task.wake()
+        release.set()
+        self.assertTrue(task.wait(1.0))
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+    def test_shutdown_after_stop_is_prompt(self):
+        tokens = [CancellationToken() for _ in range(5)]
+        tasks = [self.engine.submit(fake_runner(token, 5.0), name=f"p{i}")
+                 for i, token in enumerate(tokens)]
+        time.sleep(0.05)
+        self.engine.shutdown(wait=False)
+        with self.assertRaises(RuntimeError):
+            self.engine.submit(fake_runner(CancellationToken(), 5.0))
+
+        start = time.perf_counter()
+        for token, task in zip(tokens, tasks):
+            token.stop()
+            task.wake()
+        self.engine._thread.join(1.0)
+        self.assertFalse(self.engine._thread.is_alive())
+        self.assertTrue(all(task.done() for task in tasks))
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(self.engine.active_count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
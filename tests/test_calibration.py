@@ -0,0 +1,74 @@
+"""延迟校准测试：百分位建议值与项目 diff（不依赖 win32/Qt）"""
+import unittest
+
+from models import Action, ActionType, Project
+from core.calibration import (
+    DelayCalibrator, MIN_SAMPLES, apply_proposals, percentile, proposal_diff,
+)
+
+
+class PercentileTest(unittest.TestCase):
+
+    def test_nearest_rank(self):
+        values = [float(v) for v in range(1, 21)]
+        self.assertEqual(percentile(values, 0.95), 19.0)
+        self.assertEqual(percentile(values, 0.5), 10.0)
+        self.assertEqual(percentile([3.0, 1.0, 2.0], 1.0), 3.0)
+        self.assertEqual(percentile([], 0.95), 0.0)
+
+
+class ProposalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.project = Project(name="p")
+        self.action = Action(action_type=ActionType.CLICK, name="点击", delay_after=300)
+        self.project.scenes[0].actions.append(self.action)
+        self.calibrator = DelayCalibrator()
+
+    def record(self, *seconds):
+        for value in seconds:
+            self.calibrator.record(self.action.id, value)
+
+    def test_p95_plus_margin_rounded_up(self):
+        self.record(0.100, 0.120, 0.131)
+        proposal, = self.calibrator.propose(self.project, p=0.95, margin_ms=50)
+        # P95 = 131ms，+50ms = 181ms，向上取整到 10ms
+        self.assertAlmostEqual(proposal.percentile_ms, 131.0)
+        self.assertEqual(proposal.new_delay, 190)
+        self.assertEqual((proposal.old_delay, proposal.samples), (300, 3))
+        self.assertFalse(proposal.settle_enabled)
+
+    def test_min_samples(self):
+        self.record(*[0.1] * (MIN_SAMPLES - 1))
+        self.assertEqual(self.calibrator.propose(self.project), [])
+        self.record(0.1)
+        self.assertEqual(len(self.calibrator.propose(self.project)), 1)
+
+    def test_unchanged_delay_is_not_proposed(self):
+        self.action.delay_after = 150
+        self.record(0.1, 0.1, 0.1)
+        self.assertEqual(self.calibrator.propose(self.project, margin_ms=50), [])
+
+    def test_settle_enabled_is_flagged(self):
+        self.action.settle_enabled = True
+        self.record(0.1, 0.1, 0.1)
+        self.assertTrue(self.calibrator.propose(self.project)[0].settle_enabled)
+
+    def test_diff_and_apply(self):
+        self.record(0.1, 0.1, 0.1)
+        proposals = self.calibrator.propose(self.project, margin_ms=50)
+        diff = proposal_diff(self.project, proposals)
+        self.assertTrue(diff.startswith(f"--- a/{self.project.id}.json\n+++ b/{self.project.id}.json\n"))
+        removed = [l for l in diff.splitlines() if l.startswith("-") and not l.startswith("---")]
+        added = [l for l in diff.splitlines() if l.startswith("+") and not l.startswith("+++")]
+        self.assertEqual([l[1:].strip() for l in removed], ['"delay_after": 300,'])
+        self.assertEqual([l[1:].strip() for l in added], ['"delay_after": 150,'])
+        # 生成 diff 不修改项目，应用后才写回
+        self.assertEqual(self.action.delay_after, 300)
+        self.assertEqual(apply_proposals(self.project, proposals), 1)
+        self.assertEqual(self.action.delay_after, 150)
+        self.assertEqual(proposal_diff(self.project, []), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
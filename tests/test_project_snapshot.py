@@ -0,0 +1,78 @@
+"""项目快照测试：快照隔离与 diff（不依赖 win32/Qt）"""
+import unittest
+
+from models import Action, ActionType, Project, Scene, SceneAnchor
+from core.project_snapshot import ProjectSnapshot
+
+
+def make_project() -> Project:
+    project = Project(name="p")
+    first = project.scenes[0]
+    first.actions.append(Action(action_type=ActionType.CLICK))
+    first.anchors.append(SceneAnchor(name="a", image_path="a.png"))
+    second = Scene(name="second", recognition_image_path="second.png")
+    second.actions.append(Action(action_type=ActionType.KEY_PRESS, key="enter"))
+    project.add_scene(second)
+    return project
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.project = make_project()
+        self.first, self.second = self.project.scenes
+        self.old = ProjectSnapshot.take(self.project)
+
+    def new_diff(self):
+        return ProjectSnapshot.take(self.project, 1).diff(self.old)
+
+    def test_snapshot_is_isolated_from_edits(self):
+        self.first.actions[0].relative_x = 0.1
+        self.assertEqual(self.old.get_scene(self.first.id).actions[0].relative_x, 0.5)
+
+    def test_unchanged(self):
+        diff = self.new_diff()
+        self.assertTrue(diff.is_empty())
+        self.assertEqual(diff.removed_templates, frozenset())
+
+    def test_action_edit_changes_only_that_scene(self):
+        self.second.actions[0].key = "tab"
+        diff = self.new_diff()
+        self.assertEqual(diff.changed_scenes, {self.second.id})
+        self.assertFalse(diff.recognition_changed)
+
+    def test_disabled_action_changes_scene(self):
+        self.first.actions[0].enabled = False
+        self.assertEqual(self.new_diff().changed_scenes, {self.first.id})
+
+    def test_added_and_removed_scenes(self):
+        added = self.project.add_scene(Scene(name="third"))
+        self.project.remove_scene(self.second.id)
+        diff = self.new_diff()
+        self.assertEqual(diff.changed_scenes, {added.id, self.second.id})
+        self.assertTrue(diff.recognition_changed)
+        self.assertEqual(diff.removed_templates, {"second.png"})
+
+    def test_anchor_edit_changes_recognition_only(self):
+        self.first.anchors[0].threshold = 0.95
+        diff = self.new_diff()
+        self.assertTrue(diff.recognition_changed)
+        self.assertEqual(diff.changed_scenes, frozenset())
+        new = ProjectSnapshot.take(self.project, 1)
+        self.assertNotEqual(new.recognition_keys[self.first.id], self.old.recognition_keys[self.first.id])
+        self.assertEqual(new.recognition_keys[self.second.id], self.old.recognition_keys[self.second.id])
+
+    def test_disabling_scene_changes_recognition(self):
+        self.second.enabled = False
+        diff = self.new_diff()
+        self.assertTrue(diff.recognition_changed)
+        new = ProjectSnapshot.take(self.project, 1)
+        self.assertEqual([s.id for s in new.enabled_scenes], [self.first.id])
+
+    def test_replaced_template_is_removed(self):
+        self.first.anchors[0].image_path = "b.png"
+        self.assertEqual(self.new_diff().removed_templates, {"a.png"})
+
+
+if __name__ == "__main__":
+    unittest.main()
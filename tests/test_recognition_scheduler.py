@@ -0,0 +1,106 @@
+"""识别调度测试：放行顺序与并发上限（不依赖 win32/Qt）"""
+import threading
+import time
+import unittest
+
+from core.cancellation import CancellationToken
+from core.recognition_scheduler import RecognitionScheduler
+
+
+class AdmissionOrderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = RecognitionScheduler(max_concurrent=1)
+        self.scheduler.register("low", 0)
+        self.scheduler.register("high", 5)
+
+    def admit_all(self, seqs: dict) -> list:
+        """逐个放行并立即释放，返回放行顺序"""
+        order = []
+        while seqs:
+            admitted = [name for name, seq in seqs.items() if self.scheduler.try_admit(seq) is not None]
+            self.assertEqual(len(admitted), 1)
+            order.append(admitted[0])
+            del seqs[admitted[0]]
+            self.scheduler.release()
+        return order
+
+    def test_priority_first_then_fifo(self):
+        self.scheduler.register("high2", 5)
+        seqs = {}
+        for name in ("low", "high", "low2", "high2"):
+            seqs[name] = self.scheduler.enqueue("high" if name.startswith("high") else "low")
+        self.assertEqual(self.admit_all(seqs), ["high", "high2", "low", "low2"])
+
+    def test_unknown_project_has_default_priority(self):
+        seqs = {"unknown": self.scheduler.enqueue("other"), "low": self.scheduler.enqueue("low")}
+        self.assertEqual(self.admit_all(seqs), ["unknown", "low"])
+
+    def test_cancel_unblocks_next(self):
+        first = self.scheduler.enqueue("high")
+        second = self.scheduler.enqueue("low")
+        self.assertIsNone(self.scheduler.try_admit(second))
+        self.scheduler.cancel(first)
+        self.assertIsNotNone(self.scheduler.try_admit(second))
+        self.assertEqual(self.scheduler.queue_depth(), 0)
+
+
+class ConcurrencyCapTest(unittest.TestCase):
+
+    def test_cap_holds_until_release(self):
+        scheduler = RecognitionScheduler(max_concurrent=2)
+        seqs = [scheduler.enqueue("p") for _ in range(3)]
+        self.assertIsNotNone(scheduler.try_admit(seqs[0]))
+        self.assertIsNotNone(scheduler.try_admit(seqs[1]))
+        self.assertIsNone(scheduler.try_admit(seqs[2]))
+        self.assertEqual(scheduler.active_count(), 2)
+        scheduler.release()
+        self.assertIsNotNone(scheduler.try_admit(seqs[2]))
+        self.assertEqual(scheduler.active_count(), 2)
+
+    def test_cap_with_threads(self):
+        scheduler = RecognitionScheduler(max_concurrent=2)
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def worker(project_id: str):
+            for _ in range(5):
+                with scheduler.admit(project_id) as waited:
+                    self.assertIsNotNone(waited)
+                    with lock:
+                        state["active"] += 1
+                        state["peak"] = max(state["peak"], state["active"])
+                    time.sleep(0.002)
+                    with lock:
+                        state["active"] -= 1
+
+        threads = [threading.Thread(target=worker, args=(f"p{i}",)) for i in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5.0)
+        self.assertEqual(state["peak"], 2)
+        self.assertEqual(scheduler.active_count(), 0)
+
+    def test_stopped_token_skips_admission(self):
+        scheduler = RecognitionScheduler(max_concurrent=1)
+        holder = scheduler.enqueue("p")
+        self.assertIsNotNone(scheduler.try_admit(holder))
+        token = CancellationToken()
+        token.stop()
+        with scheduler.admit("q", token) as waited:
+            self.assertIsNone(waited)
+        self.assertEqual(scheduler.queue_depth(), 0)
+
+    def test_queue_wait_survives_unregister_once(self):
+        scheduler = RecognitionScheduler()
+        scheduler.register("p", 0)
+        scheduler.try_admit(scheduler.enqueue("p"))
+        scheduler.release()
+        scheduler.unregister("p")
+        self.assertEqual(scheduler.queue_wait("p").count, 1)
+        self.assertEqual(scheduler.queue_wait("p").count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""执行监督测试：卡住判定、退避重启与崩溃循环（不依赖 win32/Qt）"""
+import unittest
+
+from core.cancellation import CancellationToken
+from core.supervisor import RestartPolicy, WorkerSupervisor
+
+
+class FakeRunner:
+    """只提供监督器读取的心跳字段"""
+
+    def __init__(self, expected_tick: float = 1.0, last_beat: float = 0.0, beat_budget: float = 0.0):
+        self.token = CancellationToken()
+        self.expected_tick = expected_tick
+        self.last_beat = last_beat
+        self.beat_budget = beat_budget
+        self.finished = False
+
+    def is_finished(self) -> bool:
+        return self.finished
+
+
+class StallTest(unittest.TestCase):
+
+    def setUp(self):
+        self.supervisor = WorkerSupervisor(RestartPolicy(stall_factor=5.0, min_stall=15.0))
+
+    def test_min_stall_applies_to_short_intervals(self):
+        runner = FakeRunner(expected_tick=1.0)
+        self.assertEqual(self.supervisor.stall_duration(runner, now=15.0), 0.0)
+        self.assertEqual(self.supervisor.stall_duration(runner, now=16.0), 16.0)
+
+    def test_threshold_scales_with_interval(self):
+        runner = FakeRunner(expected_tick=10.0)
+        self.assertEqual(self.supervisor.stall_duration(runner, now=50.0), 0.0)
+        self.assertEqual(self.supervisor.stall_duration(runner, now=51.0), 51.0)
+
+    def test_beat_budget_is_not_counted(self):
+        runner = FakeRunner(expected_tick=1.0, last_beat=100.0, beat_budget=30.0)
+        self.assertEqual(self.supervisor.stall_duration(runner, now=140.0), 0.0)
+        self.assertEqual(self.supervisor.stall_duration(runner, now=146.0), 16.0)
+
+    def test_paused_or_finished_is_never_stalled(self):
+        runner = FakeRunner()
+        runner.token.pause()
+        self.assertEqual(self.supervisor.stall_duration(runner, now=1000.0), 0.0)
+        runner = FakeRunner()
+        runner.finished = True
+        self.assertEqual(self.supervisor.stall_duration(runner, now=1000.0), 0.0)
+
+
+class RestartTest(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = RestartPolicy(backoff_base=2.0, backoff_max=10.0, max_restarts=5, crash_window=300.0)
+        self.supervisor = WorkerSupervisor(self.policy)
+
+    def test_backoff_sequence(self):
+        delays = [self.supervisor.schedule_restart("p", "崩溃", now=float(i)) for i in range(5)]
+        self.assertEqual(delays, [2.0, 4.0, 8.0, 10.0, 10.0])
+
+    def test_crash_loop_cutoff(self):
+        for i in range(5):
+            self.assertIsNotNone(self.supervisor.schedule_restart("p", "崩溃", now=float(i)))
+        self.assertIsNone(self.supervisor.schedule_restart("p", "崩溃", now=5.0))
+        record = self.supervisor.get_record("p")
+        self.assertTrue(record.given_up)
+        self.assertEqual(record.crashes, 6)
+        self.assertFalse(self.supervisor.is_pending("p"))
+
+    def test_old_restarts_leave_the_window(self):
+        for i in range(5):
+            self.supervisor.schedule_restart("p", "崩溃", now=float(i))
+        # 第一次重启已超出 crash_window，退避从剩余次数继续
+        self.assertEqual(self.supervisor.schedule_restart("p", "崩溃", now=300.5), 10.0)
+
+    def test_reset_clears_crash_loop(self):
+        for i in range(6):
+            self.supervisor.schedule_restart("p", "崩溃", now=float(i))
+        self.supervisor.reset("p")
+        self.assertEqual(self.supervisor.schedule_restart("p", "崩溃", now=6.0), 2.0)
+        self.assertFalse(self.supervisor.get_record("p").given_up)
+
+    def test_due_and_cancel(self):
+        self.supervisor.schedule_restart("p", "卡住", stall=20.0, now=0.0)
+        self.supervisor.schedule_restart("q", "崩溃", now=0.0)
+        self.supervisor.cancel("q")
+        self.assertEqual(self.supervisor.due(now=1.0), [])
+        self.assertEqual(self.supervisor.due(now=2.0), ["p"])
+        self.assertEqual(self.supervisor.due(now=3.0), [])
+        record = self.supervisor.get_record("p")
+        self.assertEqual((record.restarts, record.stalls, record.crashes), (1, 1, 0))
+        self.assertEqual(record.stall_time.max, 20.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+"""共享线程池的停止响应测试（不依赖 win32/Qt）"""
+import threading
+import time
+import unittest
+
+from core.cancellation import CancellationToken
+from core.task_pool import TaskPool, InlineExecutor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def fake_runner(token: CancellationToken, interval: float, on_step=None):
+    """模拟 ProjectRunner.steps()：每轮执行一步后 yield 识别间隔，停止后结束"""
+    while not token.is_stopped():
+        if on_step is not None:
+            on_step()
+        yield interval
+
+
+class TaskPoolWakeTest(unittest.TestCase):
+
+    def test_wake_during_step_skips_following_wait(self):
+        """步骤执行期间收到的 wake 不能丢失，随后的等待应立即结束"""
+        clock = FakeClock()
+        pool = TaskPool(1, executor=InlineExecutor(), clock=clock, start=False)
+        token = CancellationToken()
+        holder = {}
+
+        def stop_in_step():
+            token.stop()
+            holder["task"].wake()
+
+        holder["task"] = pool.submit(fake_runner(token, 5.0, stop_in_step), name="p")
+        pool.run_pending()        # 第一步中请求停止并唤醒
+        self.assertEqual(pool.next_deadline(), 0.0)
+        pool.run_pending()        # 不推进时钟即可执行下一步并结束
+        self.assertTrue(holder["task"].done())
+
+    def test_wake_during_wait(self):
+        clock = FakeClock()
+        pool = TaskPool(1, executor=InlineExecutor(), clock=clock, start=False)
+        token = CancellationToken()
+        task = pool.submit(fake_runner(token, 5.0), name="p")
+        pool.run_pending()
+        self.assertEqual(pool.next_deadline(), 5.0)
+        token.stop()
+        task.wake()
+        pool.run_pending()
+        self.assertTrue(task.done())
+
+    def test_stop_latency_with_threads(self):
+        """线程池模式下在步骤执行中请求停止，应远早于识别间隔结束"""
+        pool = TaskPool(2)
+        token = CancellationToken()
+        in_step = threading.Event()
+        release = threading.Event()
+
+        def slow_step():
+            in_step.set()
+            release.wait(1.0)
+
+        task = pool.submit(fake_runner(token, 5.0, slow_step), name="p")
+        self.assertTrue(in_step.wait(1.0))
+        start = time.perf_counter()
+        token.stop()
+        task.wake()
+        release.set()
+        self.assertTrue(task.wait(1.0))
+        self.assertLess(time.perf_counter() - start, 1.0)
+        pool.shutdown()
+
+
+def fake_project(token: CancellationToken, counter: dict, name: str, work: float = 0.0, guard=None):
+    """
+    模拟一轮执行：识别 → 操作（操作后延迟）→ 等待画面（轮询）→ 识别间隔，
+    每一步可在线程中占用 work 秒，counter[name] 记录完成的轮数
+    """
+    while not token.is_stopped():
+        for delay in (0.01, 0.005, 0.005, 0.005, 0.02):
+            if token.is_stopped():
+                return
+            if guard is not None:
+                with guard:
+                    time.sleep(work)
+            yield delay
+        counter[name] = counter.get(name, 0) + 1
+
+
+class ConcurrencyGuard:
+    """记录同时处于步骤中的任务数峰值"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.active -= 1
+
+
+class TaskPoolLoadTest(unittest.TestCase):
+
+    def test_many_projects_progress_evenly(self):
+        """虚拟时钟下 200 个项目共享一个执行器：每个项目都按自己的等待推进，互不拖慢"""
+        clock = FakeClock()
+        pool = TaskPool(2, executor=InlineExecutor(), clock=clock, start=False)
+        token = CancellationToken()
+        counter = {}
+        tasks = [pool.submit(fake_project(token, counter, f"p{i}"), name=f"p{i}") for i in range(200)]
+        while clock.now < 1.0:
+            pool.run_pending()
+            clock.now = pool.next_deadline()
+        # 每轮 0.045 秒：1 秒内每个项目都完成 22 轮
+        self.assertEqual(set(counter.values()), {22})
+        token.stop()
+        for task in tasks:
+            task.wake()
+        pool.run_pending()
+        self.assertTrue(all(task.done() for task in tasks))
+
+    def test_many_projects_on_small_pool(self):
+        """40 个项目跑在 2 个线程上：等待不占线程，所有项目都有进展且不会被饿死"""
+        pool = TaskPool(2)
+        token = CancellationToken()
+        guard = ConcurrencyGuard()
+        counter = {}
+        names = [f"p{i}" for i in range(40)]
+        tasks = [pool.submit(fake_project(token, counter, name, 0.001, guard), name=name) for name in names]
+        time.sleep(0.8)
+        token.stop()
+        for task in tasks:
+            task.wake()
+        start = time.perf_counter()
+        self.assertTrue(all(task.wait(1.0) for task in tasks))
+        self.assertLess(time.perf_counter() - start, 1.0)
+        pool.shutdown()
+
+        loops = [counter.get(name, 0) for name in names]
+        self.assertGreaterEqual(min(loops), 2)
+        self.assertGreaterEqual(min(loops) * 3, max(loops))
+        self.assertLessEqual(guard.peak, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
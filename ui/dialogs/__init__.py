@@ -4,6 +4,7 @@ from .scene_dialog import SceneDialog
 from .action_dialog import ActionDialog
 from .anchor_capture_dialog import AnchorCaptureDialog
 from .scene_anchor_dialog import SceneAnchorDialog
+from .calibration_dialog import CalibrationDialog
 
 __all__ = [
     'ProjectDialog',
@@ -11,4 +12,5 @@ __all__ = [
     'ActionDialog',
     'AnchorCaptureDialog',
     'SceneAnchorDialog',
+    'CalibrationDialog',
 ]
\ No newline at end of file
@@ -2,9 +2,10 @@
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
                              QLabel, QLineEdit, QComboBox, QDoubleSpinBox,
                              QSpinBox, QPushButton, QTextEdit, QGroupBox,
-                             QCheckBox)
+                             QCheckBox, QFileDialog, QWidget)
 from PyQt5.QtCore import Qt
-from models import Action, ActionType
+from models import Action, ActionType, TextInputStrategy, DragEasing, WaitCondition, PostCondition
+from core.timing import TIMING_PROFILES
 
 
 class ActionDialog(QDialog):
@@ -79,8 +80,113 @@ class ActionDialog(QDialog):
         self.end_y_spin.setSingleStep(0.01)
         position_layout.addRow(self.end_y_label, self.end_y_spin)
 
+        self.drag_path_label = QLabel("途经点:")
+        self.drag_path_edit = QLineEdit()
+        self.drag_path_edit.setPlaceholderText("可选，如: 0.3,0.5; 0.6,0.4")
+        position_layout.addRow(self.drag_path_label, self.drag_path_edit)
+
+        self.drag_duration_label = QLabel("拖拽时长:")
+        self.drag_duration_spin = QSpinBox()
+        self.drag_duration_spin.setRange(0, 10000)
+        self.drag_duration_spin.setSingleStep(50)
+        self.drag_duration_spin.setSuffix(" 毫秒")
+        self.drag_duration_spin.setSpecialValueText("按距离自动")
+        position_layout.addRow(self.drag_duration_label, self.drag_duration_spin)
+
+        self.drag_easing_label = QLabel("速度曲线:")
+        self.drag_easing_combo = QComboBox()
+        for easing in DragEasing:
+            self.drag_easing_combo.addItem(DragEasing.get_display_name(easing), easing)
+        position_layout.addRow(self.drag_easing_label, self.drag_easing_combo)
+
         layout.addWidget(self.position_group)
 
+        # 查找设置（查找并点击 / 等待画面条件）
+        self.match_group = QGroupBox("查找设置")
+        match_layout = QFormLayout(self.match_group)
+
+        self.condition_label = QLabel("等待条件:")
+        self.condition_combo = QComboBox()
+        for condition in WaitCondition:
+            self.condition_combo.addItem(WaitCondition.get_display_name(condition), condition)
+        self.condition_combo.currentIndexChanged.connect(self.on_type_changed)
+        match_layout.addRow(self.condition_label, self.condition_combo)
+
+        self.appear_label = QLabel("等待:")
+        self.appear_combo = QComboBox()
+        self.appear_combo.addItem("出现", True)
+        self.appear_combo.addItem("消失", False)
+        match_layout.addRow(self.appear_label, self.appear_combo)
+
+        self.template_label = QLabel("目标图片:")
+        self.template_row = QWidget()
+        template_layout = QHBoxLayout(self.template_row)
+        template_layout.setContentsMargins(0, 0, 0, 0)
+        self.template_edit = QLineEdit()
+        self.template_edit.setPlaceholderText("要查找的目标图片")
+        template_layout.addWidget(self.template_edit)
+        self.template_btn = QPushButton("选择...")
+        self.template_btn.clicked.connect(self.select_template)
+        template_layout.addWidget(self.template_btn)
+        match_layout.addRow(self.template_label, self.template_row)
+
+        self.roi_label = QLabel("查找区域:")
+        self.roi_row = QWidget()
+        roi_layout = QHBoxLayout(self.roi_row)
+        roi_layout.setContentsMargins(0, 0, 0, 0)
+        self.roi_spins = []
+        for tip in ("X", "Y", "宽", "高"):
+            spin = QDoubleSpinBox()
+            spin.setRange(0, 1)
+            spin.setDecimals(3)
+            spin.setSingleStep(0.05)
+            spin.setToolTip(f"查找区域 {tip}（相对坐标）")
+            roi_layout.addWidget(spin)
+            self.roi_spins.append(spin)
+        match_layout.addRow(self.roi_label, self.roi_row)
+
+        self.threshold_label = QLabel("相似度阈值:")
+        self.threshold_spin = QDoubleSpinBox()
+        self.threshold_spin.setRange(0.5, 1.0)
+        self.threshold_spin.setDecimals(2)
+        self.threshold_spin.setSingleStep(0.01)
+        match_layout.addRow(self.threshold_label, self.threshold_spin)
+
+        self.pixel_color_label = QLabel("像素颜色:")
+        self.pixel_color_edit = QLineEdit()
+        self.pixel_color_edit.setPlaceholderText("#RRGGBB，取上方坐标处的像素")
+        match_layout.addRow(self.pixel_color_label, self.pixel_color_edit)
+
+        self.pixel_tolerance_label = QLabel("颜色容差:")
+        self.pixel_tolerance_spin = QSpinBox()
+        self.pixel_tolerance_spin.setRange(0, 255)
+        match_layout.addRow(self.pixel_tolerance_label, self.pixel_tolerance_spin)
+
+        self.match_offset_label = QLabel("点击偏移(像素):")
+        self.match_offset_row = QWidget()
+        offset_layout = QHBoxLayout(self.match_offset_row)
+        offset_layout.setContentsMargins(0, 0, 0, 0)
+        self.match_offset_x_spin = QSpinBox()
+        self.match_offset_x_spin.setRange(-2000, 2000)
+        self.match_offset_x_spin.setPrefix("X ")
+        offset_layout.addWidget(self.match_offset_x_spin)
+        self.match_offset_y_spin = QSpinBox()
+        self.match_offset_y_spin.setRange(-2000, 2000)
+        self.match_offset_y_spin.setPrefix("Y ")
+        offset_layout.addWidget(self.match_offset_y_spin)
+        match_layout.addRow(self.match_offset_label, self.match_offset_row)
+
+        self.match_timeout_spin = QSpinBox()
+        self.match_timeout_spin.setRange(0, 600000)
+        self.match_timeout_spin.setSingleStep(100)
+        self.match_timeout_spin.setSuffix(" 毫秒")
+        match_layout.addRow("超时:", self.match_timeout_spin)
+
+        self.match_fallback_check = QCheckBox("超时未找到时点击上方坐标")
+        match_layout.addRow("", self.match_fallback_check)
+
+        layout.addWidget(self.match_group)
+
         # 输入设置
         self.input_group = QGroupBox("输入设置")
         input_layout = QFormLayout(self.input_group)
@@ -95,6 +201,13 @@ class ActionDialog(QDialog):
         self.text_edit.setPlaceholderText("要输入的文本内容")
         input_layout.addRow(self.text_label, self.text_edit)
 
+        self.text_strategy_label = QLabel("输入方式:")
+        self.text_strategy_combo = QComboBox()
+        for strategy in TextInputStrategy:
+            self.text_strategy_combo.addItem(TextInputStrategy.get_display_name(strategy), strategy)
+        self.text_strategy_combo.setToolTip("所选方式失败时，按列表顺序依次回退到后面的方式")
+        input_layout.addRow(self.text_strategy_label, self.text_strategy_combo)
+
         layout.addWidget(self.input_group)
 
         # 时间设置
@@ -115,6 +228,100 @@ class ActionDialog(QDialog):
         self.delay_spin.setValue(300)
         time_layout.addRow("操作后延迟:", self.delay_spin)
 
+        self.settle_check = QCheckBox("等待画面稳定（代替操作后延迟）")
+        self.settle_check.setToolTip("操作后连续采样画面，画面不再变化即继续，不必按最坏情况设置固定延迟")
+        self.settle_check.toggled.connect(self.on_settle_toggled)
+        time_layout.addRow("", self.settle_check)
+
+        self.settle_row = QWidget()
+        settle_layout = QHBoxLayout(self.settle_row)
+        settle_layout.setContentsMargins(0, 0, 0, 0)
+        self.settle_min_spin = QSpinBox()
+        self.settle_min_spin.setRange(0, 60000)
+        self.settle_min_spin.setSingleStep(50)
+        self.settle_min_spin.setPrefix("最少 ")
+        self.settle_min_spin.setSuffix(" 毫秒")
+        settle_layout.addWidget(self.settle_min_spin)
+        self.settle_max_spin = QSpinBox()
+        self.settle_max_spin.setRange(0, 60000)
+        self.settle_max_spin.setSingleStep(100)
+        self.settle_max_spin.setPrefix("最多 ")
+        self.settle_max_spin.setSuffix(" 毫秒")
+        settle_layout.addWidget(self.settle_max_spin)
+        self.settle_label = QLabel("稳定等待:")
+        time_layout.addRow(self.settle_label, self.settle_row)
+
+        self.offset_spin = QSpinBox()
+        self.offset_spin.setRange(-1, 600000)
+        self.offset_spin.setSingleStep(100)
+        self.offset_spin.setSuffix(" 毫秒")
+        self.offset_spin.setSpecialValueText("不定时")
+        self.offset_spin.setToolTip("在距场景开始的固定时刻执行，用于对时间要求严格的操作序列")
+        time_layout.addRow("定时偏移:", self.offset_spin)
+
+        self.verify_combo = QComboBox()
+        for condition in PostCondition:
+            self.verify_combo.addItem(PostCondition.get_display_name(condition), condition)
+        self.verify_combo.setToolTip("操作后检查是否生效，未生效时重新执行；「离开当前场景」满足后立即重新识别")
+        self.verify_combo.currentIndexChanged.connect(self.on_type_changed)
+        time_layout.addRow("操作后验证:", self.verify_combo)
+
+        self.verify_row = QWidget()
+        verify_layout = QHBoxLayout(self.verify_row)
+        verify_layout.setContentsMargins(0, 0, 0, 0)
+        self.verify_timeout_spin = QSpinBox()
+        self.verify_timeout_spin.setRange(0, 60000)
+        self.verify_timeout_spin.setSingleStep(100)
+        self.verify_timeout_spin.setPrefix("超时 ")
+        self.verify_timeout_spin.setSuffix(" 毫秒")
+        verify_layout.addWidget(self.verify_timeout_spin)
+        self.verify_retries_spin = QSpinBox()
+        self.verify_retries_spin.setRange(0, 10)
+        self.verify_retries_spin.setPrefix("重试 ")
+        self.verify_retries_spin.setSuffix(" 次")
+        verify_layout.addWidget(self.verify_retries_spin)
+        self.verify_label = QLabel("验证设置:")
+        time_layout.addRow(self.verify_label, self.verify_row)
+
+        self.verify_template_label = QLabel("验证图片:")
+        self.verify_template_row = QWidget()
+        verify_template_layout = QHBoxLayout(self.verify_template_row)
+        verify_template_layout.setContentsMargins(0, 0, 0, 0)
+        self.verify_template_edit = QLineEdit()
+        self.verify_template_edit.setPlaceholderText("操作生效后应出现的图片")
+        verify_template_layout.addWidget(self.verify_template_edit)
+        self.verify_threshold_spin = QDoubleSpinBox()
+        self.verify_threshold_spin.setRange(0.5, 1.0)
+        self.verify_threshold_spin.setDecimals(2)
+        self.verify_threshold_spin.setSingleStep(0.01)
+        self.verify_threshold_spin.setToolTip("相似度阈值")
+        verify_template_layout.addWidget(self.verify_threshold_spin)
+        self.verify_template_btn = QPushButton("选择...")
+        self.verify_template_btn.clicked.connect(self.select_verify_template)
+        verify_template_layout.addWidget(self.verify_template_btn)
+        time_layout.addRow(self.verify_template_label, self.verify_template_row)
+
+        self.verify_roi_label = QLabel("验证区域:")
+        self.verify_roi_row = QWidget()
+        verify_roi_layout = QHBoxLayout(self.verify_roi_row)
+        verify_roi_layout.setContentsMargins(0, 0, 0, 0)
+        self.verify_roi_spins = []
+        for tip in ("X", "Y", "宽", "高"):
+            spin = QDoubleSpinBox()
+            spin.setRange(0, 1)
+            spin.setDecimals(3)
+            spin.setSingleStep(0.05)
+            spin.setToolTip(f"验证区域 {tip}（相对坐标）")
+            verify_roi_layout.addWidget(spin)
+            self.verify_roi_spins.append(spin)
+        time_layout.addRow(self.verify_roi_label, self.verify_roi_row)
+
+        self.timing_combo = QComboBox()
+        self.timing_combo.addItem("跟随项目", "")
+        for profile in TIMING_PROFILES.values():
+            self.timing_combo.addItem(profile.display_name, profile.name)
+        time_layout.addRow("时间配置:", self.timing_combo)
+
         layout.addWidget(self.time_group)
 
         # 描述
@@ -171,8 +378,36 @@ class ActionDialog(QDialog):
 
         # 位置
         show_position = action_type in [ActionType.CLICK, ActionType.DOUBLE_CLICK,
-                                        ActionType.RIGHT_CLICK, ActionType.DRAG]
-        self.position_group.setVisible(show_position)
+                                        ActionType.RIGHT_CLICK, ActionType.DRAG,
+                                        ActionType.FIND_CLICK]
+        show_find = action_type == ActionType.FIND_CLICK
+        show_wait_for = action_type == ActionType.WAIT_FOR
+        show_pixel = show_wait_for and self.condition_combo.currentData() == WaitCondition.PIXEL
+        self.position_group.setVisible(show_position or show_pixel)
+
+        # 查找 / 等待画面条件
+        self.match_group.setVisible(show_find or show_wait_for)
+        self.match_group.setTitle("等待条件" if show_wait_for else "查找设置")
+        for widget in (self.condition_label, self.condition_combo,
+                       self.appear_label, self.appear_combo):
+            widget.setVisible(show_wait_for)
+        for widget in (self.template_label, self.template_row, self.roi_label, self.roi_row,
+                       self.threshold_label, self.threshold_spin):
+            widget.setVisible(not show_pixel)
+        for widget in (self.pixel_color_label, self.pixel_color_edit,
+                       self.pixel_tolerance_label, self.pixel_tolerance_spin):
+            widget.setVisible(show_pixel)
+        for widget in (self.match_offset_label, self.match_offset_row, self.match_fallback_check):
+            widget.setVisible(show_find)
+
+        # 操作后验证
+        verify = self.verify_combo.currentData()
+        show_verify_anchor = verify == PostCondition.ANCHOR_APPEARED
+        self.verify_label.setVisible(verify != PostCondition.NONE)
+        self.verify_row.setVisible(verify != PostCondition.NONE)
+        for widget in (self.verify_template_label, self.verify_template_row,
+                       self.verify_roi_label, self.verify_roi_row):
+            widget.setVisible(show_verify_anchor)
 
         # 拖拽终点
         show_end = action_type == ActionType.DRAG
@@ -180,6 +415,10 @@ class ActionDialog(QDialog):
         self.end_x_spin.setVisible(show_end)
         self.end_y_label.setVisible(show_end)
         self.end_y_spin.setVisible(show_end)
+        for widget in (self.drag_path_label, self.drag_path_edit,
+                       self.drag_duration_label, self.drag_duration_spin,
+                       self.drag_easing_label, self.drag_easing_combo):
+            widget.setVisible(show_end)
 
         # 按键
         show_key = action_type == ActionType.KEY_PRESS
@@ -190,6 +429,8 @@ class ActionDialog(QDialog):
         show_text = action_type == ActionType.INPUT_TEXT
         self.text_label.setVisible(show_text)
         self.text_edit.setVisible(show_text)
+        self.text_strategy_label.setVisible(show_text)
+        self.text_strategy_combo.setVisible(show_text)
 
         self.input_group.setVisible(show_key or show_text)
 
@@ -214,10 +455,44 @@ class ActionDialog(QDialog):
         self.y_spin.setValue(self.action.relative_y)
         self.end_x_spin.setValue(self.action.end_relative_x)
         self.end_y_spin.setValue(self.action.end_relative_y)
+        self.drag_path_edit.setText("; ".join(f"{x:.4f},{y:.4f}" for x, y in self.action.drag_path))
+        self.drag_duration_spin.setValue(self.action.drag_duration)
+        index = self.drag_easing_combo.findData(self.action.drag_easing)
+        self.drag_easing_combo.setCurrentIndex(max(index, 0))
         self.key_edit.setText(self.action.key)
         self.text_edit.setText(self.action.text)
+        index = self.text_strategy_combo.findData(self.action.text_strategy)
+        self.text_strategy_combo.setCurrentIndex(max(index, 0))
         self.wait_spin.setValue(self.action.wait_time)
         self.delay_spin.setValue(self.action.delay_after)
+        self.offset_spin.setValue(self.action.schedule_offset)
+        index = self.timing_combo.findData(self.action.timing_profile)
+        self.timing_combo.setCurrentIndex(max(index, 0))
+        self.template_edit.setText(self.action.template_path)
+        for spin, value in zip(self.roi_spins, self.action.match_roi):
+            spin.setValue(value)
+        self.threshold_spin.setValue(self.action.match_threshold)
+        self.match_offset_x_spin.setValue(self.action.match_offset_x)
+        self.match_offset_y_spin.setValue(self.action.match_offset_y)
+        self.match_timeout_spin.setValue(self.action.match_timeout)
+        self.match_fallback_check.setChecked(self.action.match_fallback)
+        index = self.condition_combo.findData(self.action.wait_condition)
+        self.condition_combo.setCurrentIndex(max(index, 0))
+        self.appear_combo.setCurrentIndex(0 if self.action.wait_appear else 1)
+        self.pixel_color_edit.setText(self.action.pixel_color)
+        self.pixel_tolerance_spin.setValue(self.action.pixel_tolerance)
+        self.settle_check.setChecked(self.action.settle_enabled)
+        self.settle_min_spin.setValue(self.action.settle_min)
+        self.settle_max_spin.setValue(self.action.settle_max)
+        self.on_settle_toggled(self.action.settle_enabled)
+        index = self.verify_combo.findData(self.action.verify)
+        self.verify_combo.setCurrentIndex(max(index, 0))
+        self.verify_timeout_spin.setValue(self.action.verify_timeout)
+        self.verify_retries_spin.setValue(self.action.verify_retries)
+        self.verify_template_edit.setText(self.action.verify_template_path)
+        for spin, value in zip(self.verify_roi_spins, self.action.verify_roi):
+            spin.setValue(value)
+        self.verify_threshold_spin.setValue(self.action.verify_threshold)
         self.desc_edit.setPlainText(self.action.description)
 
     def get_action(self) -> Action:
@@ -229,9 +504,74 @@ class ActionDialog(QDialog):
         self.action.relative_y = self.y_spin.value()
         self.action.end_relative_x = self.end_x_spin.value()
         self.action.end_relative_y = self.end_y_spin.value()
+        self.action.drag_path = self._parse_drag_path(self.drag_path_edit.text())
+        self.action.drag_duration = self.drag_duration_spin.value()
+        self.action.drag_easing = self.drag_easing_combo.currentData()
         self.action.key = self.key_edit.text()
         self.action.text = self.text_edit.text()
+        self.action.text_strategy = self.text_strategy_combo.currentData()
         self.action.wait_time = self.wait_spin.value()
         self.action.delay_after = self.delay_spin.value()
+        self.action.schedule_offset = self.offset_spin.value()
+        self.action.timing_profile = self.timing_combo.currentData()
+        self.action.template_path = self.template_edit.text().strip()
+        self.action.match_roi = [spin.value() for spin in self.roi_spins]
+        self.action.match_threshold = self.threshold_spin.value()
+        self.action.match_offset_x = self.match_offset_x_spin.value()
+        self.action.match_offset_y = self.match_offset_y_spin.value()
+        self.action.match_timeout = self.match_timeout_spin.value()
+        self.action.match_fallback = self.match_fallback_check.isChecked()
+        self.action.wait_condition = self.condition_combo.currentData()
+        self.action.wait_appear = self.appear_combo.currentData()
+        self.action.pixel_color = self.pixel_color_edit.text().strip() or "#000000"
+        self.action.pixel_tolerance = self.pixel_tolerance_spin.value()
+        self.action.settle_enabled = self.settle_check.isChecked()
+        self.action.settle_min = self.settle_min_spin.value()
+        self.action.verify = self.verify_combo.currentData()
+        self.action.verify_timeout = self.verify_timeout_spin.value()
+        self.action.verify_retries = self.verify_retries_spin.value()
+        self.action.verify_template_path = self.verify_template_edit.text().strip()
+        self.action.verify_roi = [spin.value() for spin in self.verify_roi_spins]
+        self.action.verify_threshold = self.verify_threshold_spin.value()
+        self.action.settle_max = max(self.settle_max_spin.value(), self.settle_min_spin.value())
         self.action.description = self.desc_edit.toPlainText()
-        return self.action
\ No newline at end of file
+        return self.action
+
+    def on_settle_toggled(self, checked: bool):
+        """等待画面稳定时固定延迟不再生效"""
+        self.delay_spin.setEnabled(not checked)
+        self.settle_label.setVisible(checked)
+        self.settle_row.setVisible(checked)
+        self.adjustSize()
+
+    def select_template(self):
+        filepath, _ = QFileDialog.getOpenFileName(
+            self, "选择目标图片", "",
+            "图片文件 (*.png *.jpg *.jpeg *.bmp)"
+        )
+        if filepath:
+            self.template_edit.setText(filepath)
+
+    def select_verify_template(self):
+        filepath, _ = QFileDialog.getOpenFileName(
+            self, "选择验证图片", "",
+            "图片文件 (*.png *.jpg *.jpeg *.bmp)"
+        )
+        if filepath:
+            self.verify_template_edit.setText(filepath)
+
+    @staticmethod
+    def _parse_drag_path(text: str) -> list:
+        """解析途经点文本 "x,y; x,y"，忽略格式错误或超出 0~1 的点"""
+        points = []
+        for part in text.replace("；", ";").split(";"):
+            coords = part.replace("，", ",").split(",")
+            if len(coords) != 2:
+                continue
+            try:
+                x, y = float(coords[0]), float(coords[1])
+            except ValueError:
+                continue
+            if 0 <= x <= 1 and 0 <= y <= 1:
+                points.append([x, y])
+        return points
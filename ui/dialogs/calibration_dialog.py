@@ -0,0 +1,64 @@
+# ui/dialogs/calibration_dialog.py
+from typing import List
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                             QPlainTextEdit, QPushButton, QTableWidget,
+                             QTableWidgetItem, QHeaderView)
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QFont
+from models import Project
+from core.calibration import (DelayProposal, proposal_diff, DEFAULT_PERCENTILE, DEFAULT_MARGIN_MS,
+                              CALIBRATION_MIN_WINDOW)
+
+
+class CalibrationDialog(QDialog):
+    """延迟校准结果：建议列表 + 项目文件 diff，确认后才写回"""
+
+    def __init__(self, parent=None, project: Project = None,
+                 proposals: List[DelayProposal] = None):
+        super().__init__(parent)
+        self.project = project
+        self.proposals = proposals or []
+        self._setup_ui()
+
+    def _setup_ui(self):
+        self.setWindowTitle(f"延迟校准 - {self.project.name}")
+        self.setMinimumSize(640, 520)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+
+        layout = QVBoxLayout(self)
+        layout.setSpacing(10)
+
+        tip = QLabel(f"建议值 = 实测画面稳定耗时的 P{DEFAULT_PERCENTILE * 100:.0f} + {DEFAULT_MARGIN_MS}ms，"
+                     f"确认后写回项目文件。\n所有操作都参与测量（延迟为 0 的操作最多测量 "
+                     f"{CALIBRATION_MIN_WINDOW * 1000:.0f}ms）；启用了等待画面稳定的操作，建议延迟在关闭后才生效")
+        tip.setStyleSheet("color: #666;")
+        layout.addWidget(tip)
+
+        table = QTableWidget(len(self.proposals), 5)
+        table.setHorizontalHeaderLabels(["场景", "操作", "样本", "当前延迟", "建议延迟"])
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        for row, p in enumerate(self.proposals):
+            values = [p.scene_name, p.action_name, str(p.samples), f"{p.old_delay} ms",
+                      f"{p.new_delay} ms" + ("（等待画面稳定中）" if p.settle_enabled else "")]
+            for col, value in enumerate(values):
+                table.setItem(row, col, QTableWidgetItem(value))
+        layout.addWidget(table)
+
+        diff_edit = QPlainTextEdit()
+        diff_edit.setReadOnly(True)
+        diff_edit.setFont(QFont("Consolas", 9))
+        diff_edit.setPlainText(proposal_diff(self.project, self.proposals))
+        layout.addWidget(diff_edit, 1)
+
+        # 按钮
+        btn_layout = QHBoxLayout()
+        btn_layout.addStretch()
+        apply_btn = QPushButton("应用")
+        apply_btn.clicked.connect(self.accept)
+        btn_layout.addWidget(apply_btn)
+
+        cancel_btn = QPushButton("放弃")
+        cancel_btn.clicked.connect(self.reject)
+        btn_layout.addWidget(cancel_btn)
+        layout.addLayout(btn_layout)
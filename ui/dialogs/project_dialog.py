@@ -4,8 +4,9 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
                              QComboBox, QMessageBox, QGroupBox, QCheckBox,
                              QSpinBox)
 from PyQt5.QtCore import Qt
-from models import Project
+from models import Project, LatePolicy
 from core import WindowManager
+from core.timing import TIMING_PROFILES
 
 
 class ProjectDialog(QDialog):
@@ -84,6 +85,12 @@ class ProjectDialog(QDialog):
         self.recognize_interval_spin.setSuffix(" 毫秒")
         exec_layout.addRow("识别间隔:", self.recognize_interval_spin)
 
+        self.priority_spin = QSpinBox()
+        self.priority_spin.setRange(1, 5)
+        self.priority_spin.setValue(3)
+        self.priority_spin.setToolTip("多个项目同时识别需要排队时，优先级高的先识别；低优先级项目会自动延长识别间隔")
+        exec_layout.addRow("识别优先级:", self.priority_spin)
+
         self.loop_check = QCheckBox("循环执行")
         exec_layout.addRow("", self.loop_check)
 
@@ -93,6 +100,35 @@ class ProjectDialog(QDialog):
         self.max_loop_spin.setSpecialValueText("无限循环")
         exec_layout.addRow("最大循环:", self.max_loop_spin)
 
+        self.timing_combo = QComboBox()
+        for profile in TIMING_PROFILES.values():
+            self.timing_combo.addItem(profile.display_name, profile.name)
+        self.timing_combo.setToolTip("点击、按键、拖拽、输入等消息之间的间隔，越快对目标程序要求越高")
+        exec_layout.addRow("时间配置:", self.timing_combo)
+
+        self.late_policy_combo = QComboBox()
+        for policy in LatePolicy:
+            self.late_policy_combo.addItem(LatePolicy.get_display_name(policy), policy)
+        exec_layout.addRow("定时操作迟到:", self.late_policy_combo)
+
+        self.late_tolerance_spin = QSpinBox()
+        self.late_tolerance_spin.setRange(0, 10000)
+        self.late_tolerance_spin.setSingleStep(10)
+        self.late_tolerance_spin.setSuffix(" 毫秒")
+        exec_layout.addRow("迟到容差:", self.late_tolerance_spin)
+
+        self.pacing_check = QCheckBox("投递节流（探测目标响应速度，自动放慢消息发送）")
+        exec_layout.addRow("", self.pacing_check)
+
+        self.route_child_check = QCheckBox("鼠标消息发送到子控件（Qt / 浏览器 / MFC 等点击无效时开启）")
+        exec_layout.addRow("", self.route_child_check)
+
+        self.verify_transitions_check = QCheckBox("场景跳转时用一个锚点快速确认（关闭则完全信任跳转设置）")
+        exec_layout.addRow("", self.verify_transitions_check)
+
+        self.process_recognition_check = QCheckBox("在独立进程中识别场景（同时运行的项目很多时开启）")
+        exec_layout.addRow("", self.process_recognition_check)
+
         layout.addWidget(exec_group)
 
         # 描述
@@ -165,8 +201,18 @@ class ProjectDialog(QDialog):
         self.desc_edit.setPlainText(self.project.description)
         self.auto_recognize_check.setChecked(self.project.auto_recognize_scene)
         self.recognize_interval_spin.setValue(self.project.recognize_interval)
+        self.priority_spin.setValue(self.project.priority)
         self.loop_check.setChecked(self.project.loop_execution)
         self.max_loop_spin.setValue(self.project.max_loop_count)
+        index = self.timing_combo.findData(self.project.timing_profile)
+        self.timing_combo.setCurrentIndex(max(index, 0))
+        index = self.late_policy_combo.findData(self.project.late_policy)
+        self.late_policy_combo.setCurrentIndex(max(index, 0))
+        self.late_tolerance_spin.setValue(self.project.late_tolerance)
+        self.pacing_check.setChecked(self.project.pacing_enabled)
+        self.route_child_check.setChecked(self.project.route_to_child)
+        self.verify_transitions_check.setChecked(self.project.verify_transitions)
+        self.process_recognition_check.setChecked(self.project.process_recognition)
 
     def on_accept(self):
         """确定按钮点击"""
@@ -183,6 +229,14 @@ class ProjectDialog(QDialog):
         self.project.description = self.desc_edit.toPlainText()
         self.project.auto_recognize_scene = self.auto_recognize_check.isChecked()
         self.project.recognize_interval = self.recognize_interval_spin.value()
+        self.project.priority = self.priority_spin.value()
         self.project.loop_execution = self.loop_check.isChecked()
         self.project.max_loop_count = self.max_loop_spin.value()
+        self.project.timing_profile = self.timing_combo.currentData()
+        self.project.late_policy = self.late_policy_combo.currentData()
+        self.project.late_tolerance = self.late_tolerance_spin.value()
+        self.project.pacing_enabled = self.pacing_check.isChecked()
+        self.project.route_to_child = self.route_child_check.isChecked()
+        self.project.verify_transitions = self.verify_transitions_check.isChecked()
+        self.project.process_recognition = self.process_recognition_check.isChecked()
         return self.project
\ No newline at end of file
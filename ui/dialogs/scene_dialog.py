@@ -2,7 +2,8 @@
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
                              QLabel, QLineEdit, QDoubleSpinBox, QPushButton,
                              QTextEdit, QCheckBox, QFileDialog, QGroupBox,
-                             QListWidget, QListWidgetItem, QMessageBox)
+                             QListWidget, QListWidgetItem, QMessageBox,
+                             QComboBox, QSpinBox)
 from PyQt5.QtGui import QPixmap
 from PyQt5.QtCore import Qt
 from models import Scene, SceneAnchor
@@ -54,6 +55,29 @@ class SceneDialog(QDialog):
 
         layout.addWidget(basic_group)
 
+        # -------- 场景跳转 --------
+        flow_group = QGroupBox("场景跳转（可选）")
+        flow_layout = QFormLayout(flow_group)
+
+        self.loop_count_spin = QSpinBox()
+        self.loop_count_spin.setRange(0, 9999)
+        self.loop_count_spin.setSuffix(" 次")
+        self.loop_count_spin.setSpecialValueText("1 次")
+        flow_layout.addRow("连续执行:", self.loop_count_spin)
+
+        self.next_scene_combo = QComboBox()
+        self.next_scene_combo.addItem("自动识别", None)
+        for scene in (self.project.scenes if self.project else []):
+            if scene.id != self.scene.id:
+                self.next_scene_combo.addItem(scene.name, scene.id)
+        flow_layout.addRow("然后进入:", self.next_scene_combo)
+
+        flow_hint = QLabel("设置后按跳转直接进入下一场景，省去完整识别")
+        flow_hint.setStyleSheet("color: #666; font-size: 10px;")
+        flow_layout.addRow("", flow_hint)
+
+        layout.addWidget(flow_group)
+
         # -------- 场景整图识别设置（保留原来的） --------
         recognition_group = QGroupBox("整图识别设置（可选）")
         recognition_layout = QVBoxLayout(recognition_group)
@@ -162,6 +186,9 @@ class SceneDialog(QDialog):
         self.default_check.setChecked(self.scene.is_default)
         self.threshold_spin.setValue(self.scene.recognition_threshold)
         self.desc_edit.setPlainText(self.scene.description)
+        self.loop_count_spin.setValue(self.scene.loop_count)
+        index = self.next_scene_combo.findData(self.scene.next_scene_id)
+        self.next_scene_combo.setCurrentIndex(max(index, 0))
 
         # 整图预览
         if self.scene.recognition_image_path and os.path.exists(self.scene.recognition_image_path):
@@ -308,4 +335,6 @@ class SceneDialog(QDialog):
         self.scene.is_default = self.default_check.isChecked()
         self.scene.recognition_threshold = self.threshold_spin.value()
         self.scene.description = self.desc_edit.toPlainText()
+        self.scene.loop_count = self.loop_count_spin.value()
+        self.scene.next_scene_id = self.next_scene_combo.currentData()
         return self.scene
\ No newline at end of file
@@ -1,13 +1,15 @@
 """主页"""
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QPushButton, QScrollArea, QFrame, QGridLayout,
-                             QLineEdit, QMessageBox, QSplitter, QSizePolicy)
+                             QLineEdit, QMessageBox, QSplitter, QSizePolicy,
+                             QInputDialog, QDialog, QSpinBox, QCheckBox)
 from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont, QCursor
 from core import ProjectManager, ExecutionManager
 from models import Project
 from .widgets import ProjectCard, ExecutionPanel
-from .dialogs import ProjectDialog
+from .dialogs import ProjectDialog, CalibrationDialog
+from core.calibration import apply_proposals
 from PyQt5.QtWidgets import QMenu          # 新增：弹出菜单
 from PyQt5.QtGui import QCursor           # 新增：获取鼠标位置
 
@@ -198,6 +200,25 @@ class HomePage(QWidget):
         right_header.addWidget(right_title)
         
         right_header.addStretch()
+
+        # 共享线程池大小，0 表示每个项目独立线程（只影响之后启动的项目）
+        pool_label = QLabel("共享线程:")
+        pool_label.setStyleSheet("border: none; color: #666; font-size: 11px;")
+        right_header.addWidget(pool_label)
+        self.pool_size_spin = QSpinBox()
+        self.pool_size_spin.setRange(0, 32)
+        self.pool_size_spin.setSpecialValueText("独立")
+        self.pool_size_spin.setToolTip("多个项目共享的工作线程数，0 表示每个项目一个独立线程")
+        self.pool_size_spin.setValue(self.execution_manager.pool_size)
+        self.pool_size_spin.valueChanged.connect(self.execution_manager.set_pool_size)
+        right_header.addWidget(self.pool_size_spin)
+
+        self.async_engine_check = QCheckBox("asyncio")
+        self.async_engine_check.setStyleSheet("border: none; color: #666; font-size: 11px;")
+        self.async_engine_check.setToolTip("每个项目作为协程运行，截图/识别/投递在共享线程中执行，适合大量项目同时运行")
+        self.async_engine_check.setChecked(self.execution_manager.async_engine_enabled)
+        self.async_engine_check.toggled.connect(self.execution_manager.set_async_engine)
+        right_header.addWidget(self.async_engine_check)
         
         self.stop_all_btn = QPushButton("全部停止")
         self.stop_all_btn.setFixedHeight(28)
@@ -219,6 +240,38 @@ class HomePage(QWidget):
         
         right_layout.addLayout(right_header)
 
+        # 全局识别预算
+        budget_row = QHBoxLayout()
+        budget_label = QLabel("识别并发:")
+        budget_label.setStyleSheet("border: none; color: #666; font-size: 11px;")
+        budget_row.addWidget(budget_label)
+        self.max_recognition_spin = QSpinBox()
+        self.max_recognition_spin.setRange(1, 64)
+        self.max_recognition_spin.setValue(self.execution_manager.recognition_scheduler.max_concurrent)
+        self.max_recognition_spin.setToolTip("所有项目同时进行场景识别的上限，超出时按项目优先级排队")
+        self.max_recognition_spin.valueChanged.connect(self.on_recognition_budget_changed)
+        budget_row.addWidget(self.max_recognition_spin)
+
+        cpu_label = QLabel("CPU 上限:")
+        cpu_label.setStyleSheet("border: none; color: #666; font-size: 11px;")
+        budget_row.addWidget(cpu_label)
+        self.cpu_target_spin = QSpinBox()
+        self.cpu_target_spin.setRange(0, 100)
+        self.cpu_target_spin.setSuffix(" %")
+        self.cpu_target_spin.setSpecialValueText("不限")
+        self.cpu_target_spin.setToolTip("整机 CPU 占用（含识别进程，需安装 psutil，否则只统计本程序）超过该值时暂缓放行新的识别（至少保留一个）")
+        self.cpu_target_spin.valueChanged.connect(self.on_recognition_budget_changed)
+        budget_row.addWidget(self.cpu_target_spin)
+
+        self.auto_restart_check = QCheckBox("自动重启")
+        self.auto_restart_check.setStyleSheet("border: none; color: #666; font-size: 11px;")
+        self.auto_restart_check.setToolTip("项目因异常结束或长时间无响应时按退避间隔自动重启，短时间内反复崩溃则放弃")
+        self.auto_restart_check.setChecked(self.execution_manager.auto_restart)
+        self.auto_restart_check.toggled.connect(self.execution_manager.set_auto_restart)
+        budget_row.addWidget(self.auto_restart_check)
+        budget_row.addStretch()
+        right_layout.addLayout(budget_row)
+
         self.execution_scroll = QScrollArea()
         self.execution_scroll.setWidgetResizable(True)
         self.execution_scroll.setFrameShape(QFrame.NoFrame)
@@ -278,10 +331,10 @@ class HomePage(QWidget):
     def connect_signals(self):
         self.execution_manager.project_started.connect(self.on_project_started)
         self.execution_manager.project_stopped.connect(self.on_project_stopped)
-        self.execution_manager.project_log.connect(self.on_project_log)
-        self.execution_manager.project_progress.connect(self.on_project_progress)
-        self.execution_manager.project_status.connect(self.on_project_status)
+        self.execution_manager.project_events.connect(self.on_project_events)
         self.execution_manager.project_finished.connect(self.on_project_finished)
+        self.execution_manager.project_calibrated.connect(self.on_project_calibrated)
+        self.execution_manager.project_restarted.connect(self.on_project_restarted)
 
     def load_projects(self):
         """加载项目列表"""
@@ -320,6 +373,7 @@ class HomePage(QWidget):
                 card.run_clicked.connect(self.run_project)
                 card.pause_clicked.connect(self.toggle_pause_project)
                 card.stop_clicked.connect(self.stop_project)
+                card.calibrate_clicked.connect(self.calibrate_project)
 
                 if is_running:
                     card.set_running(True)
@@ -373,6 +427,14 @@ class HomePage(QWidget):
             project.recognize_interval = project_data.recognize_interval
             project.loop_execution = project_data.loop_execution
             project.max_loop_count = project_data.max_loop_count
+            project.timing_profile = project_data.timing_profile
+            project.late_policy = project_data.late_policy
+            project.late_tolerance = project_data.late_tolerance
+            project.pacing_enabled = project_data.pacing_enabled
+            project.route_to_child = project_data.route_to_child
+            project.verify_transitions = project_data.verify_transitions
+            project.process_recognition = project_data.process_recognition
+            project.priority = project_data.priority
             self.project_manager.save_project(project)
             self.load_projects()
             self.project_selected.emit(project.id)
@@ -403,7 +465,7 @@ class HomePage(QWidget):
             self.load_projects()
             QMessageBox.information(self, "成功", f"已创建副本「{new_project.name}」")
 
-    def run_project(self, project_id: str):
+    def run_project(self, project_id: str, calibrate_loops: int = 0):
         project = self.project_manager.get_project(project_id)
         if not project:
             return
@@ -412,7 +474,7 @@ class HomePage(QWidget):
             QMessageBox.information(self, "提示", "项目已在运行中")
             return
 
-        success, message = self.execution_manager.start_project(project)
+        success, message = self.execution_manager.start_project(project, calibrate_loops)
         
         if success:
             self._create_execution_panel(project)
@@ -422,14 +484,39 @@ class HomePage(QWidget):
         else:
             QMessageBox.warning(self, "启动失败", message)
 
+    def calibrate_project(self, project_id: str):
+        """以校准模式运行项目，结束后弹出延迟建议"""
+        loops, ok = QInputDialog.getInt(self, "校准延迟", "校准运行轮数:", 10, 3, 1000)
+        if ok:
+            self.run_project(project_id, loops)
+
+    def on_project_calibrated(self, project_id: str, proposals: list):
+        project = self.project_manager.get_project(project_id)
+        if not project:
+            return
+        if not proposals:
+            QMessageBox.information(self, "校准完成", f"「{project.name}」的操作延迟无需调整")
+            return
+        dialog = CalibrationDialog(self, project, proposals)
+        if dialog.exec_() == QDialog.Accepted:
+            apply_proposals(project, proposals)
+            self.project_manager.save_project(project)
+            self.load_projects()
+
     def _create_execution_panel(self, project: Project):
+        # 上一次运行的面板还在（结束后 5 秒内重新运行）时先移除，避免同一日志文件被两个面板写入
+        self._remove_execution_panel(project.id)
         self.no_running_label.hide()
         panel = ExecutionPanel(project)
         self.execution_layout.insertWidget(0, panel)
         self.execution_panels[project.id] = panel
 
-    def _remove_execution_panel(self, project_id: str):
+    def _remove_execution_panel(self, project_id: str, panel: ExecutionPanel = None):
+        """移除项目的执行面板；指定 panel 时只在它仍是当前面板时移除"""
+        if panel is not None and self.execution_panels.get(project_id) is not panel:
+            return
         if project_id in self.execution_panels:
+            self.execution_panels[project_id].close_log()
             self.execution_panels[project_id].deleteLater()
             del self.execution_panels[project_id]
         if not self.execution_panels:
@@ -448,6 +535,11 @@ class HomePage(QWidget):
             if project_id in self.project_cards:
                 self.project_cards[project_id].set_paused(True)
 
+    def on_recognition_budget_changed(self):
+        self.execution_manager.set_recognition_budget(
+            self.max_recognition_spin.value(), self.cpu_target_spin.value()
+        )
+
     def stop_all_projects(self):
         running = self.execution_manager.get_running_projects()
         if not running:
@@ -471,17 +563,24 @@ class HomePage(QWidget):
             self.project_cards[project_id].set_running(False)
         self._update_stats()
 
-    def on_project_log(self, project_id: str, message: str):
-        if project_id in self.execution_panels:
-            self.execution_panels[project_id].add_log(message)
-        if project_id in self.project_cards:
-            self.project_cards[project_id].update_status(message)
-
-    def on_project_progress(self, project_id: str, current: int, total: int):
-        if project_id in self.execution_panels:
-            self.execution_panels[project_id].update_progress(current, total)
-        if project_id in self.project_cards:
-            self.project_cards[project_id].update_progress(current, total)
+    def on_project_events(self, project_id: str, batch):
+        """一个刷新周期内该项目的合并事件（ProjectEventBatch）"""
+        panel = self.execution_panels.get(project_id)
+        card = self.project_cards.get(project_id)
+        if batch.logs:
+            if panel:
+                panel.add_logs(batch.logs)
+            if card:
+                card.update_status(batch.logs[-1])
+        if batch.action and panel:
+            panel.update_action(batch.action)
+        if batch.progress:
+            if panel:
+                panel.update_progress(*batch.progress)
+            if card:
+                card.update_progress(*batch.progress)
+        if batch.status:
+            self.on_project_status(project_id, batch.status)
 
     def on_project_status(self, project_id: str, status: str):
         if project_id in self.execution_panels:
@@ -498,7 +597,19 @@ class HomePage(QWidget):
         if project_id in self.project_cards:
             self.project_cards[project_id].set_running(False)
         self._update_stats()
-        QTimer.singleShot(5000, lambda pid=project_id: self._remove_execution_panel(pid))
+        panel = self.execution_panels.get(project_id)
+        QTimer.singleShot(5000, lambda pid=project_id, p=panel: self._remove_execution_panel(pid, p))
+
+    def on_project_restarted(self, project_id: str, restarts: int, reason: str):
+        """监督器自动重启了项目：换上新的执行面板"""
+        project = self.project_manager.get_project(project_id)
+        if not project:
+            return
+        self._create_execution_panel(project)
+        self.execution_panels[project_id].add_log(f"自动重启（第 {restarts} 次）：{reason}")
+        if project_id in self.project_cards:
+            self.project_cards[project_id].set_running(True)
+        self._update_stats()
 
     def refresh(self):
         """刷新"""
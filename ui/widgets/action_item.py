@@ -1,9 +1,10 @@
 """操作项组件"""
+import os
 from PyQt5.QtWidgets import (QFrame, QHBoxLayout, QVBoxLayout, QLabel,
                              QPushButton, QCheckBox, QSizePolicy)
 from PyQt5.QtCore import Qt, pyqtSignal, QTimer, QPoint
 from PyQt5.QtGui import QFont
-from models import Action, ActionType
+from models import Action, ActionType, WaitCondition
 
 
 class ActionItem(QFrame):
@@ -143,7 +144,8 @@ class ActionItem(QFrame):
         if action.action_type in [ActionType.CLICK, ActionType.DOUBLE_CLICK, ActionType.RIGHT_CLICK]:
             return f"位置: ({action.relative_x:.3f}, {action.relative_y:.3f})"
         elif action.action_type == ActionType.DRAG:
-            return f"({action.relative_x:.2f}, {action.relative_y:.2f}) → ({action.end_relative_x:.2f}, {action.end_relative_y:.2f})"
+            via = f" 途经{len(action.drag_path)}点" if action.drag_path else ""
+            return f"({action.relative_x:.2f}, {action.relative_y:.2f}) → ({action.end_relative_x:.2f}, {action.end_relative_y:.2f}){via}"
         elif action.action_type == ActionType.KEY_PRESS:
             return f"按键: {action.key}"
         elif action.action_type == ActionType.INPUT_TEXT:
@@ -151,6 +153,16 @@ class ActionItem(QFrame):
             return f"文本: {text}"
         elif action.action_type == ActionType.WAIT:
             return f"等待: {action.wait_time}ms"
+        elif action.action_type == ActionType.FIND_CLICK:
+            name = os.path.basename(action.template_path) or "未设置"
+            return f"查找: {name}"
+        elif action.action_type == ActionType.WAIT_FOR:
+            state = "出现" if action.wait_appear else "消失"
+            if action.wait_condition == WaitCondition.PIXEL:
+                target = action.pixel_color
+            else:
+                target = os.path.basename(action.template_path) or "未设置"
+            return f"等待{state}: {target} (≤{action.match_timeout}ms)"
         return ""
 
     def _update_style(self):
@@ -1,12 +1,17 @@
 """执行状态面板组件"""
 from PyQt5.QtWidgets import (QFrame, QVBoxLayout, QHBoxLayout, QLabel,
-                             QProgressBar, QTextEdit, QSizePolicy)
+                             QProgressBar, QPlainTextEdit, QSizePolicy)
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont, QTextCursor
+from PyQt5.QtGui import QFont
 from models import Project
+from core.log_files import ProjectLogFile
 import time
 
 
+# 面板中保留的日志行数，更早的日志只在日志文件中
+LOG_MAX_LINES = 500
+
+
 class ExecutionPanel(QFrame):
     """执行状态面板"""
 
@@ -14,6 +19,7 @@ class ExecutionPanel(QFrame):
         super().__init__(parent)
         self.project = project
         self.project_id = project.id
+        self.log_file = ProjectLogFile(project.id)
         self.setup_ui()
 
     def setup_ui(self):
@@ -78,12 +84,14 @@ class ExecutionPanel(QFrame):
         self.action_label.setStyleSheet("color: #666; font-size: 9px;")
         layout.addWidget(self.action_label)
 
-        # 日志区域
-        self.log_text = QTextEdit()
+        # 日志区域：只保留最近 LOG_MAX_LINES 行
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
+        self.log_text.setMaximumBlockCount(LOG_MAX_LINES)
+        self.log_text.setToolTip(f"完整日志: {self.log_file.path}")
         self.log_text.setMaximumHeight(45)
         self.log_text.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: #1a1a1a;
                 color: #a0a0a0;
                 border: 1px solid #333;
@@ -97,9 +105,23 @@ class ExecutionPanel(QFrame):
 
     def add_log(self, message: str):
         """添加日志"""
-        timestamp = time.strftime("%H:%M:%S")
-        self.log_text.append(f"[{timestamp}] {message}")
-        self.log_text.moveCursor(QTextCursor.End)
+        self.add_logs([message])
+
+    def add_logs(self, messages: list):
+        """一次追加多条日志：面板只刷新一次，同时写入日志文件"""
+        if not messages:
+            return
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = now[11:]
+        # 一批超过面板容量时，只把最后 LOG_MAX_LINES 行放进面板
+        self.log_text.appendPlainText(
+            "\n".join(f"[{timestamp}] {m}" for m in messages[-LOG_MAX_LINES:])
+        )
+        self.log_file.write_lines([f"[{now}] {m}" for m in messages])
+
+    def close_log(self):
+        """关闭日志文件（移除面板前调用）"""
+        self.log_file.close()
 
     def update_progress(self, current: int, total: int):
         """更新进度"""
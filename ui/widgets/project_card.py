@@ -19,6 +19,7 @@ class ProjectCard(QFrame):
     run_clicked = pyqtSignal(str)
     pause_clicked = pyqtSignal(str)
     stop_clicked = pyqtSignal(str)
+    calibrate_clicked = pyqtSignal(str)
 
     def __init__(self, project: Project, collapsed: bool = True, parent=None):
         super().__init__(parent)
@@ -335,6 +336,7 @@ class ProjectCard(QFrame):
         menu.addSeparator()
         menu.addAction("📝 编辑项目").triggered.connect(lambda: self.edit_clicked.emit(self.project.id))
         menu.addAction("📋 复制项目").triggered.connect(lambda: self.duplicate_clicked.emit(self.project.id))
+        menu.addAction("⏱ 校准延迟").triggered.connect(lambda: self.calibrate_clicked.emit(self.project.id))
         menu.addSeparator()
         menu.addAction("🗑️ 删除项目").triggered.connect(lambda: self.delete_clicked.emit(self.project.id))
 